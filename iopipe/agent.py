@@ -6,9 +6,9 @@ import warnings
 
 from .config import set_config
 from .context import ContextWrapper
-from .plugins import is_plugin
+from .plugins import get_plugin_hooks, is_plugin
 from .report import Report
-from .timeout import Timeout, TimeoutError
+from .timeout import create_timeout, TimeoutError
 
 logging.basicConfig()
 
@@ -32,6 +32,9 @@ class IOpipeCore(object):
     pool = None
 
     def __init__(self, token=None, url=None, debug=None, plugins=None, **options):
+        self.enabled_plugins = set()
+        self.hooked_plugins = []
+        self.hooks = {}
         self.plugins = []
         if plugins is not None and isinstance(plugins, list):
             self.plugins = self.load_plugins(plugins)
@@ -148,8 +151,14 @@ class IOpipeCore(object):
 
             response = None
 
+            timeout = create_timeout(
+                timeout_duration,
+                self.config["timeout_sample_fraction"],
+                self.config["timeout_sample_interval"],
+            )
+
             try:
-                with Timeout(timeout_duration):
+                with timeout:
                     response = func(event, context)
             except Exception as e:
                 self.run_hooks("post:invoke", event=event, context=context)
@@ -159,18 +168,23 @@ class IOpipeCore(object):
                     raise e
 
                 frame = None
+                samples = None
+                threads = None
                 if isinstance(e, TimeoutError):
                     logger.debug(
-                        "Function about to timeout; reporting current stack frame"
+                        "Function about to timeout; reporting stack frames of all "
+                        "threads"
                     )
-                    frame = inspect.currentframe()
+                    frame = timeout.frame or inspect.currentframe()
+                    samples = timeout.samples
+                    threads = timeout.threads
 
                 # This prevents this block from being executed a second time in the
                 # event that a timeout occurs and an exception is subsequently raised
                 # within the handler
                 if self.report.sent is False:
                     self.run_hooks("post:response", response=response)
-                    self.report.prepare(e, frame)
+                    self.report.prepare(e, frame, threads, samples)
                     self.run_hooks("pre:report")
                     self.report.send()
                     self.run_hooks("post:report")
@@ -202,7 +216,8 @@ class IOpipeCore(object):
 
     def load_plugins(self, plugins):
         """
-        Loads plugins that match the `Plugin` interface and are instantiated.
+        Loads plugins that match the `Plugin` interface and are instantiated, and
+        compiles the dispatch table used by `run_hooks`.
 
         :param plugins: A list of plugin instances.
         """
@@ -222,33 +237,44 @@ class IOpipeCore(object):
             loaded_plugins.insert(0, instantiate(plugin))
             plugins_seen.append(plugin.name)
 
+        self.hooks = get_plugin_hooks(loaded_plugins)
+        self.hooked_plugins = loaded_plugins
+        self.enabled_plugins = set(p for p in loaded_plugins if p.enabled)
+
         return loaded_plugins
 
     def run_hooks(self, name, event=None, context=None, response=None):
         """
-        Runs plugin hooks for each registered plugin.
+        Runs plugin hooks for each enabled plugin.
         """
-        hooks = {
-            "pre:setup": lambda p: p.pre_setup(self),
-            "post:setup": lambda p: p.post_setup(self),
-            "pre:invoke": lambda p: p.pre_invoke(event, context),
-            "post:invoke": lambda p: p.post_invoke(event, context),
-            "post:response": lambda p: p.post_response(response),
-            "pre:report": lambda p: p.pre_report(self.report),
-            "post:report": lambda p: p.post_report(self.report),
-        }
-
-        if name in hooks:
-            for p in self.plugins:
-                if p.enabled:
-                    try:
-                        hooks[name](p)
-                    except Exception as e:
-                        logger.error(
-                            "IOpipe plugin %s hook %s raised error: %s"
-                            % (p.name, name, e)
-                        )
-                        logger.exception(e)
+        # Plugins can be enabled or disabled at runtime, their enabled state is
+        # checked once per invocation rather than by every hook
+        if name == "pre:invoke":
+            self.enabled_plugins = set(p for p in self.hooked_plugins if p.enabled)
+
+        hooks = self.hooks.get(name)
+        if not hooks:
+            return
+
+        if name in ("pre:setup", "post:setup"):
+            args = (self,)
+        elif name in ("pre:invoke", "post:invoke"):
+            args = (event, context)
+        elif name == "post:response":
+            args = (response,)
+        else:
+            args = (self.report,)
+
+        for plugin, hook in hooks:
+            if plugin not in self.enabled_plugins:
+                continue
+            try:
+                hook(*args)
+            except Exception as e:
+                logger.error(
+                    "IOpipe plugin %s hook %s raised error: %s" % (plugin.name, name, e)
+                )
+                logger.exception(e)
 
     def submit_future(self, func, *args, **kwargs):
         """
@@ -4,11 +4,18 @@ import warnings
 
 from .collector import get_collector_path, get_hostname
 
+COMPRESSION_ENCODINGS = ("gzip", "deflate")
+
 
 def set_config(**config):
     """
     Returns IOpipe configuration options, setting defaults as necessary.
     """
+    config.setdefault("compression", os.getenv("IOPIPE_COMPRESSION"))
+    config.setdefault("compression_level", os.getenv("IOPIPE_COMPRESSION_LEVEL", 1))
+    config.setdefault(
+        "compression_threshold", os.getenv("IOPIPE_COMPRESSION_THRESHOLD", 65536)
+    )
     config.setdefault("debug", bool(strtobool(os.getenv("IOPIPE_DEBUG", "false"))))
     config.setdefault("enabled", bool(strtobool(os.getenv("IOPIPE_ENABLED", "true"))))
     config.setdefault("host", get_hostname())
@@ -17,6 +24,12 @@ def set_config(**config):
     config.setdefault("path", get_collector_path())
     config.setdefault("plugins", [])
     config.setdefault("sync_http", False)
+    config.setdefault(
+        "timeout_sample_fraction", os.getenv("IOPIPE_TIMEOUT_SAMPLE_FRACTION", 0)
+    )
+    config.setdefault(
+        "timeout_sample_interval", os.getenv("IOPIPE_TIMEOUT_SAMPLE_INTERVAL", 10)
+    )
     config.setdefault("timeout_window", os.getenv("IOPIPE_TIMEOUT_WINDOW", 150))
     config.setdefault(
         "token", os.getenv("IOPIPE_TOKEN") or os.getenv("IOPIPE_CLIENTID") or ""
@@ -36,6 +49,27 @@ def set_config(**config):
             "IOpipe's 'network_timeout' is now in milliseconds, expressed as an integer"
         )
 
+    if config["compression"]:
+        config["compression"] = str(config["compression"]).lower()
+        if config["compression"] not in COMPRESSION_ENCODINGS:
+            warnings.warn(
+                "IOpipe's 'compression' must be one of: %s"
+                % ", ".join(COMPRESSION_ENCODINGS)
+            )
+            config["compression"] = None
+    else:
+        config["compression"] = None
+
+    try:
+        config["compression_level"] = min(max(int(config["compression_level"]), 0), 9)
+    except ValueError:
+        config["compression_level"] = 1
+
+    try:
+        config["compression_threshold"] = int(config["compression_threshold"])
+    except ValueError:
+        config["compression_threshold"] = 65536
+
     try:
         config["debug"] = bool(config["debug"])
     except ValueError:
@@ -51,6 +85,20 @@ def set_config(**config):
             "IOpipe's 'timeout_window' is now in milliseconds, expressed as an integer"
         )
 
+    try:
+        config["timeout_sample_fraction"] = min(
+            max(float(config["timeout_sample_fraction"]), 0.0), 1.0
+        )
+    except ValueError:
+        config["timeout_sample_fraction"] = 0.0
+
+    try:
+        config["timeout_sample_interval"] = (
+            max(int(config["timeout_sample_interval"]), 1) / 1000.0
+        )
+    except ValueError:
+        config["timeout_sample_interval"] = 0.01
+
     try:
         config["timeout_window"] = int(config["timeout_window"]) / 1000.0
     except ValueError:
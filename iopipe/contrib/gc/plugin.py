@@ -0,0 +1,161 @@
+from __future__ import absolute_import
+
+from array import array
+from distutils.util import strtobool
+import gc
+import os
+import time
+
+from iopipe.monotonic import monotonic
+from iopipe.plugins import Plugin
+
+timer = getattr(time, "perf_counter", monotonic)
+
+GENERATIONS = 3
+
+
+class GCPlugin(Plugin):
+    name = "gc"
+    version = "1.0.0"
+    homepage = "https://github.com/iopipe/iopipe-python#gc-plugin"
+
+    def __init__(self, enabled=False, timeline=False, max_pauses=10):
+        """
+        Instantiates the garbage collector plugin
+
+        :param enabled: Whether or not garbage collection should be instrumented for
+                        all invocations. Alternatively this plugin can be
+                        enabled/disabled via the `IOPIPE_GC_ENABLED` environment
+                        variable.
+        :type enabled: bool
+        :param timeline: Whether or not to add the longest pauses to the trace
+                         timeline. Alternatively this can be enabled/disabled via the
+                         `IOPIPE_GC_TIMELINE_ENABLED` environment variable.
+        :type timeline: bool
+        :param max_pauses: The number of longest pauses to add to the timeline.
+        :type max_pauses: int
+        """
+        self._enabled = enabled
+        self.timeline = timeline
+        if "IOPIPE_GC_TIMELINE_ENABLED" in os.environ:
+            self.timeline = bool(strtobool(os.environ["IOPIPE_GC_TIMELINE_ENABLED"]))
+        self.max_pauses = max(1, max_pauses)
+        self.registered = False
+        self.reset()
+
+    @property
+    def enabled(self):
+        return (
+            self._enabled is True
+            or bool(strtobool(os.getenv("IOPIPE_GC_ENABLED", "false")))
+        ) and hasattr(gc, "callbacks")
+
+    def reset(self):
+        self.collected = 0
+        self.counts = [0] * GENERATIONS
+        self.pause_start = 0.0
+        self.total_pause = 0.0
+        self.uncollectable = 0
+
+        # The longest pauses are kept in preallocated arrays, replacing the shortest
+        self.pause_durations = array("d", [0.0]) * self.max_pauses
+        self.pause_generations = array("b", [0]) * self.max_pauses
+        self.pause_starts = array("d", [0.0]) * self.max_pauses
+        self.shortest_pause = 0
+
+    def callback(self, phase, info):
+        """
+        Records a garbage collection, called by the garbage collector at the start
+        and end of each collection. This avoids allocating beyond the floats for
+        timing, as it runs during collections.
+        """
+        if phase == "start":
+            self.pause_start = timer()
+            return
+
+        duration = timer() - self.pause_start
+        generation = info["generation"]
+        self.counts[generation] += 1
+        self.collected += info["collected"]
+        self.uncollectable += info["uncollectable"]
+        self.total_pause += duration
+
+        durations = self.pause_durations
+        index = self.shortest_pause
+        if duration > durations[index]:
+            durations[index] = duration
+            self.pause_generations[index] = generation
+            self.pause_starts[index] = self.pause_start
+            for i in range(self.max_pauses):
+                if durations[i] < durations[index]:
+                    index = i
+            self.shortest_pause = index
+
+    def register(self):
+        if not self.registered:
+            gc.callbacks.append(self.callback)
+            self.registered = True
+
+    def unregister(self):
+        if self.registered:
+            try:
+                gc.callbacks.remove(self.callback)
+            except ValueError:
+                pass
+            self.registered = False
+
+    def pre_setup(self, iopipe):
+        pass
+
+    def post_setup(self, iopipe):
+        pass
+
+    def pre_invoke(self, event, context):
+        self.context = context
+        self.start_time = timer()
+        self.start_timestamp = time.time()
+        self.reset()
+
+        if self.enabled:
+            self.register()
+
+    def post_invoke(self, event, context):
+        if self.registered:
+            self.unregister()
+
+            for generation, count in enumerate(self.counts):
+                self.context.iopipe.metric(
+                    "@iopipe/gc.collections.gen%s" % generation, count
+                )
+            self.context.iopipe.metric("@iopipe/gc.collected", self.collected)
+            self.context.iopipe.metric(
+                "@iopipe/gc.max_pause_ms", round(max(self.pause_durations) * 1000, 3)
+            )
+            self.context.iopipe.metric(
+                "@iopipe/gc.pause_ms", round(self.total_pause * 1000, 3)
+            )
+            self.context.iopipe.metric("@iopipe/gc.uncollectable", self.uncollectable)
+            self.context.iopipe.label("@iopipe/plugin-gc")
+
+    def post_response(self, response):
+        pass
+
+    def pre_report(self, report):
+        if self.timeline:
+            for i in range(self.max_pauses):
+                duration = self.pause_durations[i]
+                if duration == 0:
+                    continue
+                start_time = self.pause_starts[i] - self.start_time
+                report.performance_entries.append(
+                    {
+                        "name": "measure:@iopipe/gc:gen%s" % self.pause_generations[i],
+                        "startTime": start_time * 1000,
+                        "duration": duration * 1000,
+                        "entryType": "measure",
+                        "timestamp": int((self.start_timestamp + start_time) * 1000),
+                    }
+                )
+
+    def post_report(self, report):
+        pass
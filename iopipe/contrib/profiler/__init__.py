@@ -1 +1,2 @@
+from .memory import MemoryProfilerPlugin  # noqa
 from .plugin import ProfilerPlugin  # noqa
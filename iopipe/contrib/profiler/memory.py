@@ -0,0 +1,270 @@
+from distutils.util import strtobool
+import logging
+import os
+import random
+import warnings
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+from iopipe.plugins import Plugin
+from iopipe.signer import get_signed_request
+
+from .request import upload_profile
+from .util import get_result
+
+logger = logging.getLogger(__name__)
+
+
+def filter_snapshot(snapshot):
+    """
+    Returns a snapshot without the allocations made by tracemalloc and the import
+    machinery.
+
+    :param snapshot: The snapshot to filter.
+    :type snapshot: tracemalloc.Snapshot
+    :rtype: tracemalloc.Snapshot
+    """
+    return snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+
+
+def get_snapshot():
+    """
+    Returns a snapshot of traced allocations, excluding those made by tracemalloc
+    and the import machinery.
+
+    :returns: The snapshot.
+    :rtype: tracemalloc.Snapshot
+    """
+    return filter_snapshot(tracemalloc.take_snapshot())
+
+
+def compare_snapshots(snapshot, start, key_type, top_n):
+    """
+    Compares a snapshot to the snapshot taken at the start of the invocation. This is
+    intended to be run in the agent's thread pool, so it doesn't block the handler
+    thread.
+
+    :param snapshot: The unfiltered snapshot taken at the end of the invocation.
+    :type snapshot: tracemalloc.Snapshot
+    :param start: The snapshot taken at the start of the invocation.
+    :type start: tracemalloc.Snapshot
+    :param key_type: How allocations are grouped, `lineno` or `traceback`.
+    :type key_type: str
+    :param top_n: The number of allocation sites to format for the report.
+    :type top_n: int
+    :returns: The snapshot diff and its top allocation sites.
+    :rtype: tuple
+    """
+    stats = filter_snapshot(snapshot).compare_to(start, key_type)
+    return stats, [format_stat(s) for s in stats[:top_n]]
+
+
+def dump_snapshot_diff(stats):
+    """
+    Serializes a snapshot diff as text, with the full traceback of each allocation
+    site when more than one frame was stored.
+
+    :param stats: The snapshot diff.
+    :type stats: list
+    :returns: The serialized snapshot diff.
+    :rtype: bytes
+    """
+    lines = []
+    for stat in stats:
+        lines.append(str(stat))
+        if len(stat.traceback) > 1:
+            lines.extend(stat.traceback.format())
+    return "".join("%s\n" % line for line in lines).encode("utf-8")
+
+
+def format_stat(stat):
+    """
+    Returns an allocation site's statistics from a snapshot diff.
+
+    :param stat: The snapshot diff statistic.
+    :type stat: tracemalloc.StatisticDiff
+    :rtype: dict
+    """
+    return {
+        "count": stat.count,
+        "count_diff": stat.count_diff,
+        "size": stat.size,
+        "size_diff": stat.size_diff,
+        "traceback": ["%s:%s" % (f.filename, f.lineno) for f in stat.traceback],
+    }
+
+
+class MemoryProfilerPlugin(Plugin):
+    name = "memory-profiler"
+    version = "1.0.0"
+    homepage = "https://github.com/iopipe/iopipe-python#memory-profiler-plugin"
+
+    def __init__(
+        self, enabled=False, sample_rate=None, frame_depth=None, top_n=10, upload=True
+    ):
+        """
+        Instantiates the memory profiler plugin
+
+        :param enabled: Whether or not the memory profiler should be enabled for all
+                        invocations. Alternatively this plugin can be
+                        enabled/disabled via the `IOPIPE_MEMORY_PROFILER_ENABLED`
+                        environment variable.
+        :type enabled: bool
+        :param sample_rate: The fraction of invocations to profile, between 0 and 1.
+                            Alternatively this can be set via the
+                            `IOPIPE_MEMORY_PROFILER_SAMPLE_RATE` environment variable.
+                            Defaults to 1.
+        :type sample_rate: float
+        :param frame_depth: The number of frames stored per allocation, higher values
+                            give more context at a greater overhead. Alternatively
+                            this can be set via the
+                            `IOPIPE_MEMORY_PROFILER_FRAME_DEPTH` environment variable.
+                            Defaults to 1.
+        :type frame_depth: int
+        :param top_n: The number of allocation sites with the largest size change to
+                      include in the report.
+        :type top_n: int
+        :param upload: Whether or not to upload the full snapshot diff.
+        :type upload: bool
+        """
+        self._enabled = enabled
+        self.sample_rate = self.get_option(
+            sample_rate, "IOPIPE_MEMORY_PROFILER_SAMPLE_RATE", 1.0, float
+        )
+        self.sample_rate = min(max(self.sample_rate, 0.0), 1.0)
+        self.frame_depth = max(
+            1,
+            self.get_option(frame_depth, "IOPIPE_MEMORY_PROFILER_FRAME_DEPTH", 1, int),
+        )
+        self.top_n = top_n
+        self.upload = upload
+
+        self.peak = None
+        self.snapshot = None
+        self.stats = None
+        self.started = False
+
+    @property
+    def enabled(self):
+        return (
+            self._enabled is True
+            or bool(strtobool(os.getenv("IOPIPE_MEMORY_PROFILER_ENABLED", "false")))
+        ) and tracemalloc is not None
+
+    def get_option(self, value, env_var, default, type_):
+        if value is None:
+            value = os.getenv(env_var, default)
+        try:
+            return type_(value)
+        except ValueError:
+            warnings.warn(
+                "IOpipe's %s must be of type %s, using the default of %s"
+                % (env_var, type_.__name__, default)
+            )
+            return default
+
+    def pre_setup(self, iopipe):
+        self.iopipe = iopipe
+
+    def post_setup(self, iopipe):
+        pass
+
+    def pre_invoke(self, event, context):
+        self.context = context
+        self.signed_request = None
+        self.snapshot = None
+        self.stats = None
+        self.started = False
+
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+
+        if self.upload:
+            self.signed_request = self.iopipe.submit_future(
+                get_signed_request, self.iopipe.config, self.context, ".tracemalloc"
+            )
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frame_depth)
+            self.started = True
+        elif hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+        self.snapshot = get_snapshot()
+
+    def take_snapshot(self):
+        """
+        Takes the snapshot at the end of the invocation and compares it to the start
+        snapshot in the thread pool, so the response isn't held up by the comparison.
+        """
+        snapshot = tracemalloc.take_snapshot()
+        _, self.peak = tracemalloc.get_traced_memory()
+        if self.started:
+            tracemalloc.stop()
+
+        key_type = "traceback" if self.frame_depth > 1 else "lineno"
+        self.stats = self.iopipe.submit_future(
+            compare_snapshots, snapshot, self.snapshot, key_type, self.top_n
+        )
+        self.snapshot = None
+
+    def post_invoke(self, event, context):
+        if self.snapshot is not None:
+            self.take_snapshot()
+            self.context.iopipe.label("@iopipe/plugin-memory-profiler")
+
+    def post_response(self, response):
+        pass
+
+    def pre_report(self, report):
+        if self.snapshot is not None:
+            self.take_snapshot()
+        if self.stats is None:
+            return
+
+        done, result = get_result(self.stats, self.iopipe.config, self.context)
+        self.stats = None
+        if not done:
+            logger.debug("Timed out waiting for memory profiler snapshot diff")
+            return
+        stats, allocations = result
+
+        plugin = next((p for p in report.plugins if p["name"] == self.name))
+        plugin["allocations"] = allocations
+        plugin["peak"] = self.peak
+
+        if self.signed_request is None:
+            return
+        done, self.signed_request = get_result(
+            self.signed_request, self.iopipe.config, self.context
+        )
+        if not done:
+            logger.debug("Timed out waiting for memory profiler signed request")
+            return
+
+        if self.signed_request is not None and "signedRequest" in self.signed_request:
+            # Serialization and upload both happen in the thread pool
+            self.iopipe.submit_future(
+                upload_profile,
+                self.signed_request["signedRequest"],
+                dump_snapshot_diff,
+                stats,
+                self.iopipe.config,
+            )
+            if "jwtAccess" in self.signed_request:
+                if "uploads" not in plugin:
+                    plugin["uploads"] = []
+                plugin["uploads"].append(self.signed_request["jwtAccess"])
+
+    def post_report(self, report):
+        pass
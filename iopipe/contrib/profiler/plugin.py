@@ -1,4 +1,4 @@
-from concurrent.futures import Future, wait
+import collections
 from distutils.util import strtobool
 import logging
 import os
@@ -7,22 +7,47 @@ try:
     import cProfile as profile
 except ImportError:
     import profile
-import tempfile
+import pstats
+import threading
+import warnings
 
+from iopipe.monotonic import monotonic
 from iopipe.plugins import Plugin
 from iopipe.signer import get_signed_request
+from iopipe.sketch import QuantileSketch
+from iopipe.stack import StackSampler
 
-from .request import upload_profiler_report
+from .request import dump_folded, dump_stats, upload_profile
+from .summary import summarize_folded, summarize_stats
+from .util import get_result
 
 logger = logging.getLogger(__name__)
 
+PROFILER_MODES = ("cprofile", "sampling")
+RETENTION_MODES = ("all", "tail")
+
+# The number of invocations observed before the percentile trigger applies
+RETENTION_WARMUP = 20
+
 
 class ProfilerPlugin(Plugin):
     name = "profiler"
     version = "1.0.0"
     homepage = "https://github.com/iopipe/iopipe-python#profiler-plugin"
 
-    def __init__(self, enabled=False):
+    def __init__(
+        self,
+        enabled=False,
+        mode=None,
+        sample_interval=None,
+        retention=None,
+        retention_percentile=None,
+        aggregate_invocations=None,
+        aggregate_seconds=None,
+        compress=None,
+        summary=None,
+        upload=None,
+    ):
         """
         Instantiates the profiler plugin
 
@@ -30,15 +55,203 @@ class ProfilerPlugin(Plugin):
                         invocations. Alternatively this plugin can be enabled/disabled
                         via the `IOPIPE_PROFILER_ENABLED` environment variable.
         :type enabled: bool
+        :param mode: Either `cprofile` for deterministic profiling, or `sampling` for
+                     low overhead statistical profiling. Alternatively this can be set
+                     via the `IOPIPE_PROFILER_MODE` environment variable. Defaults to
+                     `sampling` with tail retention, and `cprofile` otherwise.
+        :type mode: str
+        :param sample_interval: The sampling interval in milliseconds, in sampling
+                                mode. Alternatively this can be set via the
+                                `IOPIPE_PROFILER_SAMPLE_INTERVAL` environment
+                                variable. Defaults to 10.
+        :type sample_interval: int
+        :param retention: Either `all` to upload a profile for every invocation, or
+                          `tail` to upload only the profiles of invocations slower
+                          than `retention_percentile`, or that errored or timed out.
+                          Alternatively this can be set via the
+                          `IOPIPE_PROFILER_RETENTION` environment variable. Defaults
+                          to `all`.
+        :type retention: str
+        :param retention_percentile: The duration percentile above which profiles are
+                                     retained, in tail retention. Alternatively this
+                                     can be set via the
+                                     `IOPIPE_PROFILER_RETENTION_PERCENTILE`
+                                     environment variable. Defaults to 95.
+        :type retention_percentile: float
+        :param aggregate_invocations: The number of invocations whose profiles are
+                                      merged into a single uploaded profile.
+                                      Alternatively this can be set via the
+                                      `IOPIPE_PROFILER_AGGREGATE_INVOCATIONS`
+                                      environment variable. Defaults to 0, which
+                                      disables aggregation.
+        :type aggregate_invocations: int
+        :param aggregate_seconds: The number of seconds over which profiles are
+                                  merged into a single uploaded profile.
+                                  Alternatively this can be set via the
+                                  `IOPIPE_PROFILER_AGGREGATE_SECONDS` environment
+                                  variable. Defaults to 0, which disables
+                                  aggregation.
+        :type aggregate_seconds: float
+        :param compress: Whether or not to gzip profiles before uploading them.
+                         Alternatively this can be enabled/disabled via the
+                         `IOPIPE_PROFILER_COMPRESS` environment variable. Defaults to
+                         False.
+        :type compress: bool
+        :param summary: The number of functions with the longest cumulative time to
+                        include in the report. Alternatively this can be set via the
+                        `IOPIPE_PROFILER_SUMMARY` environment variable. Defaults to
+                        0, which disables the summary.
+        :type summary: int
+        :param upload: Whether or not to upload profiles. Alternatively this can be
+                       enabled/disabled via the `IOPIPE_PROFILER_UPLOAD` environment
+                       variable. Defaults to True.
+        :type upload: bool
         """
         self._enabled = enabled
 
+        self.retention = (
+            retention or os.getenv("IOPIPE_PROFILER_RETENTION", "all")
+        ).lower()
+        if self.retention not in RETENTION_MODES:
+            warnings.warn(
+                "IOpipe's profiler retention must be one of: %s"
+                % ", ".join(RETENTION_MODES)
+            )
+            self.retention = "all"
+
+        # Tail retention profiles every invocation, so it defaults to the cheaper
+        # sampling mode
+        default_mode = "sampling" if self.retention == "tail" else "cprofile"
+        self.mode = (mode or os.getenv("IOPIPE_PROFILER_MODE", default_mode)).lower()
+        if self.mode not in PROFILER_MODES:
+            warnings.warn(
+                "IOpipe's profiler mode must be one of: %s" % ", ".join(PROFILER_MODES)
+            )
+            self.mode = default_mode
+
+        if sample_interval is None:
+            sample_interval = os.getenv("IOPIPE_PROFILER_SAMPLE_INTERVAL", 10)
+        try:
+            self.sample_interval = max(int(sample_interval), 1) / 1000.0
+        except ValueError:
+            self.sample_interval = 0.01
+
+        if retention_percentile is None:
+            retention_percentile = os.getenv("IOPIPE_PROFILER_RETENTION_PERCENTILE", 95)
+        try:
+            self.retention_percentile = min(max(float(retention_percentile), 0), 100)
+        except ValueError:
+            self.retention_percentile = 95.0
+
+        if aggregate_invocations is None:
+            aggregate_invocations = os.getenv(
+                "IOPIPE_PROFILER_AGGREGATE_INVOCATIONS", 0
+            )
+        try:
+            self.aggregate_invocations = max(int(aggregate_invocations), 0)
+        except ValueError:
+            self.aggregate_invocations = 0
+
+        if aggregate_seconds is None:
+            aggregate_seconds = os.getenv("IOPIPE_PROFILER_AGGREGATE_SECONDS", 0)
+        try:
+            self.aggregate_seconds = max(float(aggregate_seconds), 0)
+        except ValueError:
+            self.aggregate_seconds = 0
+
+        if compress is None:
+            compress = strtobool(os.getenv("IOPIPE_PROFILER_COMPRESS", "false"))
+        self.compress = bool(compress)
+
+        if summary is None:
+            summary = os.getenv("IOPIPE_PROFILER_SUMMARY", 0)
+        try:
+            self.summary = max(int(summary), 0)
+        except ValueError:
+            self.summary = 0
+
+        if upload is None:
+            upload = strtobool(os.getenv("IOPIPE_PROFILER_UPLOAD", "true"))
+        self.upload = bool(upload)
+
+        # Durations and the aggregation window persist across invocations for as
+        # long as the container is warm
+        self.durations = QuantileSketch()
+        self.reset_window()
+
     @property
     def enabled(self):
         return self._enabled is True or bool(
             strtobool(os.getenv("IOPIPE_PROFILER_ENABLED", "false"))
         )
 
+    @property
+    def aggregating(self):
+        return self.aggregate_invocations > 0 or self.aggregate_seconds > 0
+
+    @property
+    def extension(self):
+        extension = ".folded" if self.mode == "sampling" else ".cprofile"
+        if self.compress:
+            extension += ".gz"
+        return extension
+
+    def reset_window(self):
+        self.window_counts = collections.Counter()
+        self.window_invocations = 0
+        self.window_start = None
+        self.window_stats = None
+
+    def aggregate(self):
+        """
+        Merges the current invocation's profile into the aggregation window.
+
+        :returns: Whether or not the window is complete and should be uploaded.
+        :rtype: bool
+        """
+        if self.window_start is None:
+            self.window_start = monotonic()
+        self.window_invocations += 1
+
+        if self.sampler is not None:
+            self.window_counts.update(self.sampler.counts)
+        elif self.window_stats is None:
+            self.window_stats = pstats.Stats(self.profile)
+        else:
+            self.window_stats.add(self.profile)
+
+        if self.aggregate_invocations > 0:
+            if self.window_invocations >= self.aggregate_invocations:
+                return True
+        if self.aggregate_seconds > 0:
+            if monotonic() - self.window_start >= self.aggregate_seconds:
+                return True
+        return False
+
+    def get_retention_trigger(self, report):
+        """
+        Returns why an invocation's profile should be retained, recording its duration.
+
+        :param report: The invocation's report.
+        :type report: iopipe.report.Report
+        :returns: The trigger, or None if the profile should be dropped.
+        :rtype: str
+        """
+        duration = report.report["duration"]
+        trigger = None
+
+        if "@iopipe/timeout" in report.labels:
+            trigger = "timeout"
+        elif "@iopipe/error" in report.labels:
+            trigger = "error"
+        elif len(self.durations) >= RETENTION_WARMUP:
+            threshold = self.durations.quantile(self.retention_percentile / 100.0)
+            if duration > threshold:
+                trigger = "p%g" % self.retention_percentile
+
+        self.durations.add(duration)
+        return trigger
+
     def pre_setup(self, iopipe):
         self.iopipe = iopipe
 
@@ -48,48 +261,123 @@ class ProfilerPlugin(Plugin):
     def pre_invoke(self, event, context):
         self.context = context
         self.profile = None
+        self.sampler = None
         self.signed_request = None
-        self.stats_file = None
+        self.summary_future = None
 
         if self.enabled:
-            self.signed_request = self.iopipe.submit_future(
-                get_signed_request, self.iopipe.config, self.context, ".cprofile"
-            )
-            self.profile = profile.Profile()
-            self.profile.enable()
+            # In tail retention or when aggregating, signing waits until the profile
+            # is known to be uploaded
+            if self.upload and self.retention == "all" and not self.aggregating:
+                self.signed_request = self.iopipe.submit_future(
+                    get_signed_request,
+                    self.iopipe.config,
+                    self.context,
+                    self.extension,
+                )
+            if self.mode == "sampling":
+                self.sampler = StackSampler(
+                    threading.current_thread().ident, self.sample_interval
+                )
+                self.sampler.start()
+            else:
+                self.profile = profile.Profile()
+                self.profile.enable()
 
     def post_invoke(self, event, context):
         if self.profile is not None:
             self.profile.disable()
             self.context.iopipe.label("@iopipe/plugin-profiler")
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.context.iopipe.label("@iopipe/plugin-profiler")
+
+        # The summary is computed in the thread pool while the response is returned
+        if self.summary > 0:
+            if self.sampler is not None:
+                self.summary_future = self.iopipe.submit_future(
+                    summarize_folded,
+                    self.sampler.counts,
+                    self.sample_interval,
+                    self.summary,
+                )
+            elif self.profile is not None:
+                self.summary_future = self.iopipe.submit_future(
+                    summarize_stats, self.profile, self.summary
+                )
 
     def post_response(self, response):
         pass
 
     def pre_report(self, report):
-        if self.profile is not None:
-            if self.signed_request is not None:
-                if isinstance(self.signed_request, Future):
-                    wait([self.signed_request])
-                    self.signed_request = self.signed_request.result()
-            if (
-                self.signed_request is not None
-                and "signedRequest" in self.signed_request
-            ):
-                with tempfile.NamedTemporaryFile(delete=False) as stats_file:
-                    self.profile.dump_stats(stats_file.name)
-                    self.iopipe.submit_future(
-                        upload_profiler_report,
-                        self.signed_request["signedRequest"],
-                        stats_file.name,
-                        self.iopipe.config,
-                    )
-                    self.stats_file = stats_file.name
-                if "jwtAccess" in self.signed_request:
-                    plugin = next((p for p in report.plugins if p["name"] == self.name))
-                    if "uploads" not in plugin:
-                        plugin["uploads"] = []
-                    plugin["uploads"].append(self.signed_request["jwtAccess"])
+        if self.profile is None and self.sampler is None:
+            return
+
+        plugin = next((p for p in report.plugins if p["name"] == self.name))
+        profile, counts = self.profile, self.sampler and self.sampler.counts
+
+        if self.summary_future is not None:
+            done, summary = get_result(
+                self.summary_future, self.iopipe.config, self.context
+            )
+            self.summary_future = None
+            if not done:
+                # The profile is still being read, so it can't be merged or uploaded
+                logger.debug("Timed out waiting for profiler summary")
+                self.profile = None
+                self.sampler = None
+                return
+            plugin["summary"] = summary
+
+        if not self.upload:
+            return
+
+        if self.retention == "tail":
+            trigger = self.get_retention_trigger(report)
+            if trigger is None:
+                self.profile = None
+                self.sampler = None
+                return
+            plugin["retention"] = trigger
+
+        if self.aggregating:
+            complete = self.aggregate()
+            self.profile = None
+            self.sampler = None
+            if not complete:
+                return
+            profile, counts = self.window_stats, self.window_counts
+            plugin["aggregate"] = {
+                "duration": round((monotonic() - self.window_start) * 1000, 3),
+                "invocations": self.window_invocations,
+            }
+            self.reset_window()
+
+        if self.signed_request is None:
+            self.signed_request = self.iopipe.submit_future(
+                get_signed_request, self.iopipe.config, self.context, self.extension
+            )
+        done, self.signed_request = get_result(
+            self.signed_request, self.iopipe.config, self.context
+        )
+        if not done:
+            logger.debug("Timed out waiting for profiler report signed request")
+            return
+
+        if self.signed_request is not None and "signedRequest" in self.signed_request:
+            # Serialization and upload both happen in the thread pool
+            self.iopipe.submit_future(
+                upload_profile,
+                self.signed_request["signedRequest"],
+                dump_folded if self.mode == "sampling" else dump_stats,
+                counts if self.mode == "sampling" else profile,
+                self.iopipe.config,
+                self.compress,
+            )
+            if "jwtAccess" in self.signed_request:
+                if "uploads" not in plugin:
+                    plugin["uploads"] = []
+                plugin["uploads"].append(self.signed_request["jwtAccess"])
 
     def post_report(self, report):
         pass
@@ -1,26 +1,76 @@
+import gzip
+import io
 import logging
-import os
+import marshal
 
 try:
     import requests
 except ImportError:
     from botocore.vendored import requests
 
+from .summary import get_stats
+
 logger = logging.getLogger(__name__)
 
 
-def upload_profiler_report(url, filename, config):
+def dump_stats(profile):
+    """
+    Serializes a profile in the format written by `pstats.Stats.dump_stats`
+
+    :param profile: A disabled `cProfile.Profile` or a `pstats.Stats`
+    :returns: The serialized profile
+    :rtype: bytes
+    """
+    return marshal.dumps(get_stats(profile))
+
+
+def dump_folded(counts):
+    """
+    Serializes sampled stacks in folded format, as used by flamegraph.pl and
+    speedscope
+
+    :param counts: The sample counts of each folded stack
+    :type counts: collections.Counter
+    :returns: The serialized stacks
+    :rtype: bytes
+    """
+    return "".join(
+        "%s %s\n" % (stack, count) for stack, count in counts.most_common()
+    ).encode("utf-8")
+
+
+def compress(data):
+    """
+    Compresses data in gzip format
+
+    :param data: The data to compress
+    :returns: The compressed data
+    :rtype: bytes
+    """
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6) as gzip_file:
+        gzip_file.write(data)
+    return buf.getvalue()
+
+
+def upload_profile(url, dump, profile, config, compressed=False):
     """
-    Uploads a profiler report to IOpipe
+    Serializes a profile and uploads it to IOpipe from memory. This is intended to be
+    run in the agent's thread pool, so serialization doesn't block the handler
+    thread.
 
     :param url: The signed URL
-    :param filename: The profiler report file
+    :param dump: The function that serializes the profile
+    :param profile: The profile to serialize
     :param config: The IOpipe config
+    :param compressed: Whether or not to compress the profile
     """
     try:
+        data = dump(profile)
+        if compressed:
+            data = compress(data)
         logger.debug("Uploading profiler report to IOpipe")
-        with open(filename, "rb") as data:
-            response = requests.put(url, data=data, timeout=config["network_timeout"])
+        response = requests.put(url, data=data, timeout=config["network_timeout"])
         response.raise_for_status()
     except Exception as e:
         logger.debug("Error while uploading profiler report: %s", e)
@@ -28,6 +78,3 @@ def upload_profiler_report(url, filename, config):
             logger.debug(e.response.content)
     else:
         logger.debug("Profiler report uploaded successfully")
-    finally:
-        if os.path.isfile(filename):
-            os.remove(filename)
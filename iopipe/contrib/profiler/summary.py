@@ -0,0 +1,71 @@
+import collections
+
+
+def get_stats(profile):
+    """
+    Returns the stats of a profile, snapshotting them if needed
+
+    :param profile: A disabled `cProfile.Profile` or a `pstats.Stats`
+    :returns: A dict of functions to their call counts and times
+    :rtype: dict
+    """
+    if getattr(profile, "stats", None) is None:
+        profile.create_stats()
+    return profile.stats
+
+
+def summarize_stats(profile, top_n=20):
+    """
+    Returns the functions with the longest cumulative time in a profile
+
+    :param profile: A disabled `cProfile.Profile` or a `pstats.Stats`
+    :param top_n: The number of functions to include
+    :returns: A list of dicts with each function's call count and times in
+              milliseconds
+    :rtype: list
+    """
+    stats = get_stats(profile)
+    top = sorted(stats.items(), key=lambda s: s[1][3], reverse=True)[:top_n]
+    return [
+        {
+            "function": "%s:%s(%s)" % func,
+            "ncalls": nc,
+            "tottime": round(tt * 1000, 3),
+            "cumtime": round(ct * 1000, 3),
+        }
+        for func, (cc, nc, tt, ct, callers) in top
+    ]
+
+
+def summarize_folded(counts, interval, top_n=20):
+    """
+    Returns the functions most often on the stack in sampled stacks. Times are
+    estimated from sample counts.
+
+    :param counts: The sample counts of each folded stack
+    :type counts: collections.Counter
+    :param interval: The sampling interval, in seconds
+    :param top_n: The number of functions to include
+    :returns: A list of dicts with each function's sample count and estimated
+              times in milliseconds
+    :rtype: list
+    """
+    cumulative = collections.Counter()
+    own = collections.Counter()
+    for stack, count in counts.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        # Recursive functions are only counted once per stack
+        for frame in set(frames):
+            cumulative[frame] += count
+
+    interval *= 1000
+    return [
+        {
+            "function": frame,
+            "samples": count,
+            "tottime": round(own[frame] * interval, 3),
+            "cumtime": round(count * interval, 3),
+        }
+        for frame, count in cumulative.most_common(top_n)
+    ]
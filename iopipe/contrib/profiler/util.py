@@ -0,0 +1,40 @@
+from concurrent.futures import Future, wait
+
+
+def get_wait_timeout(config, context):
+    """
+    Returns how long the handler thread can wait for the thread pool, bound by the
+    time remaining before the invocation times out.
+
+    :param config: The IOpipe config.
+    :param context: The invocation's context.
+    :returns: The timeout, in seconds.
+    :rtype: float
+    """
+    timeout = config["network_timeout"]
+    if hasattr(context, "get_remaining_time_in_millis") and callable(
+        context.get_remaining_time_in_millis
+    ):
+        remaining = (
+            context.get_remaining_time_in_millis() / 1000.0 - config["timeout_window"]
+        )
+        timeout = min(timeout, max(remaining, 0))
+    return timeout
+
+
+def get_result(future, config, context):
+    """
+    Waits for a future submitted to the thread pool, bound by the time remaining.
+
+    :param future: The future, or an already computed result.
+    :param config: The IOpipe config.
+    :param context: The invocation's context.
+    :returns: Whether or not the future completed, and its result.
+    :rtype: tuple
+    """
+    if not isinstance(future, Future):
+        return True, future
+    done, _ = wait([future], timeout=get_wait_timeout(config, context))
+    if not done:
+        return False, None
+    return True, future.result()
@@ -0,0 +1,93 @@
+from distutils.util import strtobool
+import os
+import warnings
+
+from iopipe.plugins import Plugin
+from iopipe.report import proc_reader
+
+from .sampler import ResourceSampler
+
+
+class SamplerPlugin(Plugin):
+    name = "sampler"
+    version = "1.0.0"
+    homepage = "https://github.com/iopipe/iopipe-python#sampler-plugin"
+
+    def __init__(self, enabled=False, interval=None, capacity=1024, max_points=100):
+        """
+        Instantiates the sampler plugin
+
+        :param enabled: Whether or not the sampler should be enabled for all
+                        invocations. Alternatively this plugin can be enabled/disabled
+                        via the `IOPIPE_SAMPLER_ENABLED` environment variable.
+        :type enabled: bool
+        :param interval: The sampling interval in milliseconds. Alternatively this can
+                         be set via the `IOPIPE_SAMPLER_INTERVAL` environment variable.
+                         Defaults to 50.
+        :type interval: int
+        :param capacity: The number of samples kept per invocation, after which the
+                         oldest samples are overwritten.
+        :type capacity: int
+        :param max_points: The maximum number of points in the reported series.
+        :type max_points: int
+        """
+        self._enabled = enabled
+        self._interval = interval
+        self.capacity = capacity
+        self.max_points = max_points
+        self.sampler = None
+
+    @property
+    def enabled(self):
+        return self._enabled is True or bool(
+            strtobool(os.getenv("IOPIPE_SAMPLER_ENABLED", "false"))
+        )
+
+    @property
+    def interval(self):
+        interval = self._interval
+        if interval is None:
+            interval = os.getenv("IOPIPE_SAMPLER_INTERVAL", 50)
+        try:
+            return max(1, int(interval)) / 1000.0
+        except ValueError:
+            warnings.warn(
+                "IOpipe's sampler interval must be an integer in milliseconds, "
+                "using the default of 50"
+            )
+            return 0.05
+
+    def pre_setup(self, iopipe):
+        pass
+
+    def post_setup(self, iopipe):
+        pass
+
+    def pre_invoke(self, event, context):
+        self.context = context
+        self.sampler = None
+
+        if self.enabled:
+            # Shares the report's reader, which keeps /proc files open between
+            # invocations
+            self.sampler = ResourceSampler(self.interval, self.capacity, proc_reader)
+            self.sampler.start()
+
+    def post_invoke(self, event, context):
+        if self.sampler is not None:
+            self.sampler.stop()
+            for key, value in sorted(self.sampler.summary().items()):
+                self.context.iopipe.metric("@iopipe/sampler.%s" % key, value)
+            self.context.iopipe.label("@iopipe/plugin-sampler")
+
+    def post_response(self, response):
+        pass
+
+    def pre_report(self, report):
+        if self.sampler is not None:
+            plugin = next((p for p in report.plugins if p["name"] == self.name))
+            plugin["interval"] = int(self.sampler.interval * 1000)
+            plugin["series"] = self.sampler.buffer.downsample(self.max_points)
+
+    def post_report(self, report):
+        pass
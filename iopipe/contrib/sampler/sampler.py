@@ -0,0 +1,217 @@
+from __future__ import division
+
+from array import array
+import os
+import sys
+import threading
+
+from iopipe.monotonic import monotonic
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+if sys.platform.startswith("linux"):
+    from iopipe import system
+else:  # pragma: no cover
+    from iopipe import mock_system as system
+
+try:
+    CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    CLOCK_TICKS = 100
+
+FIELDS = ("time", "rss", "cpu", "threads")
+TYPECODES = {"time": "d", "rss": "l", "cpu": "d", "threads": "l"}
+
+
+class RingBuffer(object):
+    """
+    A fixed capacity buffer of samples, stored as one typed array per field. Once
+    full, the oldest samples are overwritten.
+    """
+
+    def __init__(self, capacity):
+        """
+        Instantiates a new ring buffer.
+
+        :param capacity: The maximum number of samples to hold.
+        :type capacity: int
+        """
+        self.capacity = capacity
+        self.arrays = dict(
+            (field, array(TYPECODES[field], [0]) * capacity) for field in FIELDS
+        )
+        self.count = 0
+        self.index = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, *values):
+        """
+        Adds a sample to the buffer.
+
+        :param values: The sample's values, in the order of `FIELDS`.
+        """
+        for field, value in zip(FIELDS, values):
+            self.arrays[field][self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        self.count += 1
+
+    def series(self, field):
+        """
+        Returns the samples for a field, oldest first.
+
+        :param field: The name of the field.
+        :returns: The field's samples.
+        :rtype: list
+        """
+        data = self.arrays[field]
+        if self.count <= self.capacity:
+            return data[: self.count].tolist()
+        return (data[self.index :] + data[: self.index]).tolist()
+
+    def downsample(self, max_points):
+        """
+        Returns the samples reduced to at most `max_points` points. Each point is the
+        maximum of a bucket of consecutive samples, so that spikes aren't averaged
+        away.
+
+        :param max_points: The maximum number of points per field.
+        :returns: A dict of field names to lists of points.
+        :rtype: dict
+        """
+        series = dict((field, self.series(field)) for field in FIELDS)
+        size = len(self)
+        if size <= max_points:
+            return series
+
+        downsampled = dict((field, []) for field in FIELDS)
+        for i in range(max_points):
+            start = i * size // max_points
+            end = (i + 1) * size // max_points
+            downsampled["time"].append(series["time"][start])
+            for field in FIELDS[1:]:
+                downsampled[field].append(max(series[field][start:end]))
+        return downsampled
+
+
+class ResourceSampler(threading.Thread):
+    """
+    A daemon thread that periodically samples the process' RSS, CPU usage and
+    thread count.
+    """
+
+    def __init__(self, interval, capacity, reader=None):
+        """
+        Instantiates a new resource sampler.
+
+        :param interval: The sampling interval, in seconds.
+        :type interval: float
+        :param capacity: The number of samples to keep.
+        :type capacity: int
+        :param reader: The /proc reader to sample with, which is left open when the
+                       sampler stops. Defaults to a new reader owned by the sampler.
+        :type reader: iopipe.system.ProcReader
+        """
+        super(ResourceSampler, self).__init__(name="iopipe-sampler")
+        self.daemon = True
+        self.buffer = RingBuffer(capacity)
+        self.interval = interval
+        self.overhead = 0.0
+        self.owns_reader = reader is None
+        self.reader = system.ProcReader() if reader is None else reader
+        self.stopped = threading.Event()
+
+        self.cpu = 0.0
+        self.cpu_peak = 0.0
+        self.cpu_total = 0.0
+        self.rss_peak = 0
+        self.rss_total = 0
+        self.threads_peak = 0
+
+        self.start_time = self.last_time = monotonic()
+        self.last_cpu_time = self.read_cpu_time()
+
+    def read_cpu_time(self):
+        """
+        Returns the CPU time used by the process. `getrusage` is used where available
+        as /proc only counts whole clock ticks, which are too coarse for short
+        intervals.
+
+        :returns: The user and system CPU time, in seconds.
+        :rtype: float
+        """
+        if resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            return usage.ru_utime + usage.ru_stime
+        stat = self.reader.read_pid_stat()
+        return (stat["utime"] + stat["stime"]) / CLOCK_TICKS
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """
+        Takes a single sample and updates the running aggregates.
+        """
+        start = monotonic()
+
+        cpu_time = self.read_cpu_time()
+        status = self.reader.read_pid_status()
+        rss, threads = status.get("VmRSS", 0), status.get("Threads", 0)
+
+        # A sample taken less than an interval after the last one, such as the final
+        # sample taken on stop, is too short for a meaningful CPU reading, so the
+        # last reading is reused
+        elapsed = start - self.last_time
+        if elapsed > 0 and (elapsed >= self.interval or not self.buffer.count):
+            cpu = (cpu_time - self.last_cpu_time) / elapsed * 100
+            self.cpu = round(min(cpu, 100.0 * max(threads, 1)), 2)
+            self.last_time, self.last_cpu_time = start, cpu_time
+        cpu = self.cpu
+
+        self.buffer.append(
+            round((start - self.start_time) * 1000, 3), rss, cpu, threads
+        )
+        self.cpu_peak = max(self.cpu_peak, cpu)
+        self.cpu_total += cpu
+        self.rss_peak = max(self.rss_peak, rss)
+        self.rss_total += rss
+        self.threads_peak = max(self.threads_peak, threads)
+
+        self.overhead += monotonic() - start
+
+    def stop(self):
+        """
+        Stops the sampler, taking a final sample so that short invocations have at
+        least one.
+        """
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.sample()
+        if self.owns_reader:
+            self.reader.close()
+
+    def summary(self):
+        """
+        Returns the peak and mean of each sampled resource, and the sampler's own
+        overhead.
+
+        :returns: A dict of summary metrics.
+        :rtype: dict
+        """
+        count = self.buffer.count
+        return {
+            "cpu.mean": round(self.cpu_total / count, 2) if count else 0,
+            "cpu.peak": self.cpu_peak,
+            "overhead_ms": round(self.overhead * 1000, 3),
+            "rss.mean": int(self.rss_total / count) if count else 0,
+            "rss.peak": self.rss_peak,
+            "samples": count,
+            "threads.peak": self.threads_peak,
+        }
@@ -0,0 +1,110 @@
+import threading
+
+# The upper bounds of the latency histogram's buckets, in milliseconds
+HISTOGRAM_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class TraceAggregate(object):
+    """
+    The count, total, min, max and latency histogram of a group of traces.
+    """
+
+    __slots__ = ("count", "histogram", "max", "min", "total")
+
+    def __init__(self):
+        self.count = 0
+        # The last bucket counts durations above the highest bound
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.max = float("-inf")
+        self.min = float("inf")
+        self.total = 0
+
+    def add(self, duration):
+        """
+        Adds a trace's duration to the aggregate.
+
+        :param duration: The duration of the trace, in milliseconds.
+        """
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        for i, bound in enumerate(HISTOGRAM_BOUNDS):
+            if duration <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self):
+        """
+        Returns the aggregate as a dict, with the histogram's non-empty buckets
+        keyed by their upper bound.
+
+        :rtype: dict
+        """
+        bounds = [str(b) for b in HISTOGRAM_BOUNDS] + ["+Inf"]
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "histogram": dict((b, c) for b, c in zip(bounds, self.histogram) if c),
+        }
+
+
+class TraceBuffer(object):
+    """
+    Adds traces to a list of entries until it's full, then folds them into
+    aggregates by type, host and command, so memory is bound by the number of
+    entries kept however many traces are made.
+    """
+
+    def __init__(self, max_entries=None):
+        """
+        Instantiates a trace buffer.
+
+        :param max_entries: The maximum number of entries kept, unbounded if None.
+        :type max_entries: int
+        """
+        self.aggregated = 0
+        self.aggregates = {}
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+
+    def add(self, entries, entry, key):
+        """
+        Adds a trace to a list of entries, or to its aggregate if the list is full.
+
+        :param entries: The list of entries to add the trace to.
+        :type entries: list
+        :param entry: The trace.
+        :type entry: dict
+        :param key: The type, host and command the trace is aggregated by.
+        :type key: tuple
+        """
+        with self.lock:
+            if self.max_entries is None or len(entries) < self.max_entries:
+                entries.append(entry)
+                return
+            aggregate = self.aggregates.get(key)
+            if aggregate is None:
+                aggregate = self.aggregates[key] = TraceAggregate()
+            aggregate.add(entry["duration"])
+            self.aggregated += 1
+
+    def get_aggregates(self):
+        """
+        Returns the aggregates, ordered by total duration.
+
+        :rtype: list
+        """
+        with self.lock:
+            aggregates = list(self.aggregates.items())
+        aggregates.sort(key=lambda a: a[1].total, reverse=True)
+        result = []
+        for (type, hostname, command), aggregate in aggregates:
+            data = aggregate.to_dict()
+            data.update(type=type, hostname=hostname, command=command)
+            result.append(data)
+        return result
@@ -1,6 +1,5 @@
 import collections
 import sqlparse
-import uuid
 import wrapt
 
 from .dbapi import AdapterProxy, ConnectionProxy, CursorProxy
@@ -168,11 +167,9 @@ def patch_mysqldb(context):
                 self.__wrapped__.execute(*args, **kwargs)
                 return
 
-            id = ensure_utf8(str(uuid.uuid4()))
-            with context.iopipe.mark(id):
+            with context.iopipe.mark.span(record=False) as span:
                 self.__wrapped__.execute(*args, **kwargs)
-            trace = context.iopipe.mark.measure(id)
-            context.iopipe.mark.delete(id)
+            trace = span.entry
             collect_mysql_metrics(context, trace, self, args)
 
     class _ConnectionProxy(ConnectionProxy):
@@ -209,11 +206,9 @@ def patch_psycopg2(context):
                 self.__wrapped__.execute(*args, **kwargs)
                 return
 
-            id = ensure_utf8(str(uuid.uuid4()))
-            with context.iopipe.mark(id):
+            with context.iopipe.mark.span(record=False) as span:
                 self.__wrapped__.execute(*args, **kwargs)
-            trace = context.iopipe.mark.measure(id)
-            context.iopipe.mark.delete(id)
+            trace = span.entry
             collect_psycopg2_metrics(context, trace, self, args)
 
     class _ConnectionProxy(ConnectionProxy):
@@ -267,11 +262,9 @@ def patch_pymongo(context):
         ):  # pragma: no cover
             return wrapped(*args, **kwargs)
 
-        id = ensure_utf8(str(uuid.uuid4()))
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_pymongo_metrics(context, trace, instance, response)
         return response
 
@@ -306,11 +299,9 @@ def patch_pymysql(context):
                 self.__wrapped__.execute(*args, **kwargs)
                 return
 
-            id = ensure_utf8(str(uuid.uuid4()))
-            with context.iopipe.mark(id):
+            with context.iopipe.mark.span(record=False) as span:
                 self.__wrapped__.execute(*args, **kwargs)
-            trace = context.iopipe.mark.measure(id)
-            context.iopipe.mark.delete(id)
+            trace = span.entry
             collect_mysql_metrics(context, trace, self, args)
 
     class _ConnectionProxy(ConnectionProxy):
@@ -340,11 +331,9 @@ def patch_redis(context):
         ):  # pragma: no cover
             return wrapped(*args, **kwargs)
 
-        id = ensure_utf8(str(uuid.uuid4()))
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_redis_metrics(
             context, trace, args, instance.connection_pool.connection_kwargs
         )
@@ -359,11 +348,9 @@ def patch_redis(context):
         # We don't need the entire command stack, just collect a stack count
         pipeline_args = ("PIPELINE", ensure_utf8(len(instance.command_stack)))
 
-        id = ensure_utf8(str(uuid.uuid4()))
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_redis_metrics(
             context, trace, pipeline_args, instance.connection_pool.connection_kwargs
         )
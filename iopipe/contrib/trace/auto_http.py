@@ -1,5 +1,4 @@
 import collections
-import uuid
 import wrapt
 
 from iopipe.compat import string_types, urlparse
@@ -44,11 +43,9 @@ def patch_requests_session_send(context, http_filter, http_headers):
     def wrapper(wrapped, instance, args, kwargs):
         if not hasattr(context, "iopipe") or not hasattr(context.iopipe, "mark"):
             return wrapped(*args, **kwargs)
-        id = ensure_utf8(str(uuid.uuid4()))
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_metrics_for_response(
             response.request, response, context, trace, http_filter, http_headers
         )
@@ -69,11 +66,9 @@ def patch_botocore_session_send(context, http_filter, http_headers):
     def wrapper(wrapped, instance, args, kwargs):
         if not hasattr(context, "iopipe") or not hasattr(context.iopipe, "mark"):
             return wrapped(*args, **kwargs)
-        id = str(uuid.uuid4())
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_metrics_for_response(
             args[0], response, context, trace, http_filter, http_headers
         )
@@ -96,11 +91,9 @@ def patch_botocore_vendored_session_send(context, http_filter, http_headers):
     def wrapper(wrapped, instance, args, kwargs):
         if not hasattr(context, "iopipe") or not hasattr(context.iopipe, "mark"):
             return wrapped(*args, **kwargs)
-        id = str(uuid.uuid4())
-        with context.iopipe.mark(id):
+        with context.iopipe.mark.span(record=False) as span:
             response = wrapped(*args, **kwargs)
-        trace = context.iopipe.mark.measure(id)
-        context.iopipe.mark.delete(id)
+        trace = span.entry
         collect_metrics_for_response(
             response.request, response, context, trace, http_filter, http_headers
         )
@@ -1,45 +1,96 @@
 import functools
 
+from .aggregate import TraceBuffer
+
 
 class Marker(object):
-    def __init__(self, timeline, context):
+    def __init__(self, timeline, context, max_trace_entries=None):
         self.timeline = timeline
         self.context = context
-        self.contexts = []
+        # The spans of blocks between start and end marks, by name
+        self.spans = {}
+        # DB and HTTP traces past the maximum number of entries are aggregated
+        self.db_traces = TraceBuffer(max_trace_entries)
+        self.http_traces = TraceBuffer(max_trace_entries)
 
     def __call__(self, name):
-        self.contexts.append(name)
-        return self
+        return MarkerBlock(self, name)
 
     def __enter__(self):
-        if self.contexts:
-            self.start(self.contexts[-1])
         return self
 
     def __exit__(self, type, value, traceback):
-        if self.contexts:
-            self.end(self.contexts[-1])
-            self.contexts.pop()
+        pass
 
     def decorator(self, name):
         return MarkerDecorator(self, name)
 
     def start(self, name):
-        self.timeline.mark("start:%s" % name)
+        # Aggregated blocks are measured by their span, without marks
+        aggregate = self.timeline.aggregate
+        if not aggregate:
+            self.timeline.mark("start:%s" % name)
+        span = self.spans[name] = self.timeline.span(name, record=aggregate).start()
         self.context.iopipe.label("@iopipe/plugin-trace")
-
-    def end(self, name):
-        self.timeline.mark("end:%s" % name)
+        return span
+
+    def end(self, name, span=None):
+        if not self.timeline.aggregate:
+            self.timeline.mark("end:%s" % name)
+        if span is None:
+            span = self.spans.pop(name, None)
+        elif self.spans.get(name) is span:
+            self.spans.pop(name, None)
+        if span is not None:
+            span.end()
+            if not self.timeline.aggregate:
+                # The block's measure, whenever it's made, is linked to the span tree
+                self.timeline.block_entries.setdefault("measure:%s" % name, []).append(
+                    span.entry
+                )
 
     def measure(self, name, start=None, end=None):
+        if self.timeline.aggregate:
+            # Aggregated blocks are measured when they end
+            return None
+        if start is None and end is None:
+            entry = self.timeline.measure_blocks("measure:%s" % name)
+            if entry is not None:
+                return entry
         return self.timeline.measure(
             "measure:%s" % name,
             "start:%s" % (start or name),
             "end:%s" % (end or start or name),
         )
 
+    def span(self, name=None, record=True):
+        """
+        Returns a span, a lighter weight alternative to start and end marks.
+
+        :param name: The name of the span, defaults to the span's id.
+        :param record: Whether or not to add the span's measure to the timeline.
+        :type record: bool
+        :returns: The span, to be used as a context manager or started and ended.
+        :rtype: iopipe.contrib.trace.timeline.Span
+        """
+        self.context.iopipe.label("@iopipe/plugin-trace")
+        return self.timeline.span(name, record)
+
+    def wrap(self, func):
+        """
+        Wraps a function to be run by an executor or in another thread, so traces
+        made by it are children of the current span or block.
+
+        :param func: The function to wrap.
+        :returns: The wrapped function.
+        """
+        return self.timeline.wrap(func)
+
     def delete(self, name):
-        self.timeline.delete(name)
+        self.timeline.delete("start:%s" % name)
+        self.timeline.delete("end:%s" % name)
+        self.timeline.delete("measure:%s" % name)
+        self.timeline.block_entries.pop("measure:%s" % name, None)
 
     def db_trace(self, trace, db_type, request):
         if self.context.instance.report is None:
@@ -52,7 +103,12 @@ class Marker(object):
         if request is not None:
             entry["request"] = request
 
-        self.context.instance.report.db_trace_entries.append(entry)
+        request = request or {}
+        self.db_traces.add(
+            self.context.instance.report.db_trace_entries,
+            entry,
+            (db_type, request.get("hostname"), request.get("command")),
+        )
 
     def http_trace(self, trace, request, response):
         if self.context.instance.report is None:
@@ -67,7 +123,32 @@ class Marker(object):
         if response is not None:
             entry["response"] = response
 
-        self.context.instance.report.http_trace_entries.append(entry)
+        request = request or {}
+        self.http_traces.add(
+            self.context.instance.report.http_trace_entries,
+            entry,
+            ("http", request.get("hostname"), request.get("method")),
+        )
+
+
+class MarkerBlock(object):
+    """
+    A block of code between start and end marks, used as a context manager.
+    """
+
+    __slots__ = ("marker", "name", "span")
+
+    def __init__(self, marker, name):
+        self.marker = marker
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.marker.start(self.name)
+        return self.marker
+
+    def __exit__(self, type, value, traceback):
+        self.marker.end(self.name, self.span)
 
 
 class MarkerDecorator(object):
@@ -76,14 +157,12 @@ class MarkerDecorator(object):
         self.name = name
 
     def __call__(self, func):
-        self.marker.contexts.append(self.name)
-
         @functools.wraps(func)
         def wrapped(*args, **kwargs):
-            self.marker.start(self.marker.contexts[-1])
-            return_value = func(*args, **kwargs)
-            self.marker.end(self.marker.contexts[-1])
-            self.marker.contexts.pop()
-            return return_value
+            span = self.marker.start(self.name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.marker.end(self.name, span)
 
         return wrapped
@@ -1,5 +1,6 @@
 from distutils.util import strtobool
 import os
+import warnings
 
 from iopipe.plugins import Plugin
 
@@ -23,6 +24,10 @@ class TracePlugin(Plugin):
         http_filter=None,
         http_headers=None,
         auto_db=False,
+        max_trace_entries=None,
+        aggregate=False,
+        aggregate_first=10,
+        aggregate_slowest=10,
     ):
         """
         Instantiates the trace plugin
@@ -37,6 +42,29 @@ class TracePlugin(Plugin):
         :type http_headers: list|tuple
         :param auto_db: Whether or not to automatically trace database requests
         :type auto_db: bool
+        :param max_trace_entries: The maximum number of DB and HTTP trace entries
+                                  each reported per invocation, past which traces
+                                  are aggregated by type, host and command.
+                                  Alternatively this can be set via the
+                                  `IOPIPE_TRACE_MAX_ENTRIES` environment variable.
+                                  Defaults to None, no maximum.
+        :type max_trace_entries: int
+        :param aggregate: Whether or not to aggregate measures by name, reporting a
+                          summary of each name's measures, including their count,
+                          total, min, max and approximate percentiles, instead of
+                          every measure. Alternatively this can be enabled via the
+                          `IOPIPE_TRACE_AGGREGATE` environment variable.
+        :type aggregate: bool
+        :param aggregate_first: The number of each name's first measures reported
+                                when aggregating. Alternatively this can be set via
+                                the `IOPIPE_TRACE_AGGREGATE_FIRST` environment
+                                variable.
+        :type aggregate_first: int
+        :param aggregate_slowest: The number of each name's slowest measures
+                                  reported when aggregating. Alternatively this can
+                                  be set via the `IOPIPE_TRACE_AGGREGATE_SLOWEST`
+                                  environment variable.
+        :type aggregate_slowest: int
         """
         self.auto_measure = auto_measure
         self.auto_http = auto_http
@@ -51,7 +79,46 @@ class TracePlugin(Plugin):
         if "IOPIPE_TRACE_AUTO_DB_ENABLED" in os.environ:
             self.auto_db = bool(strtobool(os.environ["IOPIPE_TRACE_AUTO_DB_ENABLED"]))
 
-        self.timeline = Timeline()
+        self.max_trace_entries = max_trace_entries
+        if "IOPIPE_TRACE_MAX_ENTRIES" in os.environ:
+            try:
+                self.max_trace_entries = max(
+                    0, int(os.environ["IOPIPE_TRACE_MAX_ENTRIES"])
+                )
+            except ValueError:
+                warnings.warn(
+                    "IOpipe's trace max entries must be an integer, using %s"
+                    % self.max_trace_entries
+                )
+
+        self.aggregate = aggregate
+        if "IOPIPE_TRACE_AGGREGATE" in os.environ:
+            self.aggregate = bool(strtobool(os.environ["IOPIPE_TRACE_AGGREGATE"]))
+
+        self.aggregate_first = aggregate_first
+        self.aggregate_slowest = aggregate_slowest
+        for attr, env in [
+            ("aggregate_first", "IOPIPE_TRACE_AGGREGATE_FIRST"),
+            ("aggregate_slowest", "IOPIPE_TRACE_AGGREGATE_SLOWEST"),
+        ]:
+            if env in os.environ:
+                try:
+                    setattr(self, attr, max(0, int(os.environ[env])))
+                except ValueError:
+                    warnings.warn(
+                        "IOpipe's %s must be an integer, using %s"
+                        % (env, getattr(self, attr))
+                    )
+
+        self.marker = None
+        self.timeline = self.create_timeline()
+
+    def create_timeline(self):
+        return Timeline(
+            aggregate=self.aggregate,
+            keep_first=self.aggregate_first,
+            keep_slowest=self.aggregate_slowest,
+        )
 
     def pre_setup(self, iopipe):
         pass
@@ -60,8 +127,9 @@ class TracePlugin(Plugin):
         pass
 
     def pre_invoke(self, event, context):
-        self.timeline = Timeline()
-        context.iopipe.register("mark", Marker(self.timeline, context), force=True)
+        self.timeline = self.create_timeline()
+        self.marker = Marker(self.timeline, context, self.max_trace_entries)
+        context.iopipe.register("mark", self.marker, force=True)
 
         if self.auto_db is True:
             patch_db_requests(context)
@@ -86,5 +154,16 @@ class TracePlugin(Plugin):
         for entry in self.timeline.get_entries():
             report.performance_entries.append(entry._asdict())
 
+        if self.marker is not None:
+            db_traces, http_traces = self.marker.db_traces, self.marker.http_traces
+            if db_traces.aggregated or http_traces.aggregated:
+                plugin = next((p for p in report.plugins if p["name"] == self.name))
+                plugin["aggregated"] = {
+                    "db": db_traces.aggregated,
+                    "http": http_traces.aggregated,
+                }
+                plugin["dbTraceAggregates"] = db_traces.get_aggregates()
+                plugin["httpTraceAggregates"] = http_traces.get_aggregates()
+
     def post_report(self, report):
         pass
@@ -1,12 +1,45 @@
 import collections
+import functools
+import heapq
+import threading
 import time
 
 from iopipe.monotonic import monotonic
+from iopipe.sketch import QuantileSketch
+
+from .util import ContextLocal, get_trace_id
 
 Entry = collections.namedtuple(
     "Entry", ["name", "startTime", "duration", "entryType", "timestamp"]
 )
 
+# A measure that's part of a span tree, linked to its enclosing span by parentId
+SpanEntry = collections.namedtuple(
+    "SpanEntry",
+    ["name", "startTime", "duration", "entryType", "timestamp", "id", "parentId"],
+)
+
+# The count, total duration and approximate quantiles of aggregated measures
+SummaryEntry = collections.namedtuple(
+    "SummaryEntry",
+    [
+        "name",
+        "startTime",
+        "duration",
+        "entryType",
+        "timestamp",
+        "count",
+        "min",
+        "max",
+        "p50",
+        "p90",
+        "p99",
+    ],
+)
+
+# The innermost active span of the current asyncio task or thread
+current_span = ContextLocal("iopipe_current_span")
+
 
 def time_in_millis(time=None, offset=0):
     if time is None:
@@ -21,7 +54,6 @@ def get_offset(timeline):
 def mark_data(
     timeline, name, start_time=None, duration=0, entry_type="mark", timestamp=None
 ):
-    data = timeline.data or []
     entry = Entry(
         name=name,
         startTime=start_time or time_in_millis(offset=get_offset(timeline)),
@@ -29,29 +61,403 @@ def mark_data(
         entryType=entry_type,
         timestamp=timestamp or int(time.time() * 1000),
     )
-    data.append(entry)
-    data.sort(key=lambda i: i.startTime)
-    return data, entry
+    timeline.append(entry)
+    return entry
+
+
+class Span(object):
+    """
+    A span of time on a timeline, recorded as a single measure when it ends. Spans
+    started while another span is active in the same asyncio task or thread are
+    its children.
+    """
+
+    __slots__ = (
+        "end_time",
+        "entry",
+        "id",
+        "name",
+        "parent",
+        "parent_id",
+        "record",
+        "start_time",
+        "timeline",
+    )
+
+    def __init__(self, timeline, name=None, record=True):
+        """
+        Instantiates a new span.
+
+        :param timeline: The timeline of the span.
+        :type timeline: Timeline
+        :param name: The name of the span, which is prefixed with `measure:`.
+                     Defaults to the span's id.
+        :param record: Whether or not to add the span's measure to the timeline.
+        :type record: bool
+        """
+        self.end_time = None
+        self.entry = None
+        self.id = get_trace_id()
+        self.name = self.id if name is None else name
+        self.parent = None
+        self.parent_id = None
+        self.record = record
+        self.start_time = None
+        self.timeline = timeline
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, type, value, traceback):
+        self.end()
+
+    def start(self):
+        self.parent = self.timeline.current_span()
+        self.parent_id = self.parent.id if self.parent is not None else None
+        current_span.set(self)
+        self.start_time = monotonic()
+        return self
+
+    def end(self):
+        """
+        Ends the span.
+
+        :returns: The span's measure.
+        :rtype: Entry
+        """
+        self.end_time = monotonic()
+        # Spans usually end innermost first, but aren't required to
+        if current_span.get() is self:
+            current_span.set(self.timeline.current_span())
+        start_time = time_in_millis(self.start_time, get_offset(self.timeline))
+        self.entry = SpanEntry(
+            name="measure:%s" % self.name,
+            startTime=start_time,
+            duration=(self.end_time - self.start_time) * 1000,
+            entryType="measure",
+            # The wall clock time the span started, without reading it at the start
+            timestamp=int((time.time() - self.end_time + self.start_time) * 1000),
+            id=self.id,
+            parentId=self.parent_id,
+        )
+        if self.record:
+            self.timeline.append(self.entry)
+        return self.entry
+
+
+class EntryAggregate(object):
+    """
+    The measures of a name on an aggregating timeline, counted in a quantile sketch.
+    Only the first and slowest measures are kept as raw entries.
+    """
+
+    __slots__ = (
+        "first",
+        "keep_first",
+        "keep_slowest",
+        "sketch",
+        "slowest",
+        "start_time",
+        "timestamp",
+    )
+
+    def __init__(self, keep_first, keep_slowest):
+        """
+        Instantiates a new aggregate.
+
+        :param keep_first: The number of first measures to keep.
+        :type keep_first: int
+        :param keep_slowest: The number of slowest measures to keep, of those after
+                             the first.
+        :type keep_slowest: int
+        """
+        self.first = []
+        self.keep_first = keep_first
+        self.keep_slowest = keep_slowest
+        self.sketch = QuantileSketch()
+        # A min heap of (duration, sequence, entry), the fastest is replaced first
+        self.slowest = []
+        self.start_time = None
+        self.timestamp = None
+
+    def add(self, entry):
+        self.sketch.add(entry.duration)
+        if self.start_time is None or entry.startTime < self.start_time:
+            self.start_time = entry.startTime
+            self.timestamp = entry.timestamp
+        if len(self.first) < self.keep_first:
+            self.first.append(entry)
+        elif self.keep_slowest > 0:
+            item = (entry.duration, self.sketch.count, entry)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+    def merge(self, other):
+        """
+        Merges another aggregate of the same name into this one, such as one made
+        by another thread.
+
+        :param other: The aggregate to merge.
+        :type other: EntryAggregate
+        """
+        self.sketch.merge(other.sketch)
+        if other.start_time is not None and (
+            self.start_time is None or other.start_time < self.start_time
+        ):
+            self.start_time = other.start_time
+            self.timestamp = other.timestamp
+        first = sorted(self.first + other.first, key=lambda e: e.startTime)
+        self.first = first[: self.keep_first]
+        slowest = heapq.nlargest(
+            self.keep_slowest,
+            first[self.keep_first :]
+            + [e for _, _, e in self.slowest]
+            + [e for _, _, e in other.slowest],
+            key=lambda e: e.duration,
+        )
+        self.slowest = [(e.duration, -i, e) for i, e in enumerate(slowest)]
+        heapq.heapify(self.slowest)
+
+    def get_raw_entries(self):
+        """
+        Returns the first and slowest measures kept.
+
+        :rtype: list
+        """
+        return self.first + [e for _, _, e in self.slowest]
+
+    def get_summary(self, name):
+        """
+        Returns a summary of all of the measures.
+
+        :param name: The name of the measures.
+        :rtype: SummaryEntry
+        """
+        sketch = self.sketch
+        return SummaryEntry(
+            name=name,
+            startTime=self.start_time,
+            duration=sketch.sum,
+            entryType="summary",
+            timestamp=self.timestamp,
+            count=sketch.count,
+            min=sketch.min,
+            max=sketch.max,
+            p50=sketch.quantile(0.5),
+            p90=sketch.quantile(0.9),
+            p99=sketch.quantile(0.99),
+        )
+
+
+class TimelineBuffer(object):
+    """
+    The entries added to a timeline by a single thread. Entries are appended in the
+    order they're created and indexed by name, deleted entries are replaced by
+    tombstones. Only the owning thread appends, without locking, and removes
+    entries. Other threads lock the buffer to read or delete entries.
+    """
+
+    # The number of tombstones tolerated before entries are compacted on delete
+    MAX_TOMBSTONES = 1024
+
+    def __init__(self):
+        # The aggregates of measures by name, if the timeline is aggregating
+        self.aggregates = {}
+        self.lock = threading.Lock()
+        self.owner = threading.current_thread()
+        self.reset()
+
+    def reset(self):
+        self.entries = []
+        self.last_start_time = float("-inf")
+        self.names = {}
+        self.sorted = True
+        self.tombstones = 0
+
+    def append(self, entry):
+        if entry.startTime < self.last_start_time:
+            self.sorted = False
+        else:
+            self.last_start_time = entry.startTime
+        # The entry is added before its index, so readers never see a missing entry
+        self.entries.append(entry)
+        self.names.setdefault(entry.name, []).append(len(self.entries) - 1)
+
+    def aggregate(self, entry, keep_first, keep_slowest):
+        """
+        Adds a measure to its name's aggregate. Unlike appending, aggregating locks
+        the buffer, since readers merge aggregates.
+        """
+        with self.lock:
+            aggregate = self.aggregates.get(entry.name)
+            if aggregate is None:
+                aggregate = self.aggregates[entry.name] = EntryAggregate(
+                    keep_first, keep_slowest
+                )
+            aggregate.add(entry)
+
+    def compact(self):
+        """
+        Removes tombstones and sorts entries by start time, rebuilding the index.
+        Must be called by the owning thread, holding the lock.
+        """
+        entries = [e for e in self.entries if e is not None]
+        if not self.sorted:
+            entries.sort(key=lambda e: e.startTime)
+        self.entries = entries
+        self.names = {}
+        for i, entry in enumerate(entries):
+            self.names.setdefault(entry.name, []).append(i)
+        self.last_start_time = entries[-1].startTime if entries else float("-inf")
+        self.sorted = True
+        self.tombstones = 0
+
+    def get_entries(self):
+        with self.lock:
+            if threading.current_thread() is self.owner:
+                if self.tombstones or not self.sorted:
+                    self.compact()
+                return list(self.entries)
+            entries = [e for e in self.entries if e is not None]
+        if not self.sorted:
+            entries.sort(key=lambda e: e.startTime)
+        return entries
+
+    def get_entries_by_name(self, name):
+        with self.lock:
+            return [self.entries[i] for i in self.names.get(name, ())]
+
+    def delete(self, name):
+        with self.lock:
+            self.aggregates.pop(name, None)
+            for i in self.names.pop(name, ()):
+                self.entries[i] = None
+                self.tombstones += 1
+            if threading.current_thread() is not self.owner:
+                return
+            # Traces usually delete their most recent entries, which can be dropped
+            while self.entries and self.entries[-1] is None:
+                self.entries.pop()
+                self.tombstones -= 1
+            if not self.entries:
+                self.reset()
+            elif self.tombstones > max(self.MAX_TOMBSTONES, len(self.entries) // 2):
+                self.compact()
 
 
 class Timeline(object):
-    def __init__(self, offset=0):
+    """
+    A timeline of marks and measures. Each thread adds entries to its own buffer,
+    the buffers are merged and sorted by start time when entries are read.
+    """
+
+    def __init__(self, offset=0, aggregate=False, keep_first=10, keep_slowest=10):
+        """
+        Instantiates a new timeline.
+
+        :param offset: The time the timeline's entries start from, in milliseconds.
+        :param aggregate: Whether or not to aggregate measures by name, reporting a
+                          summary of each name's measures instead of every measure.
+        :type aggregate: bool
+        :param keep_first: The number of each name's first measures kept when
+                           aggregating.
+        :type keep_first: int
+        :param keep_slowest: The number of each name's slowest measures kept when
+                             aggregating, of those after the first.
+        :type keep_slowest: int
+        """
+        self.aggregate = aggregate
         self.init_time = time_in_millis()
+        self.keep_first = keep_first
+        self.keep_slowest = keep_slowest
         self.offset = offset
-        self.data = []
+        # The measures of ended blocks, by name, added when the blocks are measured
+        self.block_entries = {}
+        self.lock = threading.Lock()
+        self.clear()
+
+    @property
+    def data(self):
+        return self.get_entries()
+
+    @property
+    def buffer(self):
+        """
+        The current thread's buffer, created on first use.
+        """
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            buffer = self.local.buffer = TimelineBuffer()
+            with self.lock:
+                self.buffers = self.buffers + [buffer]
+        return buffer
+
+    def append(self, entry):
+        if self.aggregate and entry.entryType == "measure":
+            self.buffer.aggregate(entry, self.keep_first, self.keep_slowest)
+        else:
+            self.buffer.append(entry)
 
     def mark(self, name):
-        self.data, entry = mark_data(self, name=name)
-        return entry
+        return mark_data(self, name=name)
 
     def get_entries(self):
-        return self.data
+        buffers = self.buffers
+        if len(buffers) == 1 and not buffers[0].aggregates:
+            return buffers[0].get_entries()
+        entries = []
+        for buffer in buffers:
+            entries.extend(buffer.get_entries())
+        for name, aggregate in self.get_aggregates().items():
+            entries.extend(aggregate.get_raw_entries())
+            entries.append(aggregate.get_summary(name))
+        entries.sort(key=lambda e: e.startTime)
+        return entries
 
     def get_entries_by_name(self, name):
-        return [d for d in self.data if d.name == name]
+        buffers = self.buffers
+        entries = []
+        for buffer in buffers:
+            entries.extend(buffer.get_entries_by_name(name))
+        aggregate = self.get_aggregates(name).get(name) if self.aggregate else None
+        if aggregate is not None:
+            entries.extend(aggregate.get_raw_entries())
+        if (
+            len(buffers) > 1
+            or (buffers and not buffers[0].sorted)
+            or aggregate is not None
+        ):
+            entries.sort(key=lambda e: e.startTime)
+        return entries
+
+    def get_aggregates(self, name=None):
+        """
+        Returns the aggregates of measures by name, merged across threads.
+
+        :param name: The name of the aggregate to return, or None for all of them.
+        :rtype: dict
+        """
+        aggregates = {}
+        for buffer in self.buffers:
+            with buffer.lock:
+                if name is None:
+                    items = buffer.aggregates.items()
+                elif name in buffer.aggregates:
+                    items = [(name, buffer.aggregates[name])]
+                else:
+                    continue
+                for key, aggregate in items:
+                    if key not in aggregates:
+                        aggregates[key] = EntryAggregate(
+                            self.keep_first, self.keep_slowest
+                        )
+                    aggregates[key].merge(aggregate)
+        return aggregates
 
     def get_entries_by_type(self, type):
-        return [d for d in self.data if d.entryType == type]
+        return [d for d in self.get_entries() if d.entryType == type]
 
     def measure(self, name, start, end=None):
         start_mark = self.get_entries_by_name(start)
@@ -69,7 +475,7 @@ class Timeline(object):
 
         duration = end_time - start_time
 
-        self.data, entry = mark_data(
+        return mark_data(
             self,
             name=name,
             start_time=start_time,
@@ -77,19 +483,98 @@ class Timeline(object):
             entry_type="measure",
             timestamp=timestamp,
         )
-        return entry
+
+    def measure_blocks(self, name):
+        """
+        Adds the measures of ended blocks, one for each time a block ran, each with
+        the id of its span and the id of its parent span.
+
+        :param name: The name of the blocks' measures.
+        :returns: The last block's measure, or None if no blocks have ended.
+        :rtype: SpanEntry
+        """
+        entries = self.block_entries.pop(name, None)
+        if not entries:
+            return None
+        for entry in entries:
+            self.append(entry)
+        return entries[-1]
 
     def clear_marks(self):
-        self.data = [d for d in self.data if d["entryType"] != "mark"]
+        entries, aggregates = self.get_raw_entries(), self.get_aggregates()
+        self.clear()
+        for entry in entries:
+            if entry.entryType != "mark":
+                self.buffer.append(entry)
+        self.buffer.aggregates = aggregates
 
     def clear_measures(self):
-        self.data = [d for d in self.data if d["entryType"] != "measure"]
+        entries = self.get_raw_entries()
+        self.clear()
+        for entry in entries:
+            if entry.entryType != "measure":
+                self.buffer.append(entry)
+
+    def get_raw_entries(self):
+        """
+        Returns the entries that haven't been aggregated.
+        """
+        entries = []
+        for buffer in self.buffers:
+            entries.extend(buffer.get_entries())
+        entries.sort(key=lambda e: e.startTime)
+        return entries
 
     def clear(self):
-        self.data = []
+        with self.lock:
+            self.buffers = []
+            self.local = threading.local()
 
     def delete(self, name):
-        self.data = [d for d in self.data if name not in d.name]
+        """
+        Deletes the entries with a name.
+
+        :param name: The name of the entries to delete.
+        """
+        for buffer in self.buffers:
+            buffer.delete(name)
+
+    def current_span(self):
+        """
+        Returns the innermost active span of the current asyncio task or thread.
+
+        :rtype: Span
+        """
+        span = current_span.get()
+        while span is not None and span.end_time is not None:
+            span = span.parent
+        if span is not None and span.timeline is not self:
+            return None
+        return span
+
+    def span(self, name=None, record=True):
+        return Span(self, name, record)
+
+    def wrap(self, func):
+        """
+        Wraps a function to be run in another thread, such as by an executor, so
+        spans started by it are children of the current span.
+
+        :param func: The function to wrap.
+        :returns: The wrapped function.
+        """
+        parent = self.current_span()
+
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            previous = current_span.get()
+            current_span.set(parent)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current_span.set(previous)
+
+        return wrapped
 
     def now(self):
         return time_in_millis(offset=get_offset(self))
@@ -1,22 +1,38 @@
+import itertools
+import threading
+import uuid
+
+try:
+    import contextvars
+except ImportError:  # pragma: no cover
+    contextvars = None
+
 from iopipe.compat import binary_types
 
+# Trace ids are unique per process, the counter is incremented atomically
+TRACE_ID_PREFIX = uuid.uuid4().hex[:12]
+trace_ids = itertools.count()
+
 
 def add_timeline_measures(timeline):
-    entries = timeline.get_entries_by_type("mark")
-    measures = timeline.get_entries_by_type("measure")
-    entry_names = [
-        e.name
-        for e in entries
-        if e.name.startswith("start:") or e.name.startswith("end:")
-    ]
-    measure_names = [m.name for m in measures]
+    entry_names = []
+    end_names = set()
+    measure_names = set()
+    for e in timeline.get_entries():
+        if e.entryType == "measure":
+            measure_names.add(e.name)
+        elif e.name.startswith("start:"):
+            entry_names.append(e.name)
+        elif e.name.startswith("end:"):
+            end_names.add(e.name)
     for name in entry_names:
-        if name.startswith("start:"):
-            _, base_name = name.split(":", 1)
-            end_name = "end:%s" % base_name
-            measure_name = "measure:%s" % base_name
-            if end_name in entry_names and measure_name not in measure_names:
+        _, base_name = name.split(":", 1)
+        end_name = "end:%s" % base_name
+        measure_name = "measure:%s" % base_name
+        if end_name in end_names and measure_name not in measure_names:
+            if timeline.measure_blocks(measure_name) is None:
                 timeline.measure(measure_name, name, end_name)
+            measure_names.add(measure_name)
 
 
 def ensure_utf8(v):
@@ -24,3 +40,34 @@ def ensure_utf8(v):
     if isinstance(v, binary_types):
         return v.decode("utf-8", "ignore")
     return v
+
+
+def get_trace_id():
+    """Returns a unique id for a trace, cheaper to create than a UUID"""
+    return "%s-%x" % (TRACE_ID_PREFIX, next(trace_ids))
+
+
+class ContextLocal(object):
+    """
+    A value local to the current asyncio task or thread. Where contextvars aren't
+    available, the value is local to the current thread only. Instances should be
+    created at module level.
+    """
+
+    def __init__(self, name):
+        if contextvars is not None:
+            self.var = contextvars.ContextVar(name, default=None)
+        else:  # pragma: no cover
+            self.var = None
+            self.local = threading.local()
+
+    def get(self):
+        if self.var is not None:
+            return self.var.get()
+        return getattr(self.local, "value", None)  # pragma: no cover
+
+    def set(self, value):
+        if self.var is not None:
+            self.var.set(value)
+        else:  # pragma: no cover
+            self.local.value = value
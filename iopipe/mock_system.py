@@ -37,6 +37,32 @@ def read_meminfo():
     }
 
 
+def read_net_dev():
+    """
+    Mocks read_net_dev as this is a Linux-specific operation.
+    """
+    return {
+        "rx_bytes": random.randint(0, 999999999),
+        "rx_packets": random.randint(0, 999999),
+        "tx_bytes": random.randint(0, 999999999),
+        "tx_packets": random.randint(0, 999999),
+    }
+
+
+def read_pid_io(pid):
+    """
+    Mocks read_pid_io as this is a Linux-specific operation.
+    """
+    return {
+        "rchar": random.randint(0, 999999999),
+        "wchar": random.randint(0, 999999999),
+        "syscr": random.randint(0, 999999),
+        "syscw": random.randint(0, 999999),
+        "read_bytes": random.randint(0, 999999999),
+        "write_bytes": random.randint(0, 999999999),
+    }
+
+
 def read_pid_stat(pid):
     """
     Mocks read_pid_stat as this is a Linux-specific operation.
@@ -82,3 +108,36 @@ def read_uptime():
     Mocks read_updtime as this is a Linux-specific operaiton.
     """
     return random.randint(0, 999999999)
+
+
+class ProcReader(object):
+    """
+    Mocks ProcReader as this is a Linux-specific operation.
+    """
+
+    def __init__(self, pid="self", buffer_size=4096):
+        self.pid = pid
+
+    def close(self):
+        pass
+
+    def read_cgroup(self):
+        return None
+
+    def read_meminfo(self):
+        return read_meminfo()
+
+    def read_net_dev(self):
+        return read_net_dev()
+
+    def read_pid_io(self):
+        return read_pid_io(self.pid)
+
+    def read_pid_stat(self):
+        return read_pid_stat(self.pid)
+
+    def read_pid_status(self):
+        return read_pid_status(self.pid)
+
+    def read_stat(self):
+        return read_stat()
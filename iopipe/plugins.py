@@ -1,5 +1,47 @@
 import abc
 
+HOOKS = [
+    ("pre:setup", "pre_setup"),
+    ("post:setup", "post_setup"),
+    ("pre:invoke", "pre_invoke"),
+    ("post:invoke", "post_invoke"),
+    ("post:response", "post_response"),
+    ("pre:report", "pre_report"),
+    ("post:report", "post_report"),
+]
+
+
+def _noop(self):
+    pass
+
+
+def _noop_with_docstring(self):
+    """Docstring"""
+
+
+NOOP_BYTECODE = (_noop.__code__.co_code, _noop_with_docstring.__code__.co_code)
+
+
+def get_plugin_hooks(plugins):
+    """
+    Returns a dispatch table of plugin hooks, keyed by hook name. Hooks that do
+    nothing are left out of the table. Disabled plugins are included, as plugins can
+    be enabled at runtime.
+
+    :param plugins: A list of plugins.
+    :type plugins: list
+    :returns: A dict of hook names to lists of (plugin, bound method) tuples.
+    :rtype: dict
+    """
+    plugins = [p for p in plugins if is_plugin(p)]
+    return dict(
+        (
+            name,
+            [(p, getattr(p, method)) for p in plugins if not is_noop_hook(p, method)],
+        )
+        for name, method in HOOKS
+    )
+
 
 def get_plugin_meta(plugins):
     """
@@ -36,6 +78,27 @@ def is_plugin(plugin):
         return False
 
 
+def is_noop_hook(plugin, method):
+    """
+    Returns true if a plugin's hook is inherited unchanged from `Plugin` or has an
+    empty body.
+
+    :param plugin: The plugin to check.
+    :param method: The name of the hook method.
+    :returns: True if the hook does nothing, False otherwise.
+    :rtype: bool
+    """
+    hook = getattr(plugin, method, None)
+    func = getattr(hook, "__func__", hook)
+    base_hook = getattr(Plugin, method)
+    if func is getattr(base_hook, "__func__", base_hook):
+        return True
+    code = getattr(func, "__code__", None)
+    if code is None or code.co_code not in NOOP_BYTECODE:
+        return False
+    return all(c is None or c == func.__doc__ for c in code.co_consts)
+
+
 def with_metaclass(meta, *bases):
     """Python 2 and 3 compatible way to do meta classes"""
 
@@ -1,5 +1,3 @@
-import copy
-import json
 import logging
 import os
 import platform
@@ -7,7 +5,7 @@ import sys
 import time
 import traceback
 
-from . import constants
+from . import constants, serializer
 from .monotonic import monotonic
 from .plugins import get_plugin_meta
 from .send_report import send_report
@@ -19,6 +17,52 @@ else:
 
 logger = logging.getLogger(__name__)
 
+# Keeps /proc files open between invocations to avoid re-opening them on every report
+proc_reader = system.ProcReader()
+
+# Caches the parts of the environment that don't change for the life of the process
+static_environment = {}
+
+
+def get_static_environment():
+    """
+    Returns the parts of the report environment that don't change for the life of
+    the process, collecting them on the first call.
+
+    :returns: The static environment data.
+    :rtype: dict
+    """
+    if not static_environment:
+        static_environment.update(
+            {
+                "agent": {
+                    "load_time": constants.MODULE_LOAD_TIME,
+                    "runtime": "python",
+                    "version": constants.VERSION,
+                },
+                "boot_id": system.read_bootid(),
+                "hostname": system.read_hostname(),
+                "python_implementation": platform.python_implementation(),
+                "python_version": platform.python_version(),
+                "totalmem": proc_reader.read_meminfo()["MemTotal"],
+            }
+        )
+    return static_environment
+
+
+def get_deltas(start, end):
+    """
+    Returns the change in each counter between two readings.
+
+    :param start: The counters at the start of the invocation.
+    :param end: The counters at the end of the invocation.
+    :returns: The counter deltas, or None if either reading is missing.
+    :rtype: dict
+    """
+    if start is None or end is None:
+        return None
+    return dict((key, value - start.get(key, 0)) for key, value in end.items())
+
 
 class Report(object):
     """
@@ -34,7 +78,10 @@ class Report(object):
         """
         self.start_time = monotonic()
         self.sent = False
-        self.stat_start = system.read_pid_stat("self")
+        self.stat_start = proc_reader.read_pid_stat()
+        self.cgroup_start = proc_reader.read_cgroup()
+        self.io_start = proc_reader.read_pid_io()
+        self.net_start = proc_reader.read_net_dev()
 
         self.client = client
         self.config = client.config
@@ -47,25 +94,27 @@ class Report(object):
         self.performance_entries = []
         self.plugins = get_plugin_meta(self.config["plugins"])
 
+        environment = get_static_environment()
+
         self.report = {
             "client_id": self.config["token"],
             "coldstart": constants.COLDSTART,
             "custom_metrics": self.custom_metrics,
             "environment": {
-                "agent": {
-                    "load_time": constants.MODULE_LOAD_TIME,
-                    "runtime": "python",
-                    "version": constants.VERSION,
-                },
+                "agent": dict(environment["agent"]),
                 "runtime": {
-                    "name": platform.python_implementation(),
-                    "version": platform.python_version(),
+                    "name": environment["python_implementation"],
+                    "version": environment["python_version"],
                 },
                 # DEPRECATED: the following key will be removed in favor of
                 # the 'runtime' in the future
-                "python": {"version": platform.python_version()},
-                "host": {},
-                "os": {"linux": {}},
+                "python": {"version": environment["python_version"]},
+                "host": {"boot_id": environment["boot_id"]},
+                "os": {
+                    "hostname": environment["hostname"],
+                    "linux": {},
+                    "totalmem": environment["totalmem"],
+                },
             },
             "errors": {},
             "dbTraceEntries": self.db_trace_entries,
@@ -118,11 +167,57 @@ class Report(object):
         data["traceId"] = os.getenv("_X_AMZN_TRACE_ID", "")
         return data
 
-    def retain_error(self, error, frame=None):
+    def get_memory_and_cgroup(self, meminfo):
+        """
+        Returns memory usage and headroom against the function's memory limit, along
+        with the CPU throttling of the process' cgroup during the invocation. Memory
+        usage falls back to /proc/meminfo when cgroups aren't available.
+
+        :param meminfo: The system memory usage.
+        :returns: The memory and cgroup data for the report.
+        :rtype: dict
+        """
+        cgroup = proc_reader.read_cgroup()
+        data = {}
+
+        limits = []
+        memory_limit_in_mb = getattr(self.context, "memory_limit_in_mb", None)
+        if memory_limit_in_mb:
+            limits.append(int(memory_limit_in_mb) * (1 << 20))
+
+        if cgroup is not None and cgroup["memory"].get("usage") is not None:
+            memory = {"source": "cgroup", "used": cgroup["memory"]["usage"]}
+            if cgroup["memory"].get("limit") is not None:
+                limits.append(cgroup["memory"]["limit"])
+        else:
+            memory = {
+                "source": "meminfo",
+                "used": meminfo["MemTotal"] - meminfo["MemFree"],
+            }
+
+        if limits:
+            memory["limit"] = min(limits)
+            memory["headroom"] = memory["limit"] - memory["used"]
+        data["memory"] = memory
+
+        if cgroup is not None:
+            cgroup_start = self.cgroup_start["cpu"] if self.cgroup_start else None
+            data["cgroup"] = {
+                "cpu": get_deltas(cgroup_start, cgroup["cpu"]),
+                "memory": cgroup["memory"],
+                "version": cgroup["version"],
+            }
+
+        return data
+
+    def retain_error(self, error, frame=None, threads=None, samples=None):
         """
         Adds details of an error to the report.
 
         :param error: The error exception to add to the report.
+        :param frame: The stack frame of a timeout.
+        :param threads: The stacks of all threads at the time of a timeout.
+        :param samples: The stack samples taken in the lead up to a timeout.
         """
         if frame is None:
             stack = traceback.format_exc()
@@ -135,24 +230,30 @@ class Report(object):
             "message": "{}".format(error),
             "stack": stack,
         }
+        if samples:
+            details["samples"] = samples
+        if threads:
+            details["threads"] = threads
         self.report["errors"] = details
 
-    def prepare(self, error=None, frame=None):
+    def prepare(self, error=None, frame=None, threads=None, samples=None):
         """
         Prepare the report to be sent to IOpipe.
 
         :param error: An optional error to add to report.
         :param frame: A stack frame to add to report in the event of a timeout.
+        :param threads: The stacks of all threads to add to the report in the event
+                        of a timeout.
+        :param samples: The stack samples to add to the report in the event of a
+                        timeout.
         """
         if error:
-            self.retain_error(error, frame)
-
-        self.report["environment"]["host"]["boot_id"] = system.read_bootid()
+            self.retain_error(error, frame, threads, samples)
 
         # convert labels to list for sending
         self.report["labels"] = list(self.labels)
 
-        meminfo = system.read_meminfo()
+        meminfo = proc_reader.read_meminfo()
 
         self.report.update(
             {
@@ -161,23 +262,30 @@ class Report(object):
             }
         )
 
+        totalmem = self.report["environment"]["os"]["totalmem"]
         self.report["environment"]["os"].update(
             {
-                "cpus": system.read_stat(),
+                "cpus": proc_reader.read_stat(),
                 "freemem": meminfo["MemFree"],
-                "hostname": system.read_hostname(),
-                "totalmem": meminfo["MemTotal"],
-                "usedmem": meminfo["MemTotal"] - meminfo["MemFree"],
+                "usedmem": totalmem - meminfo["MemFree"],
             }
         )
 
         self.report["environment"]["os"]["linux"]["pid"] = {
             "self": {
-                "stat": system.read_pid_stat("self"),
+                "io": get_deltas(self.io_start, proc_reader.read_pid_io()),
+                "stat": proc_reader.read_pid_stat(),
                 "stat_start": self.stat_start,
-                "status": system.read_pid_status("self"),
+                "status": proc_reader.read_pid_status(),
             }
         }
+        self.report["environment"]["os"]["linux"]["net"] = get_deltas(
+            self.net_start, proc_reader.read_net_dev()
+        )
+
+        self.report["environment"]["os"]["linux"].update(
+            self.get_memory_and_cgroup(meminfo)
+        )
 
         self.report["disk"] = system.read_disk()
 
@@ -185,13 +293,29 @@ class Report(object):
 
     def send(self):
         """
-        Sends the report to IOpipe.
+        Sends the report to IOpipe. The report is encoded once, here, so that later
+        changes to it are not sent and the encoded bytes can be handed off to the
+        thread pool as-is.
         """
         if self.sent is True:
             return
         self.sent = True
 
-        logger.debug("Sending report to IOpipe:")
-        logger.debug(json.dumps(self.report, indent=2, sort_keys=True))
+        try:
+            data = serializer.encode(self.report)
+        except (OverflowError, TypeError, ValueError) as e:
+            logger.error(
+                "Error serializing report, sending values that can't be serialized "
+                "as strings: %s" % e
+            )
+            try:
+                data = serializer.encode_lenient(self.report)
+            except (OverflowError, TypeError, ValueError) as e:
+                logger.error("Error serializing report, not sending it: %s" % e)
+                return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending report to IOpipe:")
+            logger.debug(data.decode("utf-8"))
 
-        self.client.submit_future(send_report, copy.deepcopy(self.report), self.config)
+        self.client.submit_future(send_report, data, self.config)
@@ -1,27 +1,58 @@
 import logging
+import zlib
 
 try:
     import requests
 except ImportError:
     from botocore.vendored import requests
 
+from .compat import binary_types
+from .serializer import encode
+
 logger = logging.getLogger(__name__)
 session = requests.Session()
 
 
+def compress(data, encoding, level=1):
+    """
+    Compresses data for an HTTP content encoding.
+
+    :param data: The data to compress.
+    :param encoding: The content encoding, either `gzip` or `deflate`.
+    :param level: The compression level, from 0 to 9.
+    :returns: The compressed data.
+    :rtype: bytes
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = zlib.compressobj(level)
+    return compressor.compress(data) + compressor.flush()
+
+
 def send_report(report, config):
     """
     Sends the report to IOpipe's collector.
 
-    :param report: The report to be sent.
+    :param report: The report to be sent, either JSON encoded bytes or a dict.
     :param config: The IOpipe agent configuration.
     """
-    headers = {"Authorization": "Bearer {}".format(config["token"])}
+    headers = {
+        "Authorization": "Bearer {}".format(config["token"]),
+        "Content-Type": "application/json",
+    }
     url = "https://{host}{path}".format(**config)
 
     try:
+        if not isinstance(report, binary_types):
+            report = encode(report)
+        if config["compression"] and len(report) >= config["compression_threshold"]:
+            report = compress(
+                report, config["compression"], config["compression_level"]
+            )
+            headers["Content-Encoding"] = config["compression"]
         response = session.post(
-            url, json=report, headers=headers, timeout=config["network_timeout"]
+            url, data=report, headers=headers, timeout=config["network_timeout"]
         )
         response.raise_for_status()
     except Exception as e:
@@ -0,0 +1,105 @@
+import collections
+import json
+
+from .compat import PY3
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+def serialize_json(obj, sort_keys=False):
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys
+    )
+
+
+def serialize_orjson(obj, sort_keys=False):
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+
+def serialize_ujson(obj, sort_keys=False):
+    return ujson.dumps(
+        obj, ensure_ascii=False, escape_forward_slashes=False, sort_keys=sort_keys
+    )
+
+
+# Serializers in order of preference, all of which produce compact, UTF-8 JSON
+SERIALIZERS = collections.OrderedDict()
+if orjson is not None:
+    SERIALIZERS["orjson"] = serialize_orjson
+if ujson is not None:
+    SERIALIZERS["ujson"] = serialize_ujson
+SERIALIZERS["json"] = serialize_json
+
+SERIALIZER = next(iter(SERIALIZERS))
+
+
+def serialize(obj, sort_keys=False, serializer=None):
+    """
+    Serializes an object to JSON with the fastest available serializer, falling
+    back to the standard library for objects the serializer doesn't support.
+
+    :param obj: The object to serialize.
+    :param sort_keys: Whether or not to sort dict keys.
+    :param serializer: The name of the serializer to use, defaults to the fastest.
+    :returns: The JSON, as either bytes or text depending on the serializer.
+    """
+    serialize_func = SERIALIZERS[serializer or SERIALIZER]
+    try:
+        return serialize_func(obj, sort_keys)
+    except (OverflowError, TypeError, ValueError):
+        if serialize_func is serialize_json:
+            raise
+        return serialize_json(obj, sort_keys)
+
+
+def dumps(obj, sort_keys=False, serializer=None):
+    """
+    Returns an object serialized to a JSON string.
+
+    :param obj: The object to serialize.
+    :param sort_keys: Whether or not to sort dict keys.
+    :param serializer: The name of the serializer to use, defaults to the fastest.
+    :rtype: str
+    """
+    data = serialize(obj, sort_keys, serializer)
+    if PY3 and isinstance(data, bytes):
+        return data.decode("utf-8")
+    if not PY3 and not isinstance(data, str):  # pragma: no cover
+        return data.encode("utf-8")
+    return data
+
+
+def encode(obj, sort_keys=False, serializer=None):
+    """
+    Returns an object serialized to UTF-8 encoded JSON bytes.
+
+    :param obj: The object to serialize.
+    :param sort_keys: Whether or not to sort dict keys.
+    :param serializer: The name of the serializer to use, defaults to the fastest.
+    :rtype: bytes
+    """
+    data = serialize(obj, sort_keys, serializer)
+    if not isinstance(data, bytes):
+        return data.encode("utf-8")
+    return data
+
+
+def encode_lenient(obj):
+    """
+    Returns an object serialized to UTF-8 encoded JSON bytes with the standard
+    library, converting values that can't be serialized to strings.
+
+    :param obj: The object to serialize.
+    :rtype: bytes
+    """
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode("utf-8")
@@ -0,0 +1,133 @@
+from __future__ import division
+
+import math
+
+
+class QuantileSketch(object):
+    """
+    A mergeable quantile sketch with relative accuracy guarantees, based on DDSketch.
+    Positive values are counted in logarithmically sized buckets, so memory grows
+    with the range of values rather than their number.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        """
+        Instantiates a new quantile sketch.
+
+        :param relative_accuracy: The maximum relative error of quantiles.
+        :type relative_accuracy: float
+        :param max_buckets: The maximum number of buckets, after which the lowest
+                            buckets are collapsed together.
+        :type max_buckets: int
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+
+        self.buckets = {}
+        self.count = 0
+        self.max = None
+        self.min = None
+        self.sum = 0
+        self.zero_count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, count=1):
+        """
+        Adds a value to the sketch.
+
+        :param value: The value to add, values of zero or less are counted as zero.
+        :param count: The number of times to add the value.
+        """
+        if value > 0:
+            key = int(math.ceil(math.log(value) / self.log_gamma))
+            self.buckets[key] = self.buckets.get(key, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self.collapse()
+        else:
+            self.zero_count += count
+
+        self.count += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def collapse(self):
+        """
+        Collapses the lowest buckets together, keeping the number of buckets bounded
+        at the cost of accuracy for the lowest quantiles.
+        """
+        keys = sorted(self.buckets)
+        lowest = keys[len(keys) - self.max_buckets]
+        for key in keys[: len(keys) - self.max_buckets]:
+            self.buckets[lowest] += self.buckets.pop(key)
+
+    def merge(self, other):
+        """
+        Merges another sketch with the same relative accuracy into this one.
+
+        :param other: The sketch to merge.
+        :type other: QuantileSketch
+        """
+        if other.count == 0:
+            return
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+    def quantile(self, q):
+        """
+        Returns the approximate value at a quantile.
+
+        :param q: The quantile, between 0 and 1.
+        :returns: The value, or None if the sketch is empty.
+        :rtype: float
+        """
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0
+
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma**key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Returns a summary of the sketch.
+
+        :param quantiles: The quantiles to include.
+        :rtype: dict
+        """
+        summary = {
+            "count": self.count,
+            "max": self.max,
+            "min": self.min,
+            "sum": self.sum,
+        }
+        for q in quantiles:
+            summary["p%g" % (q * 100)] = self.quantile(q)
+        return summary
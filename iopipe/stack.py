@@ -0,0 +1,147 @@
+import collections
+import sys
+import threading
+import traceback
+
+# The maximum number of frames kept per stack, innermost first
+MAX_FRAMES = 64
+# The maximum combined size of the formatted stacks, in characters
+MAX_SIZE = 1 << 16
+# The maximum number of distinct folded stacks reported
+MAX_FOLDED_STACKS = 200
+
+
+def fold_stack(frame, max_frames=MAX_FRAMES):
+    """
+    Returns a stack in folded format, its frames from outermost to innermost joined
+    by semicolons.
+
+    :param frame: The innermost frame of the stack.
+    :param max_frames: The maximum number of frames kept, innermost first.
+    :rtype: str
+    """
+    names = []
+    while frame is not None and len(names) < max_frames:
+        code = frame.f_code
+        names.append("%s (%s:%s)" % (code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def get_thread_names():
+    """
+    Returns the names of all running threads.
+
+    :returns: A dict of thread idents to thread names.
+    :rtype: dict
+    """
+    return dict((t.ident, t.name) for t in threading.enumerate())
+
+
+def capture_threads(
+    frames=None, target=None, exclude=None, max_frames=MAX_FRAMES, max_size=MAX_SIZE
+):
+    """
+    Captures the stacks of all running threads. Threads with identical stacks, such
+    as idle pool workers, are grouped together.
+
+    :param frames: A dict of thread idents to frames, defaults to the current frame of
+                   every thread.
+    :param target: The ident of the thread of most interest, whose stack is listed
+                   first.
+    :param exclude: Thread idents to leave out, such as the capturing thread.
+    :param max_frames: The maximum number of frames kept per stack.
+    :param max_size: The maximum combined size of the formatted stacks. Stacks that
+                     don't fit are dropped and counted as truncated.
+    :returns: A list of dicts containing thread names and their formatted stack.
+    :rtype: list
+    """
+    if frames is None:
+        frames = sys._current_frames()
+    exclude = exclude or ()
+    names = get_thread_names()
+
+    stacks = collections.OrderedDict()
+    for ident, frame in sorted(frames.items(), key=lambda i: (i[0] != target, i[0])):
+        if ident in exclude or frame is None:
+            continue
+        summary = traceback.extract_stack(frame, limit=max_frames)
+        key = tuple((f[0], f[1], f[2]) for f in summary)
+        if key not in stacks:
+            stacks[key] = {
+                "names": [],
+                "stack": "".join(traceback.format_list(summary)),
+            }
+        stacks[key]["names"].append(names.get(ident, str(ident)))
+
+    threads = []
+    size = 0
+    truncated = 0
+    for thread in stacks.values():
+        # The first stack is always kept, so the target thread is never dropped
+        if threads and size + len(thread["stack"]) > max_size:
+            truncated += len(thread["names"])
+            continue
+        size += len(thread["stack"])
+        thread["count"] = len(thread["names"])
+        threads.append(thread)
+
+    if truncated:
+        threads.append(
+            {"count": truncated, "names": [], "stack": "", "truncated": True}
+        )
+
+    return threads
+
+
+class StackSampler(threading.Thread):
+    """
+    A daemon thread that periodically samples the stack of another thread, counting
+    how often each distinct stack is seen.
+    """
+
+    def __init__(self, target, interval, max_frames=MAX_FRAMES):
+        """
+        Instantiates a new stack sampler.
+
+        :param target: The ident of the thread to sample.
+        :param interval: The sampling interval, in seconds.
+        :param max_frames: The maximum number of frames kept per stack.
+        """
+        super(StackSampler, self).__init__(name="iopipe-stack-sampler")
+        self.daemon = True
+        self.counts = collections.Counter()
+        self.interval = interval
+        self.max_frames = max_frames
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.target = target
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.target)
+        if frame is not None:
+            self.counts[fold_stack(frame, self.max_frames)] += 1
+            self.samples += 1
+
+    def stop(self):
+        """
+        Stops sampling, waiting for an in-progress sample to finish.
+        """
+        self.stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    def folded(self, limit=MAX_FOLDED_STACKS):
+        """
+        Returns the most frequently sampled stacks.
+
+        :param limit: The maximum number of stacks returned.
+        :returns: A dict of folded stacks to sample counts.
+        :rtype: dict
+        """
+        return dict(self.counts.most_common(limit))
@@ -1,10 +1,42 @@
 from __future__ import division
 
 import os
+import re
 import socket
+import threading
 
 MB_FACTOR = float(1 << 20)
 
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Files read for each cgroup version, v1 files are relative to their controller
+CGROUP_FILES = {
+    1: {
+        "cpu_stat": ("cpu", "cpu.stat"),
+        "cpu_usage": ("cpuacct", "cpuacct.usage"),
+        "memory_limit": ("memory", "memory.limit_in_bytes"),
+        "memory_usage": ("memory", "memory.usage_in_bytes"),
+    },
+    2: {
+        "cpu_stat": "cpu.stat",
+        "memory_limit": "memory.max",
+        "memory_usage": "memory.current",
+    },
+}
+# cgroup v1 reports no memory limit as a page aligned LONG_MAX
+CGROUP_UNLIMITED = 1 << 62
+
+MEMINFO_PATTERN = re.compile(br"^(MemTotal|MemFree|MemAvailable):\s+(\d+)", re.M)
+NET_DEV_PATTERN = re.compile(
+    br"^\s*([^:\s]+):\s*(\d+)\s+(\d+)(?:\s+\d+){6}\s+(\d+)\s+(\d+)", re.M
+)
+PID_IO_PATTERN = re.compile(
+    br"^(rchar|wchar|syscr|syscw|read_bytes|write_bytes):\s+(\d+)", re.M
+)
+PID_STAT_PATTERN = re.compile(br"\) \S+(?: -?\d+){10} (\d+) (\d+) (-?\d+) (-?\d+)")
+PID_STATUS_PATTERN = re.compile(br"^(VmRSS|Threads|FDSize):\s+(\S+)", re.M)
+CGROUP_STAT_PATTERN = re.compile(br"^(\w+) (\d+)", re.M)
+STAT_PATTERN = re.compile(br"^cpu\d+ (\d+) (\d+) (\d+) (\d+) \d+ (\d+)", re.M)
+
 
 def read_bootid():
     """
@@ -37,6 +69,60 @@ def read_disk():
     }
 
 
+def find_cgroup(root=CGROUP_ROOT, proc_path="/proc/self/cgroup"):
+    """
+    Locates the cgroup accounting files for the current process.
+
+    :param root: The path cgroups are mounted at.
+    :param proc_path: The path of the process' cgroup membership file.
+    :returns: The cgroup version and paths of its accounting files, or None if
+              cgroups aren't available.
+    :rtype: dict
+    """
+    memberships = {}
+    try:
+        with open(proc_path, "rb") as cgroup_file:
+            for row in cgroup_file:
+                # Example content:
+                # 4:memory:/user.slice
+                # 0::/user.slice
+                _, controllers, path = row.decode("utf-8").strip().split(":", 2)
+                for controller in controllers.split(","):
+                    memberships[controller] = path.lstrip("/")
+    except (IOError, OSError, ValueError):
+        pass
+
+    if os.path.exists(os.path.join(root, "cgroup.controllers")):
+        version = 2
+        directory = os.path.join(root, memberships.get("", ""))
+        candidates = dict(
+            (name, [os.path.join(directory, f), os.path.join(root, f)])
+            for name, f in CGROUP_FILES[2].items()
+        )
+    else:
+        version = 1
+        candidates = dict(
+            (
+                name,
+                [
+                    os.path.join(root, controller, memberships.get(controller, ""), f),
+                    os.path.join(root, controller, f),
+                ],
+            )
+            for name, (controller, f) in CGROUP_FILES[1].items()
+        )
+
+    paths = {}
+    for name, files in candidates.items():
+        path = next((f for f in files if os.path.isfile(f)), None)
+        if path is not None:
+            paths[name] = path
+
+    if not paths:
+        return None
+    return {"version": version, "paths": paths}
+
+
 def read_hostname():
     """
     Returns the system hostname.
@@ -133,3 +219,255 @@ def read_stat():
                 }
             )
     return data
+
+
+class ProcReader(object):
+    """
+    Reads /proc files through file descriptors that are kept open between reads.
+    Each read re-reads a file into a reusable buffer and parses only the fields
+    included in the report.
+    """
+
+    def __init__(self, pid="self", buffer_size=4096, cgroup_root=CGROUP_ROOT):
+        """
+        Instantiates a new /proc reader.
+
+        :param pid: The process ID to read process information for.
+        :param buffer_size: The initial size of the read buffer, which grows as needed.
+        :param cgroup_root: The path cgroups are mounted at.
+        """
+        self.buffer = bytearray(buffer_size)
+        self.cgroup = None
+        self.cgroup_root = cgroup_root
+        self.fds = {}
+        self.lock = threading.Lock()
+        self.paths = {
+            "cgroup": "/proc/%s/cgroup" % (pid,),
+            "meminfo": "/proc/meminfo",
+            "net_dev": "/proc/%s/net/dev" % (pid,),
+            "pid_io": "/proc/%s/io" % (pid,),
+            "pid_stat": "/proc/%s/stat" % (pid,),
+            "pid_status": "/proc/%s/status" % (pid,),
+            "stat": "/proc/stat",
+        }
+        self.pid = os.getpid()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        """
+        Closes all open file descriptors.
+        """
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:  # pragma: no cover
+                pass
+        self.fds = {}
+
+    def read(self, name):
+        """
+        Reads a /proc file into the buffer.
+
+        :param name: The name of the file to read.
+        :returns: The number of bytes read.
+        :rtype: int
+        """
+        # File descriptors opened on /proc/self refer to the parent after a fork
+        if self.pid != os.getpid():
+            self.close()
+            self.pid = os.getpid()
+
+        fd = self.fds.get(name)
+        if fd is None:
+            fd = self.fds[name] = os.open(self.paths[name], os.O_RDONLY)
+
+        while True:
+            if hasattr(os, "preadv"):
+                size = os.preadv(fd, [self.buffer], 0)
+            else:  # pragma: no cover
+                os.lseek(fd, 0, os.SEEK_SET)
+                data = os.read(fd, len(self.buffer))
+                size = len(data)
+                self.buffer[:size] = data
+            if size < len(self.buffer):
+                return size
+            self.buffer = bytearray(len(self.buffer) * 2)
+
+    def read_int(self, name):
+        """
+        Reads a /proc or cgroup file containing a single integer.
+
+        :param name: The name of the file to read.
+        :returns: The integer, or None if it's unlimited or can't be read.
+        :rtype: int
+        """
+        try:
+            size = self.read(name)
+            value = bytes(self.buffer[:size]).strip()
+            if value == b"max":
+                return None
+            return int(value)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def read_cgroup(self):
+        """
+        Returns the memory and CPU accounting of the process' cgroup. CPU times are
+        in microseconds for both cgroup versions.
+
+        :returns: The cgroup accounting, or None if cgroups aren't available. Values
+                  that can't be read are left out, or None.
+        :rtype: dict
+        """
+        with self.lock:
+            if self.cgroup is None:
+                self.cgroup = find_cgroup(self.cgroup_root, self.paths["cgroup"])
+                if self.cgroup is None:
+                    self.cgroup = {}
+                self.paths.update(self.cgroup.get("paths", {}))
+            if not self.cgroup:
+                return None
+
+            paths = self.cgroup["paths"]
+            data = {"cpu": {}, "memory": {}, "version": self.cgroup["version"]}
+
+            if "memory_usage" in paths:
+                data["memory"]["usage"] = self.read_int("memory_usage")
+            if "memory_limit" in paths:
+                limit = self.read_int("memory_limit")
+                if limit is not None and limit >= CGROUP_UNLIMITED:
+                    limit = None
+                data["memory"]["limit"] = limit
+
+            if "cpu_stat" in paths:
+                try:
+                    size = self.read("cpu_stat")
+                except (IOError, OSError):
+                    size = 0
+                for match in CGROUP_STAT_PATTERN.finditer(self.buffer, 0, size):
+                    data["cpu"][match.group(1).decode("ascii")] = int(match.group(2))
+            if "throttled_time" in data["cpu"]:
+                data["cpu"]["throttled_usec"] = (
+                    data["cpu"].pop("throttled_time") // 1000
+                )
+            if "cpu_usage" in paths:
+                usage = self.read_int("cpu_usage")
+                if usage is not None:
+                    data["cpu"]["usage_usec"] = usage // 1000
+
+            return data
+
+    def read_meminfo(self):
+        """
+        Returns system memory usage information.
+
+        :returns: The system memory usage.
+        :rtype: dict
+        """
+        with self.lock:
+            size = self.read("meminfo")
+            return dict(
+                (m.group(1).decode("ascii"), int(m.group(2)) * 1024)
+                for m in MEMINFO_PATTERN.finditer(self.buffer, 0, size)
+            )
+
+    def read_net_dev(self):
+        """
+        Returns network traffic totals across all interfaces except loopback.
+
+        :returns: The network traffic totals, or None if they can't be read.
+        :rtype: dict
+        """
+        data = {"rx_bytes": 0, "rx_packets": 0, "tx_bytes": 0, "tx_packets": 0}
+        with self.lock:
+            try:
+                size = self.read("net_dev")
+            except (IOError, OSError):
+                return None
+            for match in NET_DEV_PATTERN.finditer(self.buffer, 0, size):
+                if match.group(1) == b"lo":
+                    continue
+                data["rx_bytes"] += int(match.group(2))
+                data["rx_packets"] += int(match.group(3))
+                data["tx_bytes"] += int(match.group(4))
+                data["tx_packets"] += int(match.group(5))
+        return data
+
+    def read_pid_io(self):
+        """
+        Returns the I/O counters of the process.
+
+        :returns: The I/O counters, or None if they can't be read.
+        :rtype: dict
+        """
+        with self.lock:
+            try:
+                size = self.read("pid_io")
+            except (IOError, OSError):
+                return None
+            return dict(
+                (m.group(1).decode("ascii"), int(m.group(2)))
+                for m in PID_IO_PATTERN.finditer(self.buffer, 0, size)
+            )
+
+    def read_pid_stat(self):
+        """
+        Returns system process stat information.
+
+        :returns: The system stat information.
+        :rtype: dict
+        """
+        with self.lock:
+            size = self.read("pid_stat")
+            # The process name can contain spaces and parens, so skip past it
+            match = PID_STAT_PATTERN.search(
+                self.buffer, self.buffer.rfind(b")", 0, size), size
+            )
+            return {
+                "utime": int(match.group(1)),
+                "stime": int(match.group(2)),
+                "cutime": int(match.group(3)),
+                "cstime": int(match.group(4)),
+            }
+
+    def read_pid_status(self):
+        """
+        Returns the system process status.
+
+        :returns: The system process status.
+        :rtype: dict
+        """
+        data = {}
+        with self.lock:
+            size = self.read("pid_status")
+            for match in PID_STATUS_PATTERN.finditer(self.buffer, 0, size):
+                key, value = match.group(1).decode("ascii"), match.group(2)
+                try:
+                    data[key] = int(value)
+                except ValueError:
+                    data[key] = value.decode("ascii")
+        return data
+
+    def read_stat(self):
+        """
+        Returns the system stat information.
+
+        :returns: The system stat information.
+        :rtype: list
+        """
+        with self.lock:
+            size = self.read("stat")
+            return [
+                {
+                    "times": {
+                        "user": int(m.group(1)),
+                        "nice": int(m.group(2)),
+                        "sys": int(m.group(3)),
+                        "idle": int(m.group(4)),
+                        "irq": int(m.group(5)),
+                    }
+                }
+                for m in STAT_PATTERN.finditer(self.buffer, 0, size)
+            ]
@@ -3,6 +3,8 @@ import signal
 import sys
 import threading
 
+from .stack import capture_threads, StackSampler
+
 
 def async_raise(target_tid, exception):
     # Ensuring and releasing GIL are useless since we're not in C
@@ -18,49 +20,154 @@ def async_raise(target_tid, exception):
         raise SystemError("PyThreadState_SetAsyncExc failed")
 
 
-class SignalTimeout(object):
-    def __init__(self, seconds):
+class BaseTimeout(object):
+    def __init__(self, seconds, sample_fraction=0, sample_interval=0.01):
+        """
+        Instantiates a new timeout.
+
+        :param seconds: The number of seconds until the timeout.
+        :param sample_fraction: The fraction of the time until the timeout, at the
+                                end, during which the timed thread's stack is
+                                sampled. Sampling is disabled if 0.
+        :param sample_interval: The stack sampling interval, in seconds.
+        """
         self.seconds = seconds
+        self.sample_fraction = min(max(sample_fraction, 0), 1)
+        self.sample_interval = sample_interval
+        self.target_tid = threading.current_thread().ident
+        self.frame = None
+        self.threads = None
+        self.sampler = None
+        self.samples = None
 
     def __enter__(self):
-        signal.signal(signal.SIGALRM, self.stop)
-        if self.seconds > 0:
-            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        self.start()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.cancel()
         return False
 
+    @property
+    def sample_delay(self):
+        """
+        The number of seconds until stack sampling starts, or None if disabled.
+        """
+        if self.seconds > 0 and self.sample_fraction > 0:
+            return self.seconds * (1 - self.sample_fraction)
+
+    def start_sampling(self):
+        self.sampler = StackSampler(self.target_tid, self.sample_interval)
+        self.sampler.start()
+
+    def stop_sampling(self, keep=False):
+        """
+        Stops stack sampling, keeping the samples only if the timeout fired.
+
+        :param keep: Whether or not to keep the samples.
+        """
+        sampler, self.sampler = self.sampler, None
+        if sampler is not None:
+            sampler.stop()
+            if keep:
+                self.samples = {
+                    "count": sampler.samples,
+                    "interval": int(self.sample_interval * 1000),
+                    "stacks": sampler.folded(),
+                }
+
+    def capture(self, frames, exclude=None):
+        """
+        Captures the stacks of all threads when the timeout fires.
+
+        :param frames: A dict of thread idents to frames.
+        :param exclude: Thread idents to leave out.
+        """
+        exclude = list(exclude or [])
+        if self.sampler is not None:
+            exclude.append(self.sampler.ident)
+        self.stop_sampling(keep=True)
+        self.frame = frames.get(self.target_tid)
+        self.threads = capture_threads(frames, target=self.target_tid, exclude=exclude)
+
+
+class SignalTimeout(BaseTimeout):
+    def start(self):
+        signal.signal(signal.SIGALRM, self.alarm)
+        delay = self.sample_delay
+        if delay == 0:
+            self.start_sampling()
+        elif delay is not None:
+            signal.setitimer(signal.ITIMER_REAL, delay)
+            return
+        if self.seconds > 0:
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+
     def cancel(self):
         signal.setitimer(signal.ITIMER_REAL, 0)
+        self.stop_sampling()
+
+    def alarm(self, signum, frame):
+        if self.sample_delay and self.sampler is None:
+            # Start sampling the stack for the rest of the time until the timeout
+            self.start_sampling()
+            signal.setitimer(signal.ITIMER_REAL, self.seconds - self.sample_delay)
+            return
+        self.stop(signum, frame)
 
     def stop(self, signum, frame):
+        # The interrupted frame is where the handler was when it timed out
+        frames = sys._current_frames()
+        frames[self.target_tid] = frame
+        self.capture(frames)
         raise TimeoutError
 
 
-class ThreadTimeout(object):
-    def __init__(self, seconds):
-        self.seconds = seconds
-        self.target_tid = threading.current_thread().ident
+class ThreadTimeout(BaseTimeout):
+    def __init__(self, *args, **kwargs):
+        super(ThreadTimeout, self).__init__(*args, **kwargs)
+        self.cancelled = False
+        self.lock = threading.Lock()
         self.timer = None
 
-    def __enter__(self):
-        self.timer = threading.Timer(self.seconds, self.stop)
+    def start(self):
+        delay = self.sample_delay
+        if delay == 0:
+            self.start_sampling()
+        elif delay is not None:
+            self.start_timer(delay, self.ramp)
+            return
         if self.seconds > 0:
-            self.timer.start()
-        return self
+            self.start_timer(self.seconds, self.stop)
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.cancel()
-        return False
+    def start_timer(self, seconds, func):
+        self.timer = threading.Timer(seconds, func)
+        self.timer.daemon = True
+        self.timer.start()
 
     def cancel(self):
-        if self.timer:
-            self.timer.cancel()
+        with self.lock:
+            self.cancelled = True
+            if self.timer:
+                self.timer.cancel()
+            self.stop_sampling()
+
+    def ramp(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            # Start sampling the stack for the rest of the time until the timeout
+            self.start_sampling()
+            self.start_timer(self.seconds - self.sample_delay, self.stop)
 
     def stop(self):
-        async_raise(self.target_tid, TimeoutError)
+        with self.lock:
+            if self.cancelled:
+                return
+            self.capture(
+                sys._current_frames(), exclude=[threading.current_thread().ident]
+            )
+            async_raise(self.target_tid, TimeoutError)
 
 
 class TimeoutError(Exception):
@@ -75,3 +182,31 @@ if sys.platform == "win32":
     Timeout = ThreadTimeout
 else:
     Timeout = SignalTimeout
+
+
+def create_timeout(seconds, sample_fraction=0, sample_interval=0.01):
+    """
+    Returns a timeout for the current thread. Signals can only be handled on the main
+    thread, so a thread timeout is used elsewhere.
+
+    :param seconds: The number of seconds until the timeout.
+    :param sample_fraction: The fraction of the time until the timeout, at the end,
+                            during which the thread's stack is sampled.
+    :param sample_interval: The stack sampling interval, in seconds.
+    :returns: The timeout context manager.
+    """
+    timeout_class = Timeout
+    if Timeout is SignalTimeout and not is_main_thread():
+        timeout_class = ThreadTimeout
+    return timeout_class(seconds, sample_fraction, sample_interval)
+
+
+def is_main_thread():
+    """
+    Returns true if called from the main thread.
+
+    :rtype: bool
+    """
+    if hasattr(threading, "main_thread"):
+        return threading.current_thread() is threading.main_thread()
+    return isinstance(threading.current_thread(), threading._MainThread)
@@ -0,0 +1,181 @@
+import collections
+import logging
+import threading
+import zlib
+
+import mock
+import pytest
+import requests
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from iopipe import constants, IOpipeCore
+from iopipe.compat import urlparse
+from iopipe.report import Report
+from iopipe.send_report import session
+
+COLLECTOR_URL = "https://metrics-api.iopipe.com"
+
+
+class FakeCollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        encoding = self.headers.get("Content-Encoding")
+        self.server.received.append(
+            {
+                "body": self.server.decompress(body, encoding),
+                "encoding": encoding,
+                "method": self.command,
+                "path": self.path,
+                "size": len(body),
+            }
+        )
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_PUT = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCollector(ThreadingMixIn, HTTPServer):
+    """
+    A local stand-in for the IOpipe collector and signed upload URLs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), FakeCollectorHandler)
+        self.received = collections.deque(maxlen=100)
+
+    def decompress(self, body, encoding):
+        if encoding == "gzip":
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        return body
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%s" % self.server_port
+
+
+class FakeCollectorAdapter(requests.adapters.HTTPAdapter):
+    """
+    Routes requests bound for the IOpipe collector to the fake collector.
+    """
+
+    def __init__(self, collector_url):
+        super(FakeCollectorAdapter, self).__init__()
+        self.collector_url = collector_url
+
+    def send(self, request, **kwargs):
+        parsed_url = urlparse(request.url)
+        request.url = self.collector_url + parsed_url.path
+        if parsed_url.query:
+            request.url = "?".join([request.url, parsed_url.query])
+        return super(FakeCollectorAdapter, self).send(request, **kwargs)
+
+
+def record_percentiles(benchmark, percentiles=(50, 90, 99)):
+    """
+    Adds tail latencies to the benchmark's machine-readable output.
+    """
+    stats = getattr(benchmark, "stats", None)
+    if stats is None:
+        return
+    data = sorted(stats.stats.data)
+    for percentile in percentiles:
+        index = min(len(data) - 1, int(len(data) * percentile / 100.0))
+        benchmark.extra_info["p%s" % percentile] = data[index]
+
+
+@pytest.fixture(autouse=True)
+def quiet_logger():
+    """Benchmarks run with the agent's default log level, not the test suite's"""
+    logger = logging.getLogger("iopipe")
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    yield
+    logger.setLevel(level)
+
+
+@pytest.fixture(scope="module")
+def fake_collector():
+    collector = FakeCollector()
+    thread = threading.Thread(target=collector.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    session.mount(COLLECTOR_URL, FakeCollectorAdapter(collector.url))
+
+    def signed_request(config, context, extension):
+        return {
+            "jwtAccess": "benchmark",
+            "signedRequest": "%s/upload%s" % (collector.url, extension),
+            "url": "%s/upload%s" % (collector.url, extension),
+        }
+
+    with mock.patch(
+        "iopipe.contrib.logger.plugin.get_signed_request", signed_request
+    ), mock.patch(
+        "iopipe.contrib.profiler.memory.get_signed_request", signed_request
+    ), mock.patch(
+        "iopipe.contrib.profiler.plugin.get_signed_request", signed_request
+    ):
+        yield collector
+
+    session.adapters.pop(COLLECTOR_URL, None)
+    collector.shutdown()
+    collector.server_close()
+
+
+@pytest.fixture
+def agent_factory(fake_collector):
+    def _agent_factory(agent_class=IOpipeCore, **kwargs):
+        kwargs.setdefault("token", "test-suite")
+        kwargs.setdefault("url", COLLECTOR_URL)
+        return agent_class(**kwargs)
+
+    return _agent_factory
+
+
+@pytest.fixture
+def coldstart():
+    def _coldstart():
+        constants.COLDSTART = True
+
+    yield _coldstart
+
+    constants.COLDSTART = False
+
+
+@pytest.fixture
+def large_report(mock_context):
+    iopipe = IOpipeCore(token="test-suite")
+    report = Report(iopipe, mock_context)
+    for i in range(1000):
+        report.custom_metrics.append({"name": "metric-%s" % i, "n": i})
+    for i in range(5000):
+        report.http_trace_entries.append(
+            {
+                "name": "measure:trace-%s" % i,
+                "startTime": i * 1.5,
+                "duration": 1.5,
+                "type": "measure",
+                "timestamp": 1546300800000 + i,
+                "request": {"hostname": "www.iopipe.com", "method": "GET"},
+                "response": {"headers": [], "statusCode": 200},
+            }
+        )
+    report.prepare()
+    return report
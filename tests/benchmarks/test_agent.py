@@ -0,0 +1,92 @@
+import pytest
+
+from iopipe import IOpipe, IOpipeCore
+from iopipe.contrib.eventinfo import EventInfoPlugin
+from iopipe.contrib.gc import GCPlugin
+from iopipe.contrib.logger import LoggerPlugin
+from iopipe.contrib.profiler import MemoryProfilerPlugin, ProfilerPlugin
+from iopipe.contrib.sampler import SamplerPlugin
+from iopipe.contrib.trace import TracePlugin
+
+from .conftest import record_percentiles
+
+COLD_ROUNDS = 50
+WARM_ROUNDS = 200
+
+PLUGINS = {
+    "event-info": lambda: EventInfoPlugin(),
+    "gc": lambda: GCPlugin(enabled=True),
+    "logger": lambda: LoggerPlugin(enabled=True),
+    "memory-profiler": lambda: MemoryProfilerPlugin(enabled=True),
+    "profiler": lambda: ProfilerPlugin(enabled=True),
+    "sampler": lambda: SamplerPlugin(enabled=True),
+    "trace": lambda: TracePlugin(),
+}
+
+
+def handler(event, context):
+    return {"statusCode": 200}
+
+
+def warm(benchmark, agent, context):
+    wrapped = agent(handler)
+    wrapped({}, context)
+
+    benchmark.pedantic(wrapped, args=({}, context), rounds=WARM_ROUNDS)
+    record_percentiles(benchmark)
+
+
+def cold(benchmark, coldstart, context, make_agent):
+    def setup():
+        coldstart()
+        return (make_agent()(handler), {}, context), {}
+
+    benchmark.pedantic(lambda wrapped, *a: wrapped(*a), setup=setup, rounds=COLD_ROUNDS)
+    record_percentiles(benchmark)
+
+
+@pytest.mark.benchmark(group="agent-baseline")
+def test_agent_baseline(benchmark, mock_context):
+    """Benchmarks the handler without the agent, for computing overhead"""
+    benchmark.pedantic(handler, args=({}, mock_context), rounds=WARM_ROUNDS)
+    record_percentiles(benchmark)
+
+
+@pytest.mark.benchmark(group="agent-cold")
+@pytest.mark.parametrize("agent_class", [IOpipeCore, IOpipe])
+def test_agent_cold(benchmark, agent_factory, coldstart, mock_context, agent_class):
+    """Benchmarks a coldstart invocation with a newly instantiated agent"""
+    cold(benchmark, coldstart, mock_context, lambda: agent_factory(agent_class))
+
+
+@pytest.mark.benchmark(group="agent-warm")
+@pytest.mark.parametrize("agent_class", [IOpipeCore, IOpipe])
+def test_agent_warm(benchmark, agent_factory, mock_context, agent_class):
+    """Benchmarks warm invocations"""
+    warm(benchmark, agent_factory(agent_class), mock_context)
+
+
+@pytest.mark.benchmark(group="agent-plugin-cold")
+@pytest.mark.parametrize("plugin", sorted(PLUGINS))
+def test_agent_plugin_cold(benchmark, agent_factory, coldstart, mock_context, plugin):
+    """Benchmarks a coldstart invocation with a single bundled plugin loaded"""
+    cold(
+        benchmark,
+        coldstart,
+        mock_context,
+        lambda: agent_factory(plugins=[PLUGINS[plugin]()]),
+    )
+
+
+@pytest.mark.benchmark(group="agent-plugin-warm")
+@pytest.mark.parametrize("plugin", sorted(PLUGINS))
+def test_agent_plugin_warm(benchmark, agent_factory, mock_context, plugin):
+    """Benchmarks warm invocations with a single bundled plugin loaded"""
+    warm(benchmark, agent_factory(plugins=[PLUGINS[plugin]()]), mock_context)
+
+
+@pytest.mark.benchmark(group="agent-sync-http")
+@pytest.mark.parametrize("sync_http", [False, True])
+def test_agent_sync_http(benchmark, agent_factory, mock_context, sync_http):
+    """Benchmarks warm invocations with synchronous and pooled report delivery"""
+    warm(benchmark, agent_factory(IOpipe, sync_http=sync_http), mock_context)
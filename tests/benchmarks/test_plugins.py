@@ -0,0 +1,49 @@
+import pytest
+
+from iopipe import IOpipeCore
+from iopipe.plugins import HOOKS, Plugin
+
+
+class CountingPlugin(Plugin):
+    name = None
+    version = "0.1.0"
+    homepage = "https://github.com/iopipe"
+    enabled = True
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def pre_setup(self, iopipe):
+        pass
+
+    def post_setup(self, iopipe):
+        pass
+
+    def pre_invoke(self, event, context):
+        self.calls += 1
+
+    def post_invoke(self, event, context):
+        self.calls += 1
+
+    def post_response(self, response):
+        pass
+
+    def pre_report(self, report):
+        self.calls += 1
+
+    def post_report(self, report):
+        pass
+
+
+@pytest.mark.benchmark(group="plugin-hooks")
+@pytest.mark.parametrize("hook", [name for name, _ in HOOKS])
+@pytest.mark.parametrize("plugin_count", [3, 20])
+def test_run_hooks(benchmark, mock_context, plugin_count, hook):
+    """Benchmarks dispatching a single hook to the loaded plugins"""
+    iopipe = IOpipeCore(
+        token="test-suite",
+        plugins=[CountingPlugin("plugin-%s" % i) for i in range(plugin_count)],
+    )
+
+    benchmark(iopipe.run_hooks, hook, event={}, context=mock_context, response={})
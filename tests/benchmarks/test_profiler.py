@@ -0,0 +1,132 @@
+from concurrent.futures import Future
+import cProfile
+import os
+import tempfile
+import threading
+
+import pytest
+
+from iopipe import IOpipeCore
+from iopipe.contrib.profiler import ProfilerPlugin
+from iopipe.stack import StackSampler
+
+from .conftest import record_percentiles
+
+ROUNDS = 20
+
+PROFILERS = {
+    "none": lambda: [],
+    "cprofile": lambda: [ProfilerPlugin(enabled=True)],
+    "sampling": lambda: [ProfilerPlugin(enabled=True, mode="sampling")],
+}
+
+
+def fibonacci(n):
+    if n < 2:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+
+
+def handler(event, context):
+    return fibonacci(20)
+
+
+@pytest.mark.benchmark(group="profiler-overhead")
+@pytest.mark.parametrize("profiler", ["none", "cprofile", "sampling"])
+def test_profiler_overhead(benchmark, agent_factory, mock_context, profiler):
+    """Benchmarks a call-heavy, CPU-bound handler under each profiler mode"""
+    agent = agent_factory(IOpipeCore, plugins=PROFILERS[profiler]())
+    wrapped = agent(handler)
+    wrapped({}, mock_context)
+
+    benchmark.pedantic(wrapped, args=({}, mock_context), rounds=ROUNDS)
+    record_percentiles(benchmark)
+
+
+def profile_cprofile():
+    profile = cProfile.Profile()
+    profile.enable()
+    handler({}, None)
+    profile.disable()
+
+
+def profile_sampling():
+    sampler = StackSampler(threading.current_thread().ident, 0.01)
+    sampler.start()
+    handler({}, None)
+    sampler.stop()
+
+
+@pytest.mark.benchmark(group="profiler-collection")
+@pytest.mark.parametrize(
+    "profile",
+    [lambda: handler({}, None), profile_cprofile, profile_sampling],
+    ids=["none", "cprofile", "sampling"],
+)
+def test_profiler_collection(benchmark, profile):
+    """Benchmarks the handler under each profiler, without the agent or upload"""
+    benchmark.pedantic(profile, rounds=ROUNDS * 5)
+    record_percentiles(benchmark)
+
+
+def make_profile(calls=50000, functions=1000):
+    """Returns a profile of calls spread evenly over distinct functions"""
+    namespace = {}
+    for i in range(functions):
+        exec("def function_%s(): pass" % i, namespace)
+    funcs = [namespace["function_%s" % i] for i in range(functions)]
+
+    profile = cProfile.Profile()
+    profile.enable()
+    for _ in range(calls // functions):
+        for func in funcs:
+            func()
+    profile.disable()
+    return profile
+
+
+class MockReport(object):
+    def __init__(self):
+        self.labels = set()
+        self.plugins = [{"name": "profiler"}]
+        self.report = {"duration": 0}
+
+
+def pre_report_handler_thread(profile):
+    """The previous pre_report, which dumped the profile to a file before uploading"""
+    with tempfile.NamedTemporaryFile(delete=False) as stats_file:
+        profile.dump_stats(stats_file.name)
+    os.remove(stats_file.name)
+
+
+@pytest.mark.benchmark(group="profiler-pre-report")
+def test_profiler_pre_report_handler_thread(benchmark):
+    """Benchmarks dumping a 50k call profile on the handler thread"""
+    profile = make_profile()
+    benchmark.pedantic(pre_report_handler_thread, args=(profile,), rounds=ROUNDS)
+    record_percentiles(benchmark)
+
+
+@pytest.mark.benchmark(group="profiler-pre-report")
+def test_profiler_pre_report(benchmark, agent_factory, fake_collector, mock_context):
+    """Benchmarks pre_report with a 50k call profile, serialized in the pool"""
+    agent = agent_factory(IOpipeCore)
+    plugin = ProfilerPlugin(enabled=True)
+    plugin.pre_setup(agent)
+    plugin.context = mock_context
+    profile = make_profile()
+
+    def setup():
+        signed_request = Future()
+        signed_request.set_result(
+            {"signedRequest": "%s/upload.cprofile" % fake_collector.url}
+        )
+        plugin.profile = profile
+        plugin.sampler = None
+        plugin.signed_request = signed_request
+        plugin.summary_future = None
+        return (MockReport(),), {}
+
+    benchmark.pedantic(plugin.pre_report, setup=setup, rounds=ROUNDS)
+    agent.wait_for_futures()
+    record_percentiles(benchmark)
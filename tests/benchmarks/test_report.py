@@ -0,0 +1,28 @@
+import mock
+import pytest
+
+from iopipe import IOpipeCore
+from iopipe.report import Report
+
+
+@pytest.mark.benchmark(group="report-send")
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_report_send(mock_send_report, benchmark, large_report):
+    """Benchmarks the handler thread's share of sending a large report"""
+
+    def setup():
+        large_report.client.wait_for_futures()
+        large_report.sent = False
+
+    benchmark.pedantic(large_report.send, setup=setup, rounds=20)
+
+
+@pytest.mark.benchmark(group="report-prepare")
+def test_report_prepare(benchmark, mock_context):
+    """Benchmarks creating and preparing a report for a warm invocation"""
+    iopipe = IOpipeCore(token="test-suite")
+
+    def prepare():
+        Report(iopipe, mock_context).prepare()
+
+    benchmark(prepare)
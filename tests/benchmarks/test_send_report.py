@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from iopipe.config import set_config
+from iopipe.send_report import compress, send_report
+from iopipe.serializer import encode
+
+from .conftest import COLLECTOR_URL
+
+PAYLOAD_SIZES = [1, 10, 100, 1000]  # KiB
+COMPRESSION = [(None, 0), ("gzip", 1), ("gzip", 6), ("deflate", 1)]
+
+
+def make_payload(size):
+    """Returns an encoded report of roughly `size` KiB of HTTP trace entries"""
+    entries, payload = [], b""
+    while len(payload) < size * 1024:
+        entries.extend(
+            {
+                "name": "measure:trace-%s" % i,
+                "startTime": i * 1.5,
+                "duration": 1.5,
+                "type": "measure",
+                "timestamp": 1546300800000 + i,
+                "request": {"hostname": "www.iopipe.com", "path": "/items/%s" % i},
+                "response": {"headers": [], "statusCode": 200},
+            }
+            for i in range(len(entries), len(entries) + 10)
+        )
+        payload = encode({"httpTraceEntries": entries})
+    return payload
+
+
+@pytest.fixture(scope="module")
+def payloads():
+    return dict((size, make_payload(size)) for size in PAYLOAD_SIZES)
+
+
+def test_fake_collector_decompresses(fake_collector, payloads):
+    """Assert that compressed reports arrive intact at the collector"""
+    for encoding, level in COMPRESSION:
+        config = set_config(
+            compression=encoding,
+            compression_level=level,
+            compression_threshold=0,
+            token="test-suite",
+            url=COLLECTOR_URL,
+        )
+        send_report(payloads[10], config)
+
+        received = fake_collector.received[-1]
+        assert received["encoding"] == encoding
+        assert json.loads(received["body"].decode("utf-8")) == json.loads(
+            payloads[10].decode("utf-8")
+        )
+
+
+@pytest.mark.benchmark(group="send-report-compress")
+@pytest.mark.parametrize("encoding,level", COMPRESSION[1:])
+@pytest.mark.parametrize("size", PAYLOAD_SIZES)
+def test_compress(benchmark, payloads, size, encoding, level):
+    """Benchmarks the CPU cost of compressing a report"""
+    compressed = benchmark(compress, payloads[size], encoding, level)
+    benchmark.extra_info["ratio"] = len(payloads[size]) / float(len(compressed))
+
+
+@pytest.mark.benchmark(group="send-report-upload")
+@pytest.mark.parametrize("encoding,level", COMPRESSION)
+@pytest.mark.parametrize("size", PAYLOAD_SIZES)
+def test_send_report(benchmark, fake_collector, payloads, size, encoding, level):
+    """Benchmarks compressing and uploading a report to the fake collector"""
+    config = set_config(
+        compression=encoding,
+        compression_level=level,
+        compression_threshold=0,
+        token="test-suite",
+        url=COLLECTOR_URL,
+    )
+    benchmark(send_report, payloads[size], config)
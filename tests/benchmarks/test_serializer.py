@@ -0,0 +1,10 @@
+import pytest
+
+from iopipe import serializer
+
+
+@pytest.mark.benchmark(group="serializer-report")
+@pytest.mark.parametrize("name", list(serializer.SERIALIZERS))
+def test_serialize_report(benchmark, large_report, name):
+    """Benchmarks encoding a report with 1k custom metrics and 5k trace entries"""
+    benchmark(serializer.encode, large_report.report, serializer=name)
@@ -0,0 +1,167 @@
+import json
+import uuid
+
+import pytest
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+from iopipe import IOpipeCore
+from iopipe.context import ContextWrapper
+from iopipe.contrib.trace.marker import Marker
+from iopipe.contrib.trace.timeline import Timeline
+from iopipe.contrib.trace.util import add_timeline_measures
+from iopipe.report import Report
+
+from .conftest import record_percentiles
+
+SIZES = [10000, 100000, 1000000]
+
+
+def rounds(benchmark, size):
+    # The largest sizes take seconds, so only run them when benchmarking
+    if benchmark.disabled and size > 100000:
+        pytest.skip("Only run when benchmarking")
+    return max(1, 100000 // size)
+
+
+def mark_and_measure(size):
+    """Marks the start and end of size / 2 operations, then measures them"""
+    timeline = Timeline()
+    for i in range(size // 2):
+        timeline.mark("start:%s" % i)
+        timeline.mark("end:%s" % i)
+    add_timeline_measures(timeline)
+    return timeline.get_entries()
+
+
+def measure_and_delete(size):
+    """Traces size / 2 operations like the auto tracers, deleting their marks"""
+    timeline = Timeline()
+    for i in range(size // 2):
+        timeline.mark("start:%s" % i)
+        timeline.mark("end:%s" % i)
+        timeline.measure("measure:%s" % i, "start:%s" % i, "end:%s" % i)
+        timeline.delete("start:%s" % i)
+        timeline.delete("end:%s" % i)
+        timeline.delete("measure:%s" % i)
+    return timeline.get_entries()
+
+
+@pytest.mark.benchmark(group="timeline-mark-and-measure")
+@pytest.mark.parametrize("size", SIZES)
+def test_timeline_mark_and_measure(benchmark, size):
+    """Benchmarks marking operations and adding their measures before reporting"""
+    entries = benchmark.pedantic(
+        mark_and_measure, args=(size,), rounds=rounds(benchmark, size)
+    )
+    assert len(entries) == size // 2 * 3
+    record_percentiles(benchmark)
+
+
+@pytest.mark.benchmark(group="timeline-measure-and-delete")
+@pytest.mark.parametrize("size", SIZES)
+def test_timeline_measure_and_delete(benchmark, size):
+    """Benchmarks measuring and deleting operations, as the auto tracers do"""
+    entries = benchmark.pedantic(
+        measure_and_delete, args=(size,), rounds=rounds(benchmark, size)
+    )
+    assert len(entries) == 0
+    record_percentiles(benchmark)
+
+
+def trace_with_marks(context):
+    """How the auto tracers previously traced each call"""
+    id = str(uuid.uuid4())
+    with context.iopipe.mark(id):
+        pass
+    trace = context.iopipe.mark.measure(id)
+    context.iopipe.mark.delete(id)
+    return trace
+
+
+def trace_with_span(context):
+    with context.iopipe.mark.span(record=False) as span:
+        pass
+    return span.entry
+
+
+@pytest.mark.benchmark(group="timeline-trace")
+@pytest.mark.parametrize(
+    "trace", [trace_with_marks, trace_with_span], ids=["marks", "span"]
+)
+def test_timeline_trace(benchmark, mock_context, trace):
+    """Benchmarks the per call overhead of an auto traced call"""
+    agent = IOpipeCore(token="test-suite")
+    agent.report = Report(agent, mock_context)
+    context = ContextWrapper(mock_context, agent)
+    timeline = Timeline()
+    context.iopipe.register("mark", Marker(timeline, context))
+
+    entry = benchmark(trace, context)
+    assert entry.entryType == "measure"
+    assert len(timeline.get_entries()) == 0
+    record_percentiles(benchmark)
+
+
+def db_trace(context, size):
+    """Traces size Redis calls like the auto DB tracer"""
+    context.instance.report.db_trace_entries = []
+    request = {"command": "GET", "hostname": "localhost"}
+    for _ in range(size):
+        with context.iopipe.mark.span(record=False) as span:
+            pass
+        context.iopipe.mark.db_trace(span.entry, "redis", request)
+    return context.instance.report.db_trace_entries
+
+
+@pytest.mark.benchmark(group="timeline-db-trace")
+@pytest.mark.parametrize("max_trace_entries", [None, 1000], ids=["all", "capped"])
+def test_timeline_db_trace(benchmark, mock_context, max_trace_entries):
+    """Benchmarks tracing many DB calls, with and without a cap on entries"""
+    agent = IOpipeCore(token="test-suite")
+    agent.report = Report(agent, mock_context)
+    context = ContextWrapper(mock_context, agent)
+    marker = Marker(Timeline(), context, max_trace_entries)
+    context.iopipe.register("mark", marker)
+
+    size = 100000
+    entries = benchmark.pedantic(db_trace, args=(context, size), rounds=3)
+    assert len(entries) == (max_trace_entries or size)
+    record_percentiles(benchmark)
+
+    # tracemalloc requires Python 3.4 or later
+    if tracemalloc is not None:
+        tracemalloc.start()
+        db_trace(context, size)
+        benchmark.extra_info["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+def trace_loop(context, timeline, size):
+    """Traces size iterations of a loop with a block, then reports the timeline"""
+    timeline.clear()
+    for _ in range(size):
+        with context.iopipe.mark("loop"):
+            pass
+    add_timeline_measures(timeline)
+    return [e._asdict() for e in timeline.get_entries()]
+
+
+@pytest.mark.benchmark(group="timeline-aggregate")
+@pytest.mark.parametrize("aggregate", [False, True], ids=["raw", "aggregate"])
+def test_timeline_aggregate(benchmark, mock_context, aggregate):
+    """Benchmarks tracing a loop, with and without aggregating its measures"""
+    agent = IOpipeCore(token="test-suite")
+    agent.report = Report(agent, mock_context)
+    context = ContextWrapper(mock_context, agent)
+    timeline = Timeline(aggregate=aggregate)
+    context.iopipe.register("mark", Marker(timeline, context))
+
+    size = 10000
+    entries = benchmark.pedantic(trace_loop, args=(context, timeline, size), rounds=5)
+    assert len(entries) == (21 if aggregate else size * 3)
+    benchmark.extra_info["payload_size"] = len(json.dumps(entries))
+    record_percentiles(benchmark)
@@ -1,6 +1,7 @@
 import json
 import mock
 import numbers
+import threading
 import time
 from decimal import Decimal
 
@@ -182,6 +183,24 @@ def handler_that_timeouts(iopipe):
     return iopipe, _handler_that_timeouts
 
 
+@pytest.fixture
+def handler_that_timeouts_with_threads(iopipe):
+    @iopipe
+    def _handler_that_timeouts_with_threads(event, context):
+        event = threading.Event()
+        workers = [
+            threading.Thread(target=event.wait, name="worker-%s" % i) for i in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            time.sleep(1)
+        finally:
+            event.set()
+
+    return iopipe, _handler_that_timeouts_with_threads
+
+
 @pytest.fixture
 def handler_with_sync_http(iopipe_with_sync_http):
     @iopipe_with_sync_http
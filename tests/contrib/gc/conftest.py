@@ -0,0 +1,27 @@
+import gc
+
+import pytest
+
+from iopipe import IOpipeCore
+from iopipe.contrib.gc import GCPlugin
+
+
+@pytest.fixture
+def iopipe_with_gc():
+    plugin = GCPlugin(enabled=True, timeline=True, max_pauses=3)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_gc(iopipe_with_gc):
+    @iopipe_with_gc
+    def _handler(event, context):
+        for generation in (0, 1, 2, 2):
+            gc.collect(generation)
+
+    return iopipe_with_gc, _handler
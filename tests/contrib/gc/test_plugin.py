@@ -0,0 +1,103 @@
+import gc
+import sys
+
+import mock
+import pytest
+
+from iopipe.contrib.gc import GCPlugin
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(gc, "callbacks"), reason="gc callbacks require python 3.3+"
+)
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__gc_plugin(mock_send_report, handler_with_gc, mock_context):
+    iopipe, handler = handler_with_gc
+    plugin = iopipe.config["plugins"][0]
+
+    assert plugin.enabled is True
+
+    handler({}, mock_context)
+
+    metrics = dict(
+        (m["name"], m["n"])
+        for m in iopipe.report.custom_metrics
+        if m["name"].startswith("@iopipe/gc.")
+    )
+
+    assert metrics["@iopipe/gc.collections.gen0"] >= 1
+    assert metrics["@iopipe/gc.collections.gen1"] >= 1
+    assert metrics["@iopipe/gc.collections.gen2"] >= 2
+    assert metrics["@iopipe/gc.pause_ms"] >= metrics["@iopipe/gc.max_pause_ms"] > 0
+    assert "@iopipe/gc.collected" in metrics
+    assert "@iopipe/gc.uncollectable" in metrics
+    assert "@iopipe/plugin-gc" in iopipe.report.labels
+
+    assert plugin.callback not in gc.callbacks
+
+    entries = iopipe.report.performance_entries
+    assert len(entries) == 3
+    for entry in entries:
+        assert entry["name"].startswith("measure:@iopipe/gc:gen")
+        assert entry["entryType"] == "measure"
+        assert entry["duration"] > 0
+    assert max(e["duration"] for e in entries) == pytest.approx(
+        metrics["@iopipe/gc.max_pause_ms"], abs=0.001
+    )
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__gc_plugin_disabled(mock_send_report, handler_with_gc, mock_context):
+    iopipe, handler = handler_with_gc
+    iopipe.config["plugins"][0]._enabled = False
+
+    handler({}, mock_context)
+
+    assert not any(
+        m["name"].startswith("@iopipe/gc.") for m in iopipe.report.custom_metrics
+    )
+    assert iopipe.report.performance_entries == []
+
+
+def test__gc_plugin_longest_pauses():
+    plugin = GCPlugin(max_pauses=2)
+    info = {"generation": 0, "collected": 1, "uncollectable": 0}
+
+    for duration in (0.3, 0.1, 0.2, 0.4):
+        plugin.callback("start", info)
+        plugin.pause_start -= duration
+        plugin.callback("stop", info)
+
+    assert sorted(round(d, 1) for d in plugin.pause_durations) == [0.3, 0.4]
+    assert plugin.counts == [4, 0, 0]
+    assert plugin.collected == 4
+
+
+@pytest.mark.skipif(
+    not hasattr(sys, "getallocatedblocks"), reason="requires sys.getallocatedblocks"
+)
+def test__gc_plugin_callback_allocations():
+    plugin = GCPlugin()
+    info = {"generation": 2, "collected": 0, "uncollectable": 0}
+
+    plugin.callback("start", info)
+    plugin.callback("stop", info)
+
+    blocks = sys.getallocatedblocks()
+    for _ in range(1000):
+        plugin.callback("start", info)
+        plugin.callback("stop", info)
+
+    assert sys.getallocatedblocks() - blocks < 10
+
+
+def test__gc_plugin_callback(benchmark):
+    plugin = GCPlugin()
+    info = {"generation": 0, "collected": 0, "uncollectable": 0}
+
+    def collection():
+        plugin.callback("start", info)
+        plugin.callback("stop", info)
+
+    benchmark(collection)
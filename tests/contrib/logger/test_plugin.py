@@ -1,11 +1,13 @@
 from datetime import datetime
 import json
+import logging
 import mock
 import sys
 
 import pytest
 
 from iopipe.compat import PY37
+from iopipe.contrib.logger.formatter import JSONFormatter
 from iopipe.system import read_disk
 
 
@@ -167,3 +169,14 @@ def test__logger_plugin__use_tmp__disk_used(
     handler({}, mock_context)
 
     assert iopipe.report.report["disk"]["usedMiB"] >= disk_usage["usedMiB"]
+
+
+def test__json_formatter__non_ascii():
+    """Asserts that non-ASCII messages are escaped, so log files are ASCII"""
+    record = logging.LogRecord(
+        "testlog", logging.INFO, __file__, 1, u"Caf\u00e9 \u2615", None, None
+    )
+    line = JSONFormatter().format(record)
+
+    assert '"message": "Caf\\u00e9 \\u2615"' in line
+    line.encode("ascii")
@@ -2,7 +2,7 @@ import pytest
 import time
 
 from iopipe import IOpipeCore
-from iopipe.contrib.profiler import ProfilerPlugin
+from iopipe.contrib.profiler import MemoryProfilerPlugin, ProfilerPlugin
 
 
 @pytest.fixture
@@ -23,3 +23,105 @@ def handler_with_profiler(iopipe_with_profiler):
         time.sleep(0.1)
 
     return iopipe_with_profiler, _handler
+
+
+@pytest.fixture
+def iopipe_with_memory_profiler():
+    plugin = MemoryProfilerPlugin(enabled=True, top_n=5)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_memory_profiler(iopipe_with_memory_profiler):
+    @iopipe_with_memory_profiler
+    def _handler(event, context):
+        context.data = [bytearray(1024) for _ in range(100)]
+
+    return iopipe_with_memory_profiler, _handler
+
+
+@pytest.fixture
+def iopipe_with_sampling_profiler():
+    plugin = ProfilerPlugin(enabled=True, mode="sampling", sample_interval=1)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_sampling_profiler(iopipe_with_sampling_profiler):
+    @iopipe_with_sampling_profiler
+    def _handler(event, context):
+        time.sleep(0.1)
+
+    return iopipe_with_sampling_profiler, _handler
+
+
+@pytest.fixture
+def iopipe_with_tail_profiler():
+    plugin = ProfilerPlugin(enabled=True, sample_interval=1, retention="tail")
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_tail_profiler(iopipe_with_tail_profiler):
+    @iopipe_with_tail_profiler
+    def _handler(event, context):
+        time.sleep(event.get("sleep", 0))
+        if event.get("error"):
+            raise Exception(event["error"])
+
+    return iopipe_with_tail_profiler, _handler
+
+
+@pytest.fixture
+def iopipe_with_aggregating_profiler():
+    plugin = ProfilerPlugin(enabled=True, aggregate_invocations=3)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_aggregating_profiler(iopipe_with_aggregating_profiler):
+    @iopipe_with_aggregating_profiler
+    def _handler(event, context):
+        sum(range(1000))
+
+    return iopipe_with_aggregating_profiler, _handler
+
+
+@pytest.fixture
+def iopipe_with_summary_profiler():
+    plugin = ProfilerPlugin(enabled=True, summary=5, upload=False)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_summary_profiler(iopipe_with_summary_profiler):
+    @iopipe_with_summary_profiler
+    def _handler(event, context):
+        sorted(str(i) for i in range(1000))
+
+    return iopipe_with_summary_profiler, _handler
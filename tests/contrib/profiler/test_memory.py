@@ -0,0 +1,136 @@
+import mock
+import pytest
+import warnings
+
+from iopipe.contrib.profiler import MemoryProfilerPlugin
+from iopipe.contrib.profiler.memory import dump_snapshot_diff
+
+tracemalloc = pytest.importorskip("tracemalloc")
+
+
+@mock.patch("iopipe.contrib.profiler.memory.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.memory.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__memory_profiler_plugin(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_memory_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_memory_profiler
+
+    mock_get_signed_request.return_value = {
+        "jwtAccess": "foobar",
+        "signedRequest": "https://mock_signed_url",
+        "url": "https://mock_url",
+    }
+
+    handler({}, mock_context)
+
+    mock_get_signed_request.assert_called_once_with(
+        iopipe.config, mock.ANY, ".tracemalloc"
+    )
+    mock_upload_profile.assert_called_once_with(
+        "https://mock_signed_url", dump_snapshot_diff, mock.ANY, iopipe.config
+    )
+
+    stats = mock_upload_profile.call_args[0][2]
+    dump = dump_snapshot_diff(stats).decode("utf-8")
+    assert len(dump.splitlines()) == len(stats)
+    assert "conftest.py" in dump.splitlines()[0]
+
+    plugin = next((p for p in iopipe.report.plugins if p["name"] == "memory-profiler"))
+    assert plugin["uploads"] == ["foobar"]
+    assert plugin["peak"] >= 100 * 1024
+    assert 0 < len(plugin["allocations"]) <= 5
+
+    allocation = plugin["allocations"][0]
+    assert allocation["size_diff"] >= 100 * 1024
+    assert "conftest.py" in allocation["traceback"][0]
+    assert len(allocation["traceback"]) == 1
+
+    assert "@iopipe/plugin-memory-profiler" in iopipe.report.labels
+    assert tracemalloc.is_tracing() is False
+
+
+@mock.patch("iopipe.contrib.profiler.memory.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__memory_profiler_plugin_frame_depth(
+    mock_send_report,
+    mock_get_signed_request,
+    handler_with_memory_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_memory_profiler
+    plugin = iopipe.config["plugins"][0]
+    plugin.frame_depth = 3
+    plugin.upload = False
+
+    handler({}, mock_context)
+
+    mock_get_signed_request.assert_not_called()
+
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "memory-profiler"))
+    assert "uploads" not in meta
+    assert max(len(a["traceback"]) for a in meta["allocations"]) > 1
+
+
+@mock.patch("iopipe.contrib.profiler.memory.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.memory.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__memory_profiler_plugin_frame_depth_dump(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_memory_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_memory_profiler
+    iopipe.config["plugins"][0].frame_depth = 3
+
+    mock_get_signed_request.return_value = {"signedRequest": "https://mock_signed_url"}
+
+    handler({}, mock_context)
+
+    stats = mock_upload_profile.call_args[0][2]
+    assert len(dump_snapshot_diff(stats).splitlines()) > len(stats)
+
+
+@mock.patch("iopipe.contrib.profiler.memory.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__memory_profiler_plugin_sample_rate(
+    mock_send_report,
+    mock_get_signed_request,
+    handler_with_memory_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_memory_profiler
+    iopipe.config["plugins"][0].sample_rate = 0
+
+    handler({}, mock_context)
+
+    mock_get_signed_request.assert_not_called()
+
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "memory-profiler"))
+    assert "allocations" not in meta
+    assert "@iopipe/plugin-memory-profiler" not in iopipe.report.labels
+
+
+def test__memory_profiler_plugin_options(monkeypatch):
+    monkeypatch.setenv("IOPIPE_MEMORY_PROFILER_SAMPLE_RATE", "0.25")
+    monkeypatch.setenv("IOPIPE_MEMORY_PROFILER_FRAME_DEPTH", "5")
+
+    plugin = MemoryProfilerPlugin()
+    assert plugin.sample_rate == 0.25
+    assert plugin.frame_depth == 5
+
+    plugin = MemoryProfilerPlugin(sample_rate=2, frame_depth=0)
+    assert plugin.sample_rate == 1.0
+    assert plugin.frame_depth == 1
+
+    monkeypatch.setenv("IOPIPE_MEMORY_PROFILER_SAMPLE_RATE", "foobar")
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert MemoryProfilerPlugin().sample_rate == 1.0
+        assert len(w) == 1
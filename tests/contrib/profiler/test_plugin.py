@@ -1,13 +1,20 @@
+import collections
+import marshal
 import mock
+import time
+import warnings
 
+from iopipe.contrib.profiler import ProfilerPlugin
+from iopipe.contrib.profiler.util import get_wait_timeout
 
-@mock.patch("iopipe.contrib.profiler.plugin.upload_profiler_report", autospec=True)
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
 @mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
 @mock.patch("iopipe.report.send_report", autospec=True)
 def test__profiler_plugin(
     mock_send_report,
     mock_get_signed_request,
-    mock_upload_profiler_report,
+    mock_upload_profile,
     handler_with_profiler,
     mock_context,
 ):
@@ -28,8 +35,8 @@ def test__profiler_plugin(
     mock_get_signed_request.assert_called_once_with(
         iopipe.config, mock.ANY, ".cprofile"
     )
-    mock_upload_profiler_report.assert_called_once_with(
-        "https://mock_signed_url", mock.ANY, iopipe.config
+    mock_upload_profile.assert_called_once_with(
+        "https://mock_signed_url", mock.ANY, mock.ANY, iopipe.config, False
     )
 
     plugin = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
@@ -37,3 +44,281 @@ def test__profiler_plugin(
     assert plugin["uploads"][0] == "foobar"
     assert "@iopipe/plugin-profiler" in iopipe.report.labels
     assert "@iopipe/metrics" not in iopipe.report.labels
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__profiler_plugin_sampling(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_sampling_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_sampling_profiler
+    plugin = iopipe.config["plugins"][0]
+
+    assert plugin.mode == "sampling"
+    assert plugin.sample_interval == 0.001
+
+    mock_get_signed_request.return_value = {
+        "jwtAccess": "foobar",
+        "signedRequest": "https://mock_signed_url",
+        "url": "https://mock_url",
+    }
+    folded = {}
+
+    def upload_profile(url, dump, profile, config, compressed):
+        for line in dump(profile).decode("utf-8").splitlines():
+            stack, count = line.rsplit(" ", 1)
+            folded[stack] = int(count)
+
+    mock_upload_profile.side_effect = upload_profile
+
+    handler({}, mock_context)
+
+    mock_get_signed_request.assert_called_once_with(iopipe.config, mock.ANY, ".folded")
+    mock_upload_profile.assert_called_once_with(
+        "https://mock_signed_url", mock.ANY, mock.ANY, iopipe.config, False
+    )
+
+    assert plugin.sampler.is_alive() is False
+    assert sum(folded.values()) == plugin.sampler.samples > 0
+    assert any("_handler (" in stack for stack in folded)
+
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert meta["uploads"] == ["foobar"]
+    assert "@iopipe/plugin-profiler" in iopipe.report.labels
+
+
+def test__profiler_plugin_mode(monkeypatch):
+    assert ProfilerPlugin().mode == "cprofile"
+
+    monkeypatch.setenv("IOPIPE_PROFILER_MODE", "Sampling")
+    monkeypatch.setenv("IOPIPE_PROFILER_SAMPLE_INTERVAL", "5")
+    plugin = ProfilerPlugin()
+    assert plugin.mode == "sampling"
+    assert plugin.sample_interval == 0.005
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert ProfilerPlugin(mode="pyspy").mode == "cprofile"
+        assert len(w) == 1
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__profiler_plugin_tail_retention(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_tail_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_tail_profiler
+    plugin = iopipe.config["plugins"][0]
+
+    assert plugin.retention == "tail"
+    assert plugin.retention_percentile == 95
+
+    mock_get_signed_request.return_value = {
+        "jwtAccess": "foobar",
+        "signedRequest": "https://mock_signed_url",
+        "url": "https://mock_url",
+    }
+
+    # Profiles are dropped while warming up
+    handler({"sleep": 0.1}, mock_context)
+    assert mock_get_signed_request.call_count == 0
+    assert len(plugin.durations) == 1
+
+    for _ in range(50):
+        plugin.durations.add(50 * 1e6)
+
+    handler({}, mock_context)
+    assert mock_get_signed_request.call_count == 0
+    assert mock_upload_profile.call_count == 0
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert "retention" not in meta
+    assert "uploads" not in meta
+
+    handler({"sleep": 0.1}, mock_context)
+    mock_get_signed_request.assert_called_once_with(iopipe.config, mock.ANY, ".folded")
+    assert mock_upload_profile.call_count == 1
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert meta["retention"] == "p95"
+    assert meta["uploads"] == ["foobar"]
+
+    try:
+        handler({"error": "boom"}, mock_context)
+    except Exception:
+        pass
+    assert mock_get_signed_request.call_count == 2
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert meta["retention"] == "error"
+
+
+def test__profiler_plugin_retention(monkeypatch):
+    plugin = ProfilerPlugin()
+    assert plugin.retention == "all"
+    assert plugin.retention_percentile == 95
+
+    monkeypatch.setenv("IOPIPE_PROFILER_RETENTION", "Tail")
+    monkeypatch.setenv("IOPIPE_PROFILER_RETENTION_PERCENTILE", "99.5")
+    plugin = ProfilerPlugin()
+    assert plugin.retention == "tail"
+    assert plugin.retention_percentile == 99.5
+
+    # Tail retention defaults to sampling, unless a mode is given
+    assert plugin.mode == "sampling"
+    assert ProfilerPlugin(mode="cprofile").mode == "cprofile"
+    monkeypatch.setenv("IOPIPE_PROFILER_MODE", "cprofile")
+    assert ProfilerPlugin().mode == "cprofile"
+    monkeypatch.delenv("IOPIPE_PROFILER_MODE")
+
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert ProfilerPlugin(retention="slow").retention == "all"
+        assert len(w) == 1
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__profiler_plugin_aggregation(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_aggregating_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_aggregating_profiler
+    plugin = iopipe.config["plugins"][0]
+
+    assert plugin.aggregating is True
+
+    mock_get_signed_request.return_value = {
+        "jwtAccess": "foobar",
+        "signedRequest": "https://mock_signed_url",
+        "url": "https://mock_url",
+    }
+    calls = []
+
+    def upload_profile(url, dump, profile, config, compressed):
+        stats = marshal.loads(dump(profile))
+        calls.append(
+            sum(stat[1] for func, stat in stats.items() if func[2] == "_handler")
+        )
+
+    mock_upload_profile.side_effect = upload_profile
+
+    for _ in range(2):
+        handler({}, mock_context)
+        meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+        assert "aggregate" not in meta
+        assert "uploads" not in meta
+
+    assert mock_get_signed_request.call_count == 0
+    assert plugin.window_invocations == 2
+
+    handler({}, mock_context)
+
+    mock_get_signed_request.assert_called_once_with(
+        iopipe.config, mock.ANY, ".cprofile"
+    )
+    assert calls == [3]
+    assert plugin.window_invocations == 0
+    assert plugin.window_stats is None
+
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert meta["aggregate"]["invocations"] == 3
+    assert meta["aggregate"]["duration"] >= 0
+    assert meta["uploads"] == ["foobar"]
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.monotonic", autospec=True)
+def test__profiler_plugin_aggregate_seconds(mock_monotonic, monkeypatch):
+    monkeypatch.setenv("IOPIPE_PROFILER_AGGREGATE_SECONDS", "60")
+    plugin = ProfilerPlugin(mode="sampling")
+    assert plugin.aggregate_invocations == 0
+    assert plugin.aggregate_seconds == 60
+    plugin.sampler = mock.Mock(counts=collections.Counter({"a;b": 2}))
+
+    mock_monotonic.return_value = 100
+    assert plugin.aggregate() is False
+    mock_monotonic.return_value = 159
+    assert plugin.aggregate() is False
+    mock_monotonic.return_value = 160
+    assert plugin.aggregate() is True
+
+    assert plugin.window_invocations == 3
+    assert plugin.window_counts == {"a;b": 6}
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__profiler_plugin_signer_timeout(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_profiler
+    plugin = iopipe.config["plugins"][0]
+
+    def get_signed_request(config, context, extension):
+        time.sleep(0.5)
+        return {"jwtAccess": "foobar", "signedRequest": "https://mock_signed_url"}
+
+    mock_get_signed_request.side_effect = get_signed_request
+    mock_context.set_remaining_time_in_millis(iopipe.config["timeout_window"] * 1000)
+
+    handler({}, mock_context)
+
+    # The wait for the signer is bound by the time remaining
+    assert get_wait_timeout(iopipe.config, mock_context) == 0
+    assert mock_upload_profile.call_count == 0
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert "uploads" not in meta
+
+
+def test__profiler_plugin_compress(monkeypatch):
+    assert ProfilerPlugin().compress is False
+    assert ProfilerPlugin().extension == ".cprofile"
+
+    monkeypatch.setenv("IOPIPE_PROFILER_COMPRESS", "true")
+    plugin = ProfilerPlugin(mode="sampling")
+    assert plugin.compress is True
+    assert plugin.extension == ".folded.gz"
+
+
+@mock.patch("iopipe.contrib.profiler.plugin.upload_profile", autospec=True)
+@mock.patch("iopipe.contrib.profiler.plugin.get_signed_request", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__profiler_plugin_summary(
+    mock_send_report,
+    mock_get_signed_request,
+    mock_upload_profile,
+    handler_with_summary_profiler,
+    mock_context,
+):
+    iopipe, handler = handler_with_summary_profiler
+    plugin = iopipe.config["plugins"][0]
+
+    assert plugin.summary == 5
+    assert plugin.upload is False
+
+    handler({}, mock_context)
+
+    assert mock_get_signed_request.call_count == 0
+    assert mock_upload_profile.call_count == 0
+
+    meta = next((p for p in iopipe.report.plugins if p["name"] == "profiler"))
+    assert "uploads" not in meta
+    assert len(meta["summary"]) == 5
+    assert any(s["function"].endswith("(_handler)") for s in meta["summary"])
+    assert sorted(meta["summary"][0]) == ["cumtime", "function", "ncalls", "tottime"]
@@ -1,16 +1,58 @@
+import collections
+import cProfile
+import gzip
+import io
+import marshal
 import mock
-import os
-import tempfile
+import pstats
 
-from iopipe.contrib.profiler.request import upload_profiler_report
+from iopipe.contrib.profiler.request import (
+    compress,
+    dump_folded,
+    dump_stats,
+    upload_profile,
+)
+
+
+def test__dump_stats():
+    profile = cProfile.Profile()
+    profile.enable()
+    sum(range(10))
+    profile.disable()
+
+    stats = marshal.loads(dump_stats(profile))
+    assert any("sum" in func[2] for func in stats)
+
+    merged = pstats.Stats(profile)
+    merged.add(profile)
+    assert marshal.loads(dump_stats(merged)) == merged.stats
+
+
+def test__dump_folded():
+    counts = collections.Counter({"a;b": 1, "a;c": 3})
+    assert dump_folded(counts) == b"a;c 3\na;b 1\n"
+
+
+def test__compress():
+    data = b"a;b 1\n" * 1000
+    compressed = compress(data)
+    assert len(compressed) < len(data)
+    assert gzip.GzipFile(fileobj=io.BytesIO(compressed)).read() == data
 
 
 @mock.patch("iopipe.contrib.profiler.request.requests", autospec=True)
-def test__upload_profiler_report__deletes_file(mock_requests):
-    """Asserts that upload_profiler_report deletes the file when done uploading"""
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
-    temp_file.close()
+def test__upload_profile(mock_requests):
+    counts = collections.Counter({"a;b": 1})
 
-    upload_profiler_report("", temp_file.name, {"network_timeout": 5})
+    upload_profile(
+        "https://mock_signed_url", dump_folded, counts, {"network_timeout": 5}
+    )
+    mock_requests.put.assert_called_once_with(
+        "https://mock_signed_url", data=b"a;b 1\n", timeout=5
+    )
 
-    assert not os.path.exists(temp_file.name)
+    upload_profile(
+        "https://mock_signed_url", dump_folded, counts, {"network_timeout": 5}, True
+    )
+    data = mock_requests.put.call_args[1]["data"]
+    assert gzip.GzipFile(fileobj=io.BytesIO(data)).read() == b"a;b 1\n"
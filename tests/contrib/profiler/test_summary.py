@@ -0,0 +1,44 @@
+import collections
+import cProfile
+
+from iopipe.contrib.profiler.summary import summarize_folded, summarize_stats
+
+
+def fibonacci(n):
+    if n < 2:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+
+
+def test__summarize_stats():
+    profile = cProfile.Profile()
+    profile.enable()
+    fibonacci(10)
+    profile.disable()
+
+    summary = summarize_stats(profile, 2)
+    assert len(summary) == 2
+    assert summary[0]["cumtime"] >= summary[1]["cumtime"]
+
+    entry = next(s for s in summary if s["function"].endswith("(fibonacci)"))
+    assert entry["function"].startswith(__file__.rstrip("c"))
+    assert entry["ncalls"] == 177
+    assert 0 <= entry["tottime"] <= entry["cumtime"]
+
+
+def test__summarize_folded():
+    counts = collections.Counter(
+        {"main;handler;query": 6, "main;handler": 2, "main;handler;handler": 2}
+    )
+    summary = summarize_folded(counts, 0.01, 3)
+
+    assert summary[2] == {
+        "function": "query",
+        "samples": 6,
+        "tottime": 60.0,
+        "cumtime": 60.0,
+    }
+    assert sorted(summary[:2], key=lambda s: s["function"]) == [
+        {"function": "handler", "samples": 10, "tottime": 40.0, "cumtime": 100.0},
+        {"function": "main", "samples": 10, "tottime": 0.0, "cumtime": 100.0},
+    ]
@@ -0,0 +1,31 @@
+from concurrent.futures import Future
+
+from iopipe.contrib.profiler.util import get_result, get_wait_timeout
+
+
+def test__get_wait_timeout(mock_context):
+    config = {"network_timeout": 5, "timeout_window": 0.5}
+
+    mock_context.set_remaining_time_in_millis(10000)
+    assert get_wait_timeout(config, mock_context) == 5
+
+    mock_context.set_remaining_time_in_millis(2000)
+    assert get_wait_timeout(config, mock_context) == 1.5
+
+    mock_context.set_remaining_time_in_millis(0)
+    assert get_wait_timeout(config, mock_context) == 0
+
+    assert get_wait_timeout(config, object()) == 5
+
+
+def test__get_result(mock_context):
+    config = {"network_timeout": 5, "timeout_window": 0.5}
+    mock_context.set_remaining_time_in_millis(0)
+
+    future = Future()
+    assert get_result(future, config, mock_context) == (False, None)
+
+    future.set_result("foobar")
+    assert get_result(future, config, mock_context) == (True, "foobar")
+
+    assert get_result({"foo": "bar"}, config, mock_context) == (True, {"foo": "bar"})
@@ -0,0 +1,36 @@
+import pytest
+import time
+
+from iopipe import IOpipeCore
+from iopipe.contrib.sampler import SamplerPlugin
+
+
+@pytest.fixture
+def iopipe_with_sampler():
+    plugin = SamplerPlugin(enabled=True, interval=5)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_sampler(iopipe_with_sampler):
+    @iopipe_with_sampler
+    def _handler(event, context):
+        time.sleep(0.1)
+
+    return iopipe_with_sampler, _handler
+
+
+@pytest.fixture
+def handler_with_busy_sampler(iopipe_with_sampler):
+    @iopipe_with_sampler
+    def _handler(event, context):
+        end = time.time() + 0.2
+        while time.time() < end:
+            pass
+
+    return iopipe_with_sampler, _handler
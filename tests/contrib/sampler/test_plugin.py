@@ -0,0 +1,94 @@
+import mock
+import warnings
+
+from iopipe.contrib.sampler import SamplerPlugin
+from iopipe.report import proc_reader
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__sampler_plugin(mock_send_report, handler_with_sampler, mock_context):
+    iopipe, handler = handler_with_sampler
+    plugins = iopipe.config["plugins"]
+
+    assert len(plugins) == 1
+    assert plugins[0].enabled is True
+
+    handler({}, mock_context)
+
+    metrics = dict(
+        (m["name"], m["n"])
+        for m in iopipe.report.custom_metrics
+        if m["name"].startswith("@iopipe/sampler.")
+    )
+
+    for key in [
+        "cpu.mean",
+        "cpu.peak",
+        "overhead_ms",
+        "rss.mean",
+        "rss.peak",
+        "samples",
+        "threads.peak",
+    ]:
+        assert "@iopipe/sampler.%s" % key in metrics
+
+    assert metrics["@iopipe/sampler.samples"] > 1
+    assert metrics["@iopipe/sampler.rss.peak"] >= metrics["@iopipe/sampler.rss.mean"]
+    assert metrics["@iopipe/sampler.threads.peak"] >= 2
+    assert "@iopipe/plugin-sampler" in iopipe.report.labels
+
+    plugin = next((p for p in iopipe.report.plugins if p["name"] == "sampler"))
+    assert plugin["interval"] == 5
+    assert len(plugin["series"]["time"]) == metrics["@iopipe/sampler.samples"]
+    assert set(plugin["series"]) == set(["cpu", "rss", "threads", "time"])
+
+    assert plugins[0].sampler.is_alive() is False
+    assert plugins[0].sampler.reader is proc_reader
+    assert proc_reader.fds
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__sampler_plugin_busy(
+    mock_send_report, handler_with_busy_sampler, mock_context
+):
+    iopipe, handler = handler_with_busy_sampler
+
+    handler({}, mock_context)
+
+    metrics = dict(
+        (m["name"], m["n"])
+        for m in iopipe.report.custom_metrics
+        if m["name"].startswith("@iopipe/sampler.")
+    )
+    plugin = next((p for p in iopipe.report.plugins if p["name"] == "sampler"))
+
+    # A single busy thread can't use much more than one CPU
+    assert 50 <= metrics["@iopipe/sampler.cpu.peak"] <= 150
+    assert metrics["@iopipe/sampler.cpu.mean"] <= 150
+    assert max(plugin["series"]["cpu"]) <= 150
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__sampler_plugin_disabled(mock_send_report, handler_with_sampler, mock_context):
+    iopipe, handler = handler_with_sampler
+    iopipe.config["plugins"][0]._enabled = False
+
+    handler({}, mock_context)
+
+    assert not any(
+        m["name"].startswith("@iopipe/sampler.") for m in iopipe.report.custom_metrics
+    )
+
+
+def test__sampler_plugin_interval(monkeypatch):
+    assert SamplerPlugin().interval == 0.05
+    assert SamplerPlugin(interval=10).interval == 0.01
+
+    monkeypatch.setenv("IOPIPE_SAMPLER_INTERVAL", "20")
+    assert SamplerPlugin().interval == 0.02
+
+    monkeypatch.setenv("IOPIPE_SAMPLER_INTERVAL", "foobar")
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert SamplerPlugin().interval == 0.05
+        assert len(w) == 1
@@ -0,0 +1,64 @@
+from iopipe.contrib.sampler.sampler import RingBuffer, ResourceSampler
+from iopipe.system import ProcReader
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(4)
+
+    assert len(buffer) == 0
+    assert buffer.series("rss") == []
+
+    for i in range(6):
+        buffer.append(i * 10.0, i, i / 2.0, 1)
+
+    assert len(buffer) == 4
+    assert buffer.count == 6
+    assert buffer.series("time") == [20.0, 30.0, 40.0, 50.0]
+    assert buffer.series("rss") == [2, 3, 4, 5]
+
+
+def test_ring_buffer_downsample():
+    buffer = RingBuffer(100)
+
+    for i in range(100):
+        buffer.append(float(i), 1000 if i == 42 else i, 0.0, 1)
+
+    series = buffer.downsample(10)
+
+    assert len(series["time"]) == 10
+    assert series["time"][:2] == [0.0, 10.0]
+    # Spikes survive downsampling
+    assert max(series["rss"]) == 1000
+    assert buffer.downsample(200)["rss"] == buffer.series("rss")
+
+
+def test_resource_sampler():
+    sampler = ResourceSampler(0.001, 16)
+    sampler.start()
+    sampler.stopped.wait(0.05)
+    sampler.stop()
+
+    summary = sampler.summary()
+
+    assert sampler.is_alive() is False
+    assert summary["samples"] == sampler.buffer.count > 1
+    assert len(sampler.buffer) <= 16
+    assert summary["rss.peak"] > 0
+    assert summary["overhead_ms"] > 0
+
+
+def test_resource_sampler_reader():
+    reader = ProcReader()
+    sampler = ResourceSampler(1, 16, reader)
+    sampler.stop()
+
+    assert sampler.reader is reader
+    assert reader.fds
+
+    reader.close()
+
+
+def test_resource_sampler_sample(benchmark):
+    sampler = ResourceSampler(1, 1024)
+
+    benchmark(sampler.sample)
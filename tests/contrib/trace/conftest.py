@@ -5,6 +5,7 @@ import pymysql
 import pytest
 import redis
 import requests
+import sys
 
 from iopipe import IOpipeCore
 from iopipe.context import ContextWrapper
@@ -12,6 +13,10 @@ from iopipe.contrib.trace.marker import Marker
 from iopipe.contrib.trace import TracePlugin
 from iopipe.contrib.trace.timeline import Timeline
 
+# Tasks only have their own trace context with contextvars
+if sys.version_info < (3, 7):
+    collect_ignore = ["test_timeline_asyncio.py"]
+
 
 @pytest.fixture
 def iopipe_with_trace():
@@ -160,6 +165,40 @@ def timeline():
     return Timeline()
 
 
+@pytest.fixture
+def aggregating_timeline():
+    return Timeline(aggregate=True, keep_first=2, keep_slowest=2)
+
+
+@pytest.fixture
+def aggregating_marker(aggregating_timeline, mock_context):
+    return Marker(aggregating_timeline, mock_context)
+
+
+@pytest.fixture
+def iopipe_with_trace_aggregate():
+    plugin = TracePlugin(aggregate=True, aggregate_first=1, aggregate_slowest=1)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_trace_aggregate(iopipe_with_trace_aggregate):
+    @iopipe_with_trace_aggregate
+    def _handler(event, context):
+        for i in range(1000):
+            with context.iopipe.mark("loop"):
+                pass
+            with context.iopipe.mark.span("span"):
+                pass
+
+    return iopipe_with_trace_aggregate, _handler
+
+
 @pytest.fixture
 def iopipe_with_trace_auto_db():
     plugin = TracePlugin(auto_db=True)
@@ -182,6 +221,43 @@ def handler_with_trace_auto_db_redis(iopipe_with_trace_auto_db):
     return iopipe_with_trace_auto_db, _handler
 
 
+@pytest.fixture
+def handler_with_trace_auto_db_redis_in_span(iopipe_with_trace_auto_db):
+    @iopipe_with_trace_auto_db
+    def _handler(event, context):
+        r = redis.Redis(host="localhost", port=6379, db=0)
+        with context.iopipe.mark("cache"):
+            r.set("foo", "bar")
+        r.get("foo")
+
+    return iopipe_with_trace_auto_db, _handler
+
+
+@pytest.fixture
+def iopipe_with_trace_auto_db_max_entries():
+    plugin = TracePlugin(auto_db=True, max_trace_entries=10)
+    return IOpipeCore(
+        token="test-suite",
+        url="https://metrics-api.iopipe.com",
+        debug=True,
+        plugins=[plugin],
+    )
+
+
+@pytest.fixture
+def handler_with_trace_auto_db_redis_max_entries(
+    iopipe_with_trace_auto_db_max_entries
+):
+    @iopipe_with_trace_auto_db_max_entries
+    def _handler(event, context):
+        r = redis.Redis(host="localhost", port=6379, db=0)
+        for i in range(100):
+            r.set("foo", i)
+        r.get("foo")
+
+    return iopipe_with_trace_auto_db_max_entries, _handler
+
+
 @pytest.fixture
 def handler_with_trace_auto_db_pymongo(iopipe_with_trace_auto_db):
     @iopipe_with_trace_auto_db
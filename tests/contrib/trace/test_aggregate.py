@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from iopipe.contrib.trace.aggregate import TraceAggregate, TraceBuffer
+
+
+def test_trace_aggregate():
+    aggregate = TraceAggregate()
+    for duration in [0.5, 1, 3, 3, 150, 20000]:
+        aggregate.add(duration)
+
+    assert aggregate.to_dict() == {
+        "count": 6,
+        "total": 20157.5,
+        "min": 0.5,
+        "max": 20000,
+        "histogram": {"1": 2, "5": 2, "200": 1, "+Inf": 1},
+    }
+
+
+def test_trace_buffer():
+    buffer = TraceBuffer(max_entries=2)
+    entries = []
+
+    for i in range(100):
+        buffer.add(entries, {"duration": i}, ("redis", "localhost", "GET"))
+    buffer.add(entries, {"duration": 1000}, ("redis", "localhost", "SET"))
+
+    assert entries == [{"duration": 0}, {"duration": 1}]
+    assert buffer.aggregated == 99
+    assert len(buffer.aggregates) == 2
+
+    aggregates = buffer.get_aggregates()
+    assert [a["command"] for a in aggregates] == ["GET", "SET"]
+    assert aggregates[0]["type"] == "redis"
+    assert aggregates[0]["hostname"] == "localhost"
+    assert aggregates[0]["count"] == 98
+    assert aggregates[0]["total"] == sum(range(2, 100))
+    assert aggregates[0]["min"] == 2
+    assert aggregates[0]["max"] == 99
+    assert sum(aggregates[0]["histogram"].values()) == 98
+
+
+def test_trace_buffer__unbounded():
+    buffer = TraceBuffer()
+    entries = []
+
+    for i in range(100):
+        buffer.add(entries, {"duration": i}, ("redis", "localhost", "GET"))
+
+    assert len(entries) == 100
+    assert buffer.aggregated == 0
+    assert buffer.get_aggregates() == []
+
+
+def test_trace_buffer__concurrent():
+    buffer = TraceBuffer(max_entries=10)
+    entries = []
+
+    def work(i):
+        for _ in range(100):
+            buffer.add(entries, {"duration": 1}, ("http", "localhost", "GET"))
+
+    with ThreadPoolExecutor(32) as executor:
+        list(executor.map(work, range(32)))
+
+    assert len(entries) == 10
+    assert buffer.aggregated == 3190
+    assert buffer.get_aggregates()[0]["count"] == 3190
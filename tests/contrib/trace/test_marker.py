@@ -1,3 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from iopipe.contrib.trace.util import add_timeline_measures
+
+
 def test_marker__measure_no_start_or_end(marker):
     marker.start("foobar")
     marker.end("foobar")
@@ -56,3 +61,124 @@ def test_marker__decorator(marker):
     mock_func()
 
     assert len(marker.timeline.get_entries()) == 2
+
+
+def test_marker__delete(marker):
+    marker.start("foo")
+    marker.start("foobar")
+    marker.end("foo")
+    marker.measure("foo")
+    marker.delete("foo")
+
+    assert [e.name for e in marker.timeline.get_entries()] == ["start:foobar"]
+
+
+def test_marker__span(marker):
+    with marker.span("foobar") as span:
+        pass
+
+    assert marker.timeline.get_entries() == [span.entry]
+    marker.context.iopipe.label.assert_called_with("@iopipe/plugin-trace")
+
+    with marker.span("barbaz", record=False) as span:
+        pass
+
+    assert len(marker.timeline.get_entries()) == 1
+    assert span.entry.name == "measure:barbaz"
+
+
+def test_marker__span_tree(marker):
+    with marker("step"):
+        with marker.span(record=False) as span:
+            pass
+    marker.measure("step")
+
+    step = marker.timeline.get_entries_by_name("measure:step")[0]
+    assert step.parentId is None
+    assert span.entry.parentId == step.id
+    assert marker.timeline.current_span() is None
+
+    marker.delete("step")
+    assert "measure:step" not in marker.timeline.block_entries
+
+
+def test_marker__span_tree_repeated_block(marker):
+    spans = []
+    for _ in range(3):
+        with marker("step"):
+            with marker.span(record=False) as span:
+                pass
+        spans.append(span)
+    add_timeline_measures(marker.timeline)
+
+    # Each time the block ran has its own measure, linked to its children
+    steps = marker.timeline.get_entries_by_name("measure:step")
+    assert len(steps) == 3
+    assert [s.id for s in steps] == [span.parent_id for span in spans]
+    assert len(set(s.id for s in steps)) == 3
+    assert all(s.startTime <= span.entry.startTime for s, span in zip(steps, spans))
+
+    # Blocks are only measured once
+    add_timeline_measures(marker.timeline)
+    assert len(marker.timeline.get_entries_by_name("measure:step")) == 3
+
+
+def test_marker__concurrent(marker):
+    workers = 32
+    iterations = 50
+    spans = []
+
+    def work(i):
+        for j in range(iterations):
+            with marker("worker-%s-%s" % (i, j)):
+                with marker.span(record=False) as span:
+                    pass
+            spans.append((i, j, span))
+
+    with marker("parent"):
+        parent = marker.timeline.current_span()
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(marker.wrap(work), range(workers)))
+
+    add_timeline_measures(marker.timeline)
+    entries = marker.timeline.get_entries()
+
+    assert len(spans) == workers * iterations
+    assert len(entries) == (workers * iterations + 1) * 3
+    assert [e.startTime for e in entries] == sorted(e.startTime for e in entries)
+
+    measures = dict((e.name, e) for e in entries if e.entryType == "measure")
+    assert measures["measure:parent"].id == parent.id
+    for i, j, span in spans:
+        block = measures["measure:worker-%s-%s" % (i, j)]
+        assert block.parentId == parent.id
+        assert span.parent_id == block.id
+        assert block.duration >= span.entry.duration
+
+    marker.delete("parent")
+    assert len(marker.timeline.get_entries()) == workers * iterations * 3
+
+
+def test_marker__aggregate(aggregating_marker):
+    marker = aggregating_marker
+    for _ in range(100):
+        with marker("foo"):
+            with marker.span("bar"):
+                pass
+
+    # Blocks are measured by their spans, without marks
+    assert marker.measure("foo") is None
+    entries = marker.timeline.get_entries()
+    assert len(marker.timeline.get_entries_by_type("mark")) == 0
+    assert len(entries) == 10
+
+    summaries = marker.timeline.get_entries_by_type("summary")
+    assert sorted(s.name for s in summaries) == ["measure:bar", "measure:foo"]
+    assert all(s.count == 100 for s in summaries)
+
+    # Raw measures are still linked to their parents
+    foo = marker.timeline.get_entries_by_name("measure:foo")
+    bar = marker.timeline.get_entries_by_name("measure:bar")
+    assert foo[0].id == bar[0].parentId
+    add_timeline_measures(marker.timeline)
+    assert len(marker.timeline.get_entries()) == 10
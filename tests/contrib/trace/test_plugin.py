@@ -3,6 +3,7 @@ import mock
 import mongomock
 import pymongo
 import redis
+import warnings
 
 from iopipe import IOpipeCore
 from iopipe.contrib.trace import TracePlugin
@@ -234,6 +235,56 @@ def test_trace_plugin__auto_db__redis(
     assert db_traces[1]["request"]["command"] == "GET"
 
 
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_trace_plugin__auto_db__max_entries(
+    mock_send_report,
+    handler_with_trace_auto_db_redis_max_entries,
+    mock_context,
+    monkeypatch,
+):
+    setattr(fakeredis.FakeConnection, "health_check_interval", 1)
+    setattr(fakeredis.FakeConnection, "host", "localhost")
+    setattr(fakeredis.FakeConnection, "port", 6379)
+    setattr(fakeredis.FakeConnection, "db", 0)
+    setattr(fakeredis.FakeConnection, "next_health_check", 1)
+
+    monkeypatch.setattr(redis, "Redis", fakeredis.FakeRedis)
+
+    iopipe, handler = handler_with_trace_auto_db_redis_max_entries
+
+    handler({}, mock_context)
+
+    db_traces = iopipe.report.db_trace_entries
+    assert len(db_traces) == 10
+    assert all(t["request"]["command"] == "SET" for t in db_traces)
+
+    plugin = next((p for p in iopipe.report.plugins if p["name"] == "trace"))
+    assert plugin["aggregated"] == {"db": 91, "http": 0}
+    assert plugin["httpTraceAggregates"] == []
+
+    aggregates = plugin["dbTraceAggregates"]
+    assert all(a["type"] == "redis" for a in aggregates)
+    assert all(a["hostname"] == "localhost" for a in aggregates)
+    counts = dict((a["command"], a["count"]) for a in aggregates)
+    assert counts == {"SET": 90, "GET": 1}
+    for aggregate in aggregates:
+        assert aggregate["min"] <= aggregate["max"]
+        assert sum(aggregate["histogram"].values()) == aggregate["count"]
+
+
+def test__trace_plugin__max_entries_env_var(monkeypatch):
+    assert TracePlugin().max_trace_entries is None
+
+    monkeypatch.setenv("IOPIPE_TRACE_MAX_ENTRIES", "50")
+    assert TracePlugin().max_trace_entries == 50
+
+    monkeypatch.setenv("IOPIPE_TRACE_MAX_ENTRIES", "lots")
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert TracePlugin().max_trace_entries is None
+        assert len(w) == 1
+
+
 def test__trace_plugin__auto_db__env_var(monkeypatch):
     monkeypatch.setenv("IOPIPE_TRACE_AUTO_DB_ENABLED", "false")
     iopipe = IOpipeCore(plugins=[TracePlugin()])
@@ -367,3 +418,74 @@ def test_trace_plugin__auto_db__pymysql(
 
     assert db_traces[0]["request"]["command"] == "INSERT"
     assert db_traces[1]["request"]["command"] == "SELECT"
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_trace_plugin__auto_db__parent_span(
+    mock_send_report,
+    handler_with_trace_auto_db_redis_in_span,
+    mock_context,
+    monkeypatch,
+):
+    setattr(fakeredis.FakeConnection, "health_check_interval", 1)
+    setattr(fakeredis.FakeConnection, "host", "localhost")
+    setattr(fakeredis.FakeConnection, "port", 6379)
+    setattr(fakeredis.FakeConnection, "db", 0)
+    setattr(fakeredis.FakeConnection, "next_health_check", 1)
+
+    monkeypatch.setattr(redis, "Redis", fakeredis.FakeRedis)
+
+    iopipe, handler = handler_with_trace_auto_db_redis_in_span
+
+    handler({}, mock_context)
+
+    cache = next(
+        e for e in iopipe.report.performance_entries if e["name"] == "measure:cache"
+    )
+    assert cache["parentId"] is None
+
+    db_traces = iopipe.report.db_trace_entries
+    assert len(db_traces) == 2
+    assert db_traces[0]["parentId"] == cache["id"]
+    assert db_traces[1]["parentId"] is None
+    assert db_traces[0]["id"] != db_traces[1]["id"]
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test__trace_plugin__aggregate(
+    mock_send_report, handler_with_trace_aggregate, mock_context
+):
+    iopipe, handler = handler_with_trace_aggregate
+
+    handler({}, mock_context)
+
+    entries = iopipe.report.performance_entries
+    # The first and slowest of each name's measures, and a summary
+    assert len(entries) == 6
+    summaries = [e for e in entries if e["entryType"] == "summary"]
+    assert sorted(s["name"] for s in summaries) == ["measure:loop", "measure:span"]
+    for summary in summaries:
+        assert summary["count"] == 1000
+        assert summary["min"] <= summary["p50"] <= summary["p99"] <= summary["max"]
+    assert "@iopipe/plugin-trace" in iopipe.report.labels
+
+
+def test__trace_plugin__aggregate_env_var(monkeypatch):
+    plugin = TracePlugin()
+    assert plugin.aggregate is False
+    assert plugin.timeline.aggregate is False
+
+    monkeypatch.setenv("IOPIPE_TRACE_AGGREGATE", "true")
+    monkeypatch.setenv("IOPIPE_TRACE_AGGREGATE_FIRST", "5")
+    monkeypatch.setenv("IOPIPE_TRACE_AGGREGATE_SLOWEST", "20")
+    plugin = TracePlugin()
+    assert plugin.aggregate is True
+    assert plugin.timeline.aggregate is True
+    assert plugin.timeline.keep_first == 5
+    assert plugin.timeline.keep_slowest == 20
+
+    monkeypatch.setenv("IOPIPE_TRACE_AGGREGATE_SLOWEST", "many")
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        assert TracePlugin().aggregate_slowest == 10
+        assert len(w) == 1
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 
@@ -42,3 +43,224 @@ def test_timeline(timeline):
 
     bar_duration = end_bar.startTime - start_bar.startTime
     assert bar_duration == measure_bar.duration
+
+
+def test_timeline_order(timeline):
+    timeline.mark("start:foo")
+    timeline.mark("end:foo")
+    timeline.mark("start:bar")
+    measure = timeline.measure("foo", "start:foo", "end:foo")
+
+    assert timeline.buffer.sorted is False
+    assert [e.name for e in timeline.get_entries()] == [
+        "start:foo",
+        "foo",
+        "end:foo",
+        "start:bar",
+    ]
+    assert timeline.buffer.sorted is True
+    assert timeline.get_entries_by_name("foo") == [measure]
+
+
+def test_timeline_delete(timeline):
+    for i in range(10):
+        timeline.mark("start:%s" % i)
+    timeline.delete("start:5")
+    timeline.delete("start:missing")
+
+    assert len(timeline.get_entries_by_name("start:5")) == 0
+    assert len(timeline.get_entries()) == 9
+    assert timeline.buffer.tombstones == 0
+    assert timeline.get_entries_by_name("start:6")[0].name == "start:6"
+
+
+def test_timeline_delete_compacts(timeline):
+    for i in range(3000):
+        timeline.mark("start:%s" % i)
+    for i in range(1500):
+        timeline.delete("start:%s" % i)
+
+    assert timeline.buffer.tombstones == 1500
+    timeline.delete("start:1500")
+    assert timeline.buffer.tombstones == 0
+    assert len(timeline.buffer.entries) == 1499
+    assert timeline.get_entries_by_name("start:2999")[0].name == "start:2999"
+
+
+def test_timeline_clear(timeline):
+    timeline.mark("start:foo")
+    timeline.mark("end:foo")
+    timeline.measure("foo", "start:foo", "end:foo")
+
+    timeline.clear_measures()
+    assert [e.name for e in timeline.get_entries()] == ["start:foo", "end:foo"]
+
+    timeline.measure("foo", "start:foo", "end:foo")
+    timeline.clear_marks()
+    assert [e.name for e in timeline.get_entries()] == ["foo"]
+    assert len(timeline.get_entries_by_name("foo")) == 1
+
+    timeline.clear()
+    assert timeline.get_entries() == []
+
+
+def test_timeline_span(timeline):
+    with timeline.span("foo") as span:
+        time.sleep(0.01)
+
+    assert timeline.get_entries() == [span.entry]
+    assert span.entry.name == "measure:foo"
+    assert span.entry.entryType == "measure"
+    assert 10.0 <= span.entry.duration <= 50.0
+    assert span.entry.startTime + span.entry.duration <= timeline.now()
+    assert abs(span.entry.timestamp - time.time() * 1000) < 1000
+
+    span = timeline.span("bar", record=False).start()
+    entry = span.end()
+    assert entry.name == "measure:bar"
+    assert len(timeline.get_entries()) == 1
+
+    try:
+        with timeline.span("baz"):
+            raise ValueError()
+    except ValueError:
+        pass
+    assert len(timeline.get_entries_by_name("measure:baz")) == 1
+
+
+def test_timeline_span_tree(timeline):
+    with timeline.span("outer") as outer:
+        with timeline.span("inner") as inner:
+            pass
+        sibling = timeline.span(record=False).start()
+        sibling.end()
+
+    assert outer.entry.parentId is None
+    assert inner.entry.parentId == outer.id
+    assert sibling.entry.parentId == outer.id
+    assert sibling.entry.name == "measure:%s" % sibling.id
+    assert len(set([outer.id, inner.id, sibling.id])) == 3
+    assert timeline.current_span() is None
+
+    # Spans ended out of order are skipped over
+    first = timeline.span("first").start()
+    second = timeline.span("second").start()
+    third = timeline.span("third").start()
+    second.end()
+    assert timeline.current_span() is third
+    third.end()
+    assert timeline.current_span() is first
+    first.end()
+    assert timeline.current_span() is None
+
+
+def test_timeline_concurrent(timeline):
+    workers = 32
+    marks = 200
+
+    def work(i):
+        for j in range(marks):
+            timeline.mark("mark:%s:%s" % (i, j))
+            if j % 2:
+                timeline.delete("mark:%s:%s" % (i, j - 1))
+            # Entries added by other threads are visible, and can be deleted
+            timeline.get_entries_by_name("mark:%s:%s" % ((i + 1) % workers, j))
+        timeline.delete("mark:%s:%s" % ((i + 1) % workers, marks + 1))
+
+    with ThreadPoolExecutor(workers) as executor:
+        list(executor.map(work, range(workers)))
+
+    entries = timeline.get_entries()
+    assert 1 < len(timeline.buffers) <= workers
+    assert len(entries) == workers * marks // 2
+    assert all(int(e.name.rsplit(":", 1)[1]) % 2 for e in entries)
+    assert [e.startTime for e in entries] == sorted(e.startTime for e in entries)
+
+    timeline.delete("mark:0:1")
+    assert len(timeline.get_entries()) == workers * marks // 2 - 1
+
+
+def test_timeline_aggregate(aggregating_timeline):
+    timeline = aggregating_timeline
+    for i in range(100):
+        timeline.mark("start:foo")
+        timeline.mark("end:foo")
+        timeline.measure("measure:foo", "start:foo", "end:foo")
+
+    # Marks are kept, measures are aggregated
+    assert len(timeline.get_entries_by_name("start:foo")) == 100
+    assert len(timeline.get_entries_by_name("measure:foo")) == 4
+    assert timeline.get_aggregates()["measure:foo"].sketch.count == 100
+    assert len(timeline.get_entries_by_type("summary")) == 1
+
+
+def test_timeline_aggregate_entries(aggregating_timeline):
+    timeline = aggregating_timeline
+    start = timeline.now()
+    for i, duration in enumerate([1, 2, 3, 50, 4, 40, 5]):
+        entry = timeline.span("foo", record=False).start().end()
+        timeline.append(entry._replace(startTime=start + i, duration=duration))
+    timeline.mark("mark:foo")
+
+    entries = timeline.get_entries()
+    assert [e.entryType for e in entries].count("measure") == 4
+    assert [e.entryType for e in entries].count("mark") == 1
+    assert [e.startTime for e in entries] == sorted(e.startTime for e in entries)
+
+    measures = [e.duration for e in entries if e.entryType == "measure"]
+    # The first two and slowest two measures are kept
+    assert measures == [1, 2, 50, 40]
+
+    summary = next(e for e in entries if e.entryType == "summary")
+    assert summary.name == "measure:foo"
+    assert summary.startTime == start
+    assert summary.count == 7
+    assert summary.duration == 105
+    assert summary.min == 1
+    assert summary.max == 50
+    assert abs(summary.p50 - 4) <= 4 * 0.01
+    assert abs(summary.p99 - 40) <= 40 * 0.01
+
+    assert len(timeline.get_entries_by_name("measure:foo")) == 4
+
+    timeline.delete("measure:foo")
+    assert [e.entryType for e in timeline.get_entries()] == ["mark"]
+
+
+def test_timeline_aggregate_clear(aggregating_timeline):
+    timeline = aggregating_timeline
+    for _ in range(5):
+        with timeline.span("foo"):
+            pass
+    timeline.mark("mark:foo")
+
+    timeline.clear_marks()
+    entries = timeline.get_entries()
+    assert [e.entryType for e in entries].count("mark") == 0
+    assert next(e for e in entries if e.entryType == "summary").count == 5
+
+    timeline.clear_measures()
+    assert timeline.get_entries() == []
+
+
+def test_timeline_aggregate_concurrent(aggregating_timeline):
+    timeline = aggregating_timeline
+
+    def work(i):
+        for _ in range(100):
+            with timeline.span("foo"):
+                pass
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(work, range(32)))
+
+    entries = timeline.get_entries()
+    # Aggregates made by each thread are merged
+    assert len(timeline.buffers) > 1
+    assert len(entries) == 5
+    summary = timeline.get_entries_by_type("summary")[0]
+    assert summary.count == 3200
+    measures = timeline.get_entries_by_type("measure")
+    assert len(measures) == 4
+    assert summary.startTime == measures[0].startTime
+    assert summary.max == max(e.duration for e in measures)
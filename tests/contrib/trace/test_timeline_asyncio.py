@@ -0,0 +1,27 @@
+import asyncio
+
+
+def test_timeline_asyncio(marker):
+    timeline = marker.timeline
+
+    async def task(i):
+        with marker("task-%s" % i):
+            block = timeline.current_span()
+            await asyncio.sleep(0)
+            with timeline.span("inner-%s" % i) as inner:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        return block, inner
+
+    async def main():
+        with timeline.span("main") as span:
+            results = await asyncio.gather(*[task(i) for i in range(32)])
+        return span, results
+
+    span, results = asyncio.run(main())
+
+    for block, inner in results:
+        assert block.parent_id == span.id
+        assert inner.parent_id == block.id
+    assert len(timeline.get_entries()) == 1 + 32 * 3
+    assert timeline.current_span() is None
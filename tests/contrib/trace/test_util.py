@@ -1,6 +1,28 @@
 from iopipe.compat import string_types
-from iopipe.contrib.trace.util import ensure_utf8
+from iopipe.contrib.trace.util import add_timeline_measures, ensure_utf8, get_trace_id
 
 
 def test_ensure_utf8():
     assert isinstance(ensure_utf8("foobar".encode("utf-8")), string_types)
+
+
+def test_add_timeline_measures(timeline):
+    timeline.mark("start:foo")
+    timeline.mark("start:bar")
+    timeline.mark("end:foo")
+    timeline.mark("start:baz")
+    timeline.measure("measure:baz", "start:baz")
+    timeline.mark("end:baz")
+
+    add_timeline_measures(timeline)
+
+    measures = timeline.get_entries_by_type("measure")
+    assert sorted(m.name for m in measures) == ["measure:baz", "measure:foo"]
+
+    add_timeline_measures(timeline)
+    assert len(timeline.get_entries_by_type("measure")) == 2
+
+
+def test_get_trace_id():
+    ids = set(get_trace_id() for _ in range(1000))
+    assert len(ids) == 1000
@@ -104,6 +104,66 @@ def test_timeouts(mock_send_report, handler_that_timeouts, mock_context):
     assert "@iopipe/timeout" in iopipe.report.labels
 
 
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_timeouts_threads(
+    mock_send_report, handler_that_timeouts_with_threads, mock_context
+):
+    """Assert that a timeout reports the stacks of all threads"""
+    iopipe, handler = handler_that_timeouts_with_threads
+    mock_context.set_remaining_time_in_millis(500)
+
+    try:
+        handler(None, mock_context)
+    except Exception:
+        pass
+
+    errors = iopipe.report.report["errors"]
+
+    assert errors["name"] == "TimeoutError"
+    assert "_handler_that_timeouts_with_threads" in errors["stack"]
+
+    threads = errors["threads"]
+
+    assert threads[0]["names"] == ["MainThread"]
+    assert "_handler_that_timeouts_with_threads" in threads[0]["stack"]
+
+    workers = next(t for t in threads if "worker-0" in t["names"])
+    assert workers["count"] == 3
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_timeouts_sampling(mock_send_report, handler_that_timeouts, mock_context):
+    """Assert that the handler's stack is sampled in the lead up to a timeout"""
+    iopipe, handler = handler_that_timeouts
+    iopipe.config["timeout_sample_fraction"] = 0.5
+    iopipe.config["timeout_sample_interval"] = 0.005
+    mock_context.set_remaining_time_in_millis(500)
+
+    try:
+        handler(None, mock_context)
+    except Exception:
+        pass
+
+    samples = iopipe.report.report["errors"]["samples"]
+
+    assert samples["count"] > 0
+    assert samples["interval"] == 5
+    for stack in samples["stacks"]:
+        assert "_handler_that_timeouts (" in stack
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_timeouts_sampling_discarded(mock_send_report, handler, mock_context):
+    """Assert that stack samples are discarded when the handler returns"""
+    iopipe, handler = handler
+    iopipe.config["timeout_sample_fraction"] = 1
+    mock_context.set_remaining_time_in_millis(500)
+
+    handler(None, mock_context)
+
+    assert "samples" not in iopipe.report.report["errors"]
+
+
 @mock.patch("iopipe.report.send_report", autospec=True)
 def test_timeouts_disable(mock_send_report, handler_that_timeouts, mock_context):
     """Assert the timeout is disabled if insufficient time remaining"""
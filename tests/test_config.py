@@ -113,3 +113,43 @@ def test_set_config__iopipe_token(monkeypatch):
     monkeypatch.setattr(os, "getenv", partial(mock_getenv, "IOPIPE_CLIENTID", "barbaz"))
     config = set_config()
     assert config["token"] == "barbaz"
+
+
+def test_set_config__compression__default():
+    config = set_config()
+    assert config["compression"] is None
+    assert config["compression_level"] == 1
+    assert config["compression_threshold"] == 65536
+
+
+def test_set_config__compression(monkeypatch):
+    monkeypatch.setattr(
+        os, "getenv", partial(mock_getenv, "IOPIPE_COMPRESSION", "GZIP")
+    )
+    config = set_config(compression_level="12", compression_threshold="1024")
+    assert config["compression"] == "gzip"
+    assert config["compression_level"] == 9
+    assert config["compression_threshold"] == 1024
+
+
+def test_set_config__compression__invalid():
+    config = set_config(compression="brotli", compression_level="fast")
+    assert config["compression"] is None
+    assert config["compression_level"] == 1
+
+
+def test_set_config__timeout_sampling(monkeypatch):
+    config = set_config()
+    assert config["timeout_sample_fraction"] == 0
+    assert config["timeout_sample_interval"] == 0.01
+
+    monkeypatch.setattr(
+        os, "getenv", partial(mock_getenv, "IOPIPE_TIMEOUT_SAMPLE_FRACTION", "0.2")
+    )
+    config = set_config(timeout_sample_interval="5")
+    assert config["timeout_sample_fraction"] == 0.2
+    assert config["timeout_sample_interval"] == 0.005
+
+    config = set_config(timeout_sample_fraction="2", timeout_sample_interval="fast")
+    assert config["timeout_sample_fraction"] == 1.0
+    assert config["timeout_sample_interval"] == 0.01
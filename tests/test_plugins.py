@@ -1,7 +1,16 @@
+import mock
 import pytest
 
+from iopipe import IOpipeCore
 from iopipe.contrib.trace import TracePlugin
-from iopipe.plugins import get_plugin_meta, is_plugin, Plugin
+from iopipe.plugins import (
+    get_plugin_hooks,
+    get_plugin_meta,
+    HOOKS,
+    is_noop_hook,
+    is_plugin,
+    Plugin,
+)
 
 
 def test_plugins_incomplete_interface():
@@ -84,3 +93,94 @@ def test_get_plugin_meta():
             "enabled": True,
         }
     ]
+
+
+class HookPlugin(Plugin):
+    name = "hook-plugin"
+    version = "0.1.0"
+    homepage = "https://github.com/iopipe"
+
+    def __init__(self, enabled=True):
+        self._enabled = enabled
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def pre_setup(self, iopipe):
+        pass
+
+    def post_setup(self, iopipe):
+        """Does nothing"""
+
+    def pre_invoke(self, event, context):
+        self.event = event
+
+    def post_invoke(self, event, context):
+        return None
+
+    def post_response(self, response):
+        return True
+
+    def pre_report(self, report):
+        pass
+
+    def post_report(self, report):
+        pass
+
+
+class InheritedHookPlugin(HookPlugin):
+    name = "inherited-hook-plugin"
+
+    def pre_report(self, report):
+        self.report = report
+
+
+def test_is_noop_hook():
+    plugin = HookPlugin()
+
+    assert is_noop_hook(plugin, "pre_setup")
+    assert is_noop_hook(plugin, "post_setup")
+    assert not is_noop_hook(plugin, "pre_invoke")
+    assert is_noop_hook(plugin, "post_invoke")
+    assert not is_noop_hook(plugin, "post_response")
+    assert not is_noop_hook(InheritedHookPlugin(), "pre_report")
+    assert is_noop_hook(InheritedHookPlugin(), "post_report")
+
+
+def test_get_plugin_hooks():
+    plugin, inherited_plugin = HookPlugin(), InheritedHookPlugin()
+    disabled_plugin = HookPlugin(enabled=False)
+    hooks = get_plugin_hooks([plugin, inherited_plugin, disabled_plugin])
+
+    assert sorted(hooks) == sorted(name for name, _ in HOOKS)
+    assert hooks["pre:setup"] == []
+    assert hooks["pre:invoke"] == [
+        (plugin, plugin.pre_invoke),
+        (inherited_plugin, inherited_plugin.pre_invoke),
+        (disabled_plugin, disabled_plugin.pre_invoke),
+    ]
+    assert hooks["pre:report"] == [(inherited_plugin, inherited_plugin.pre_report)]
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_run_hooks_enabled_at_runtime(mock_send_report, mock_context):
+    """Asserts that plugins can be enabled and disabled after they're loaded"""
+    plugin = InheritedHookPlugin(enabled=False)
+    iopipe = IOpipeCore(token="test-suite", plugins=[plugin])
+
+    @iopipe
+    def handler(event, context):
+        pass
+
+    handler({"invocation": 1}, mock_context)
+    assert not hasattr(plugin, "event")
+
+    plugin._enabled = True
+    handler({"invocation": 2}, mock_context)
+    assert plugin.event == {"invocation": 2}
+    assert plugin.report is iopipe.report
+
+    plugin._enabled = False
+    handler({"invocation": 3}, mock_context)
+    assert plugin.event == {"invocation": 2}
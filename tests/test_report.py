@@ -1,5 +1,8 @@
+import json
+import mock
 import os
 
+from iopipe import report as report_module
 from iopipe.report import Report
 
 
@@ -71,3 +74,173 @@ def test_report_samlocal(monkeypatch, iopipe, mock_context):
         report.report["aws"]["invokedFunctionArn"]
         == "arn:aws:lambda:local:0:function:handler"
     )
+
+
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_report_send_encodes_once(mock_send_report, iopipe, mock_context):
+    """Assert that the report is sent as JSON bytes encoded at the time of sending"""
+    iopipe.config["sync_http"] = True
+    report = Report(iopipe, mock_context)
+    report.prepare()
+    report.send()
+
+    report.report["labels"].append("added-after-send")
+    report.send()
+
+    assert mock_send_report.call_count == 1
+    data, config = mock_send_report.call_args[0]
+    assert isinstance(data, bytes)
+    assert "added-after-send" not in json.loads(data.decode("utf-8"))["labels"]
+
+
+@mock.patch("iopipe.report.logger", autospec=True)
+@mock.patch("iopipe.report.send_report", autospec=True)
+def test_report_send_unserializable(
+    mock_send_report, mock_logger, iopipe, mock_context
+):
+    """Assert that values that can't be serialized don't lose the report"""
+    iopipe.config["sync_http"] = True
+    report = Report(iopipe, mock_context)
+    report.prepare()
+    report.report["custom_metrics"].append({"name": "foo", "s": object()})
+    report.send()
+
+    assert mock_logger.error.call_count == 1
+    assert mock_send_report.call_count == 1
+    data = json.loads(mock_send_report.call_args[0][0].decode("utf-8"))
+    assert data["custom_metrics"][-1]["s"].startswith("<object object")
+
+    # A report that can't be serialized at all isn't sent
+    report = Report(iopipe, mock_context)
+    report.report["custom_metrics"].append(report.report)
+    report.send()
+
+    assert mock_logger.error.call_count == 3
+    assert mock_send_report.call_count == 1
+
+
+def test_report_static_environment(monkeypatch, iopipe, mock_context):
+    """Assert that static environment data is collected once per process"""
+    monkeypatch.setattr(report_module, "static_environment", {})
+
+    with mock.patch.object(
+        report_module.system, "read_bootid", return_value="boot-id"
+    ) as mock_read_bootid:
+        reports = [Report(iopipe, mock_context) for _ in range(2)]
+        for report in reports:
+            report.prepare()
+
+    assert mock_read_bootid.call_count == 1
+    for report in reports:
+        assert report.report["environment"]["host"]["boot_id"] == "boot-id"
+        assert report.report["environment"]["os"]["usedmem"] == (
+            report.report["environment"]["os"]["totalmem"]
+            - report.report["environment"]["os"]["freemem"]
+        )
+
+
+def test_report_memory_cgroup(monkeypatch, iopipe, mock_context):
+    """Assert that memory headroom and CPU throttling come from the cgroup"""
+    cgroups = [
+        {
+            "cpu": {"nr_throttled": 2, "throttled_usec": 1000},
+            "memory": {"limit": None, "usage": 100 << 20},
+            "version": 2,
+        },
+        {
+            "cpu": {"nr_throttled": 5, "throttled_usec": 4000},
+            "memory": {"limit": 200 << 20, "usage": 150 << 20},
+            "version": 2,
+        },
+    ]
+    monkeypatch.setattr(
+        report_module.proc_reader, "read_cgroup", lambda: cgroups.pop(0)
+    )
+
+    report = Report(iopipe, mock_context)
+    report.prepare()
+
+    linux = report.report["environment"]["os"]["linux"]
+
+    assert linux["memory"] == {
+        "headroom": 50 << 20,
+        "limit": 200 << 20,
+        "source": "cgroup",
+        "used": 150 << 20,
+    }
+    assert linux["cgroup"]["cpu"] == {"nr_throttled": 3, "throttled_usec": 3000}
+    assert linux["cgroup"]["version"] == 2
+
+
+def test_report_memory_cgroup_missing_start(monkeypatch, iopipe, mock_context):
+    """Assert that CPU throttling isn't reported without a start reading"""
+    cgroups = [
+        None,
+        {
+            "cpu": {"nr_throttled": 5, "throttled_usec": 4000},
+            "memory": {"limit": 200 << 20, "usage": 150 << 20},
+            "version": 2,
+        },
+    ]
+    monkeypatch.setattr(
+        report_module.proc_reader, "read_cgroup", lambda: cgroups.pop(0)
+    )
+
+    report = Report(iopipe, mock_context)
+    report.prepare()
+
+    linux = report.report["environment"]["os"]["linux"]
+
+    assert linux["cgroup"]["cpu"] is None
+    assert linux["memory"]["used"] == 150 << 20
+
+
+def test_report_memory_meminfo(monkeypatch, iopipe, mock_context):
+    """Assert that memory usage falls back to meminfo without cgroups"""
+    monkeypatch.setattr(report_module.proc_reader, "read_cgroup", lambda: None)
+
+    report = Report(iopipe, mock_context)
+    report.prepare()
+
+    environment = report.report["environment"]["os"]
+    memory = environment["linux"]["memory"]
+
+    assert "cgroup" not in environment["linux"]
+    assert memory["source"] == "meminfo"
+    assert memory["limit"] == mock_context.memory_limit_in_mb << 20
+    assert memory["headroom"] == memory["limit"] - memory["used"]
+
+
+def test_report_io_and_net_deltas(monkeypatch, iopipe, mock_context):
+    """Assert that I/O and network counters are reported as per-invocation deltas"""
+    readings = {
+        "read_net_dev": [
+            {"rx_bytes": 100, "tx_bytes": 50},
+            {"rx_bytes": 150, "tx_bytes": 75},
+        ],
+        "read_pid_io": [
+            {"read_bytes": 0, "syscr": 10},
+            {"read_bytes": 4096, "syscr": 12},
+        ],
+    }
+    for name, values in readings.items():
+        monkeypatch.setattr(report_module.proc_reader, name, values.pop)
+        values.reverse()
+
+    report = Report(iopipe, mock_context)
+    report.prepare()
+
+    linux = report.report["environment"]["os"]["linux"]
+
+    assert linux["net"] == {"rx_bytes": 50, "tx_bytes": 25}
+    assert linux["pid"]["self"]["io"] == {"read_bytes": 4096, "syscr": 2}
+
+
+def test_report_io_unavailable(monkeypatch, iopipe, mock_context):
+    """Assert that unreadable I/O counters are reported as missing"""
+    monkeypatch.setattr(report_module.proc_reader, "read_pid_io", lambda: None)
+
+    report = Report(iopipe, mock_context)
+    report.prepare()
+
+    assert report.report["environment"]["os"]["linux"]["pid"]["self"]["io"] is None
@@ -1,7 +1,10 @@
+import json
 import mock
+import pytest
+import zlib
 
 from iopipe.config import set_config
-from iopipe.send_report import send_report
+from iopipe.send_report import compress, send_report
 
 
 @mock.patch("os.environ", {})
@@ -12,7 +15,7 @@ def test_send_report(mock_session):
 
     mock_session.post.assert_called_once_with(
         "https://metrics-api.iopipe.com/v0/event",
-        json={"foo": "bar"},
+        data=b'{"foo":"bar"}',
         headers=mock.ANY,
         timeout=5.0,
     )
@@ -26,7 +29,52 @@ def test_send_report_network_timeout(mock_session):
 
     mock_session.post.assert_called_once_with(
         "https://metrics-api.iopipe.com/v0/event",
-        json={"foo": "bar"},
+        data=b'{"foo":"bar"}',
         headers=mock.ANY,
         timeout=60,
     )
+
+
+@mock.patch("os.environ", {})
+@mock.patch("iopipe.send_report.session", autospec=True)
+def test_send_report_encoded(mock_session):
+    """Assert that an already encoded report is sent as-is"""
+    send_report(b'{"foo":"bar"}', set_config())
+
+    mock_session.post.assert_called_once_with(
+        "https://metrics-api.iopipe.com/v0/event",
+        data=b'{"foo":"bar"}',
+        headers={
+            "Authorization": "Bearer ",
+            "Content-Type": "application/json",
+        },
+        timeout=5.0,
+    )
+
+
+@pytest.mark.parametrize("encoding,wbits", [("gzip", 31), ("deflate", 15)])
+def test_compress(encoding, wbits):
+    data = b'{"foo":"bar"}' * 100
+
+    assert zlib.decompress(compress(data, encoding), wbits) == data
+
+
+@mock.patch("os.environ", {})
+@mock.patch("iopipe.send_report.session", autospec=True)
+def test_send_report_compression(mock_session):
+    """Assert that reports are compressed only above the compression threshold"""
+    config = set_config(compression="gzip", compression_threshold=1024)
+
+    send_report(b"[]", config)
+
+    headers = mock_session.post.call_args[1]["headers"]
+    assert "Content-Encoding" not in headers
+    assert mock_session.post.call_args[1]["data"] == b"[]"
+
+    report = {"custom_metrics": [{"name": "metric-%s" % i, "n": i} for i in range(100)]}
+    send_report(report, config)
+
+    headers = mock_session.post.call_args[1]["headers"]
+    assert headers["Content-Encoding"] == "gzip"
+    data = zlib.decompress(mock_session.post.call_args[1]["data"], 31)
+    assert json.loads(data.decode("utf-8")) == report
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from iopipe import serializer
+
+REPORT = {
+    "client_id": "test-suite",
+    "coldstart": True,
+    "custom_metrics": [{"name": "foo", "n": 1.5}, {"name": "bar", "s": "bäz"}],
+    "errors": {},
+    "labels": ["@iopipe/coldstart", "a/label"],
+    "timestamp": 1546300800000,
+}
+
+
+@pytest.mark.parametrize("name", list(serializer.SERIALIZERS))
+def test_serializers_are_identical(name):
+    """Assert that every available serializer produces the same bytes"""
+    data = serializer.encode(REPORT, serializer=name)
+
+    assert isinstance(data, bytes)
+    assert data == serializer.encode(REPORT, serializer="json")
+    assert json.loads(data.decode("utf-8")) == REPORT
+
+
+@pytest.mark.parametrize("name", list(serializer.SERIALIZERS))
+def test_serializers_sort_keys(name):
+    data = serializer.dumps({"b": 1, "a": {"d": 2, "c": 3}}, True, name)
+
+    assert data == '{"a":{"c":3,"d":2},"b":1}'
+
+
+@pytest.mark.parametrize("name", list(serializer.SERIALIZERS))
+def test_serializers_fallback(name):
+    """Assert that objects a fast serializer can't handle fall back to stdlib"""
+    obj = {"big": 2**70, "tuple": (1, 2)}
+
+    assert json.loads(serializer.dumps(obj, serializer=name)) == {
+        "big": 2**70,
+        "tuple": [1, 2],
+    }
+
+    with pytest.raises(TypeError):
+        serializer.dumps({"object": object()}, serializer=name)
+
+
+def test_encode_lenient():
+    obj = {"object": object(), "text": "\u2603"}
+    data = json.loads(serializer.encode_lenient(obj).decode("utf-8"))
+    assert data["object"].startswith("<object object")
+    assert data["text"] == "\u2603"
@@ -0,0 +1,65 @@
+import random
+
+from iopipe.sketch import QuantileSketch
+
+
+def test_quantile_sketch():
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    assert sketch.quantile(0.5) is None
+
+    values = list(range(1, 10001))
+    random.shuffle(values)
+    for value in values:
+        sketch.add(value)
+
+    assert len(sketch) == 10000
+    assert sketch.min == 1
+    assert sketch.max == 10000
+    assert sketch.quantile(0) == 1
+    assert sketch.quantile(1) == 10000
+
+    for q in (0.5, 0.9, 0.95, 0.99):
+        expected = q * 9999 + 1
+        assert abs(sketch.quantile(q) - expected) <= expected * 0.011
+
+
+def test_quantile_sketch_zero():
+    sketch = QuantileSketch()
+    sketch.add(0, 5)
+    sketch.add(100, 5)
+
+    assert sketch.quantile(0.25) == 0
+    assert abs(sketch.quantile(0.9) - 100) <= 1
+
+
+def test_quantile_sketch_merge():
+    a, b = QuantileSketch(), QuantileSketch()
+    for value in range(1, 501):
+        a.add(value)
+    for value in range(501, 1001):
+        b.add(value)
+
+    a.merge(b)
+    assert len(a) == 1000
+    assert a.max == 1000
+    assert abs(a.quantile(0.5) - 500) <= 5.1
+
+    summary = a.to_dict()
+    assert summary["count"] == 1000
+    assert summary["sum"] == 500500
+    assert sorted(summary) == ["count", "max", "min", "p50", "p90", "p99", "sum"]
+
+
+def test_quantile_sketch_max_buckets():
+    sketch = QuantileSketch(max_buckets=10)
+    for value in range(1, 1001):
+        sketch.add(value)
+
+    assert len(sketch.buckets) == 10
+    assert len(sketch) == 1000
+    assert abs(sketch.quantile(0.99) - 990) <= 9.9
+
+
+def test_quantile_sketch_add(benchmark):
+    sketch = QuantileSketch()
+    benchmark(sketch.add, 123456789)
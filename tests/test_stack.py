@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+
+from iopipe.stack import capture_threads, fold_stack, StackSampler
+
+
+def wait_for(event):
+    event.wait()
+
+
+def start_workers(count, event):
+    workers = [
+        threading.Thread(target=wait_for, args=(event,), name="worker-%s" % i)
+        for i in range(count)
+    ]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    return workers
+
+
+def test_capture_threads():
+    event = threading.Event()
+    workers = start_workers(4, event)
+
+    try:
+        threads = capture_threads(target=threading.current_thread().ident)
+    finally:
+        event.set()
+        for worker in workers:
+            worker.join()
+
+    # The target thread is listed first
+    assert threads[0]["names"] == [threading.current_thread().name]
+    assert "test_capture_threads" in threads[0]["stack"]
+
+    # Workers waiting in the same place are grouped together
+    idle = next(t for t in threads if "worker-0" in t["names"])
+    assert idle["count"] == 4
+    assert sorted(idle["names"]) == ["worker-%s" % i for i in range(4)]
+    assert "wait_for" in idle["stack"]
+
+
+def test_capture_threads_exclude():
+    ident = threading.current_thread().ident
+    threads = capture_threads({ident: sys._getframe()}, exclude=[ident])
+
+    assert threads == []
+
+
+def test_capture_threads_limits():
+    def recurse(depth):
+        if depth == 0:
+            return capture_threads(
+                {threading.current_thread().ident: sys._getframe()}, max_frames=5
+            )
+        return recurse(depth - 1)
+
+    threads = recurse(20)
+
+    assert len(threads) == 1
+    # Only the innermost frames are kept
+    assert "in recurse" in threads[0]["stack"]
+    assert "in test_capture_threads_limits" not in threads[0]["stack"]
+
+    event = threading.Event()
+    workers = start_workers(2, event)
+
+    try:
+        frames = sys._current_frames()
+        # Give each worker a distinct stack so they aren't grouped together
+        frames[workers[1].ident] = sys._getframe()
+        threads = capture_threads(
+            frames, target=workers[0].ident, exclude=[threading.current_thread().ident]
+        )
+        capped = capture_threads(frames, target=workers[0].ident, max_size=1)
+    finally:
+        event.set()
+        for worker in workers:
+            worker.join()
+
+    assert threads[0]["names"] == ["worker-0"]
+    assert capped[0]["names"] == ["worker-0"]
+    assert capped[-1]["truncated"] is True
+    assert capped[-1]["count"] == len(frames) - 1
+
+
+def test_fold_stack():
+    def inner():
+        return fold_stack(sys._getframe())
+
+    folded = inner()
+    names = folded.split(";")
+
+    assert names[-1].startswith("inner (")
+    assert names[-2].startswith("test_fold_stack (")
+    assert fold_stack(sys._getframe(), max_frames=1).startswith("test_fold_stack (")
+
+
+def test_stack_sampler():
+    event = threading.Event()
+    worker = start_workers(1, event)[0]
+
+    sampler = StackSampler(worker.ident, 0.001)
+    sampler.start()
+    time.sleep(0.05)
+    sampler.stop()
+
+    event.set()
+    worker.join()
+
+    assert sampler.is_alive() is False
+    assert sampler.samples > 1
+    assert sum(sampler.counts.values()) == sampler.samples
+
+    folded = sampler.folded(limit=1)
+    assert len(folded) == 1
+    assert "wait_for (" in list(folded)[0]
@@ -1,3 +1,4 @@
+import os
 import socket
 import sys
 
@@ -76,3 +77,249 @@ def test_read_stat(benchmark):
 
         for key in ["idle", "irq", "sys", "user", "nice"]:
             assert key in cpu["times"]
+
+
+def test_proc_reader(benchmark):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+
+    meminfo = benchmark(reader.read_meminfo)
+
+    assert meminfo["MemTotal"] == system.read_meminfo()["MemTotal"]
+    assert "MemFree" in meminfo
+
+    stat = reader.read_pid_stat()
+
+    for key in ["utime", "stime", "cutime", "cstime"]:
+        assert key in stat
+        assert isinstance(stat[key], int)
+
+    status = reader.read_pid_status()
+    expected_status = system.read_pid_status("self")
+
+    assert status["FDSize"] == expected_status["FDSize"]
+    for key in ["VmRSS", "Threads"]:
+        assert isinstance(status[key], int)
+
+    assert len(reader.read_stat()) == len(system.read_stat())
+
+    reader.close()
+
+    assert reader.fds == {}
+
+
+def test_proc_reader_buffer_growth():
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader(buffer_size=16)
+    status = reader.read_pid_status()
+
+    assert len(reader.buffer) > 16
+    assert "VmRSS" in status
+
+    # A process name with spaces and parens shouldn't throw off the stat fields
+    reader.buffer[:] = b"1 (a) b (c) S" + b" 0" * 10 + b" 1 2 3 4 0 0"
+    match = system.PID_STAT_PATTERN.search(reader.buffer, reader.buffer.rfind(b")"))
+
+    assert match.groups() == (b"1", b"2", b"3", b"4")
+
+
+def test_proc_reader_fork():
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    reader.read_meminfo()
+    reader.read_stat()
+
+    # Simulate a fork, after which the inherited descriptors are reopened
+    reader.pid = -1
+    reader.read_meminfo()
+
+    assert reader.pid == os.getpid()
+    assert list(reader.fds) == ["meminfo"]
+
+
+def test_proc_reader_pid_stat(benchmark):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    benchmark(reader.read_pid_stat)
+
+
+def test_proc_reader_pid_status(benchmark):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    benchmark(reader.read_pid_status)
+
+
+def test_proc_reader_stat(benchmark):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    benchmark(reader.read_stat)
+
+
+@pytest.fixture
+def cgroup_v1(tmpdir):
+    tmpdir = tmpdir.mkdir("v1")
+    root = tmpdir.mkdir("cgroup")
+    memory = root.mkdir("memory").mkdir("lambda")
+    memory.join("memory.usage_in_bytes").write("104857600\n")
+    memory.join("memory.limit_in_bytes").write("9223372036854771712\n")
+    cpu = root.mkdir("cpu")
+    cpu.join("cpu.stat").write(
+        "nr_periods 10\nnr_throttled 2\nthrottled_time 3000000\n"
+    )
+    root.mkdir("cpuacct").join("cpuacct.usage").write("5000000\n")
+    proc = tmpdir.join("proc_cgroup")
+    proc.write("5:memory:/lambda\n3:cpu,cpuacct:/\n")
+    return str(root), str(proc)
+
+
+@pytest.fixture
+def cgroup_v2(tmpdir):
+    tmpdir = tmpdir.mkdir("v2")
+    root = tmpdir.mkdir("cgroup")
+    root.join("cgroup.controllers").write("cpu memory\n")
+    sandbox = root.mkdir("sandbox")
+    sandbox.join("memory.current").write("209715200\n")
+    sandbox.join("memory.max").write("max\n")
+    sandbox.join("cpu.stat").write(
+        "usage_usec 7000\nuser_usec 5000\nsystem_usec 2000\n"
+        "nr_periods 20\nnr_throttled 4\nthrottled_usec 1500\n"
+    )
+    proc = tmpdir.join("proc_cgroup")
+    proc.write("0::/sandbox\n")
+    return str(root), str(proc)
+
+
+def test_find_cgroup(tmpdir, cgroup_v1):
+    root, proc = cgroup_v1
+    cgroup = system.find_cgroup(root, proc)
+
+    assert cgroup["version"] == 1
+    assert cgroup["paths"]["memory_usage"].endswith(
+        os.path.join("memory", "lambda", "memory.usage_in_bytes")
+    )
+    assert cgroup["paths"]["cpu_stat"].endswith(os.path.join("cpu", "cpu.stat"))
+
+    assert system.find_cgroup(str(tmpdir.mkdir("empty")), proc) is None
+
+
+def test_proc_reader_cgroup_v1(cgroup_v1):
+    root, proc = cgroup_v1
+    reader = system.ProcReader(cgroup_root=root)
+    reader.paths["cgroup"] = proc
+
+    assert reader.read_cgroup() == {
+        "cpu": {
+            "nr_periods": 10,
+            "nr_throttled": 2,
+            "throttled_usec": 3000,
+            "usage_usec": 5000,
+        },
+        "memory": {"limit": None, "usage": 104857600},
+        "version": 1,
+    }
+
+
+def test_proc_reader_cgroup_v2(cgroup_v2):
+    root, proc = cgroup_v2
+    reader = system.ProcReader(cgroup_root=root)
+    reader.paths["cgroup"] = proc
+
+    cgroup = reader.read_cgroup()
+
+    assert cgroup["version"] == 2
+    assert cgroup["memory"] == {"limit": None, "usage": 209715200}
+    assert cgroup["cpu"]["nr_throttled"] == 4
+    assert cgroup["cpu"]["throttled_usec"] == 1500
+    assert cgroup["cpu"]["usage_usec"] == 7000
+
+
+def test_proc_reader_cgroup_missing(tmpdir):
+    reader = system.ProcReader(cgroup_root=str(tmpdir))
+    reader.paths["cgroup"] = str(tmpdir.join("missing"))
+
+    assert reader.read_cgroup() is None
+    assert reader.read_cgroup() is None
+
+
+def test_proc_reader_cgroup_unreadable(cgroup_v1):
+    root, proc = cgroup_v1
+    memory = os.path.join(root, "memory", "lambda")
+    with open(os.path.join(memory, "memory.usage_in_bytes"), "w") as f:
+        f.write("garbage\n")
+    with open(os.path.join(memory, "memory.limit_in_bytes"), "w") as f:
+        f.write("")
+    with open(os.path.join(root, "cpuacct", "cpuacct.usage"), "w") as f:
+        f.write("-\n")
+    reader = system.ProcReader(cgroup_root=root)
+    reader.paths["cgroup"] = proc
+    reader.read_cgroup()
+
+    # A file that can be opened, but not read
+    cpu_stat = reader.paths["cpu_stat"]
+    reader.close()
+    os.remove(cpu_stat)
+    os.mkdir(cpu_stat)
+
+    assert reader.read_cgroup() == {
+        "cpu": {},
+        "memory": {"limit": None, "usage": None},
+        "version": 1,
+    }
+
+
+def test_proc_reader_pid_io(benchmark, tmpdir):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    io = benchmark(reader.read_pid_io)
+
+    for key in ["rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes"]:
+        assert key in io
+
+    reader.paths["pid_io"] = str(tmpdir.join("missing"))
+    reader.close()
+
+    assert reader.read_pid_io() is None
+
+
+def test_proc_reader_net_dev(benchmark, tmpdir):
+    if not sys.platform.startswith("linux"):
+        pytest.skip("this test requires linux, skipping")
+
+    reader = system.ProcReader()
+    benchmark(reader.read_net_dev)
+
+    net_dev = tmpdir.join("net_dev")
+    net_dev.write(
+        "Inter-|   Receive                                                |  Transmit\n"
+        " face |bytes    packets errs drop fifo frame compressed multicast|bytes    "
+        "packets errs drop fifo colls carrier compressed\n"
+        "    lo:  918635  2098    0    0    0     0          0         0   918635  "
+        "2098    0    0    0     0       0          0\n"
+        "  eth0: 5350216  2555    0    0    0     0          0         0   198582  "
+        "2306    0    0    0     0       0          0\n"
+        "  eth1:     100    10    0    0    0     0          0         0      200  "
+        "  20    0    0    0     0       0          0\n"
+    )
+    reader.paths["net_dev"] = str(net_dev)
+    reader.close()
+
+    assert reader.read_net_dev() == {
+        "rx_bytes": 5350316,
+        "rx_packets": 2565,
+        "tx_bytes": 198782,
+        "tx_packets": 2326,
+    }
@@ -1,8 +1,15 @@
+import threading
 import time
 
 import pytest
 
-from iopipe.timeout import SignalTimeout, ThreadTimeout, TimeoutError
+from iopipe.timeout import (
+    create_timeout,
+    SignalTimeout,
+    ThreadTimeout,
+    Timeout,
+    TimeoutError,
+)
 
 
 class MockException(Exception):
@@ -55,3 +62,87 @@ def test_thread_timeout_exception():
     with pytest.raises(MockException):
         with ThreadTimeout(0.1):
             raise MockException
+
+
+def test_signal_timeout_threads():
+    timeout = SignalTimeout(0.1)
+
+    with pytest.raises(TimeoutError):
+        with timeout:
+            time.sleep(0.2)
+
+    assert timeout.frame.f_code.co_name == "test_signal_timeout_threads"
+    assert timeout.threads[0]["names"] == ["MainThread"]
+    assert "test_signal_timeout_threads" in timeout.threads[0]["stack"]
+
+
+def test_thread_timeout_threads():
+    timeout = ThreadTimeout(0.1)
+
+    with pytest.raises(TimeoutError):
+        with timeout:
+            time.sleep(0.2)
+
+    assert timeout.frame.f_code.co_name == "test_thread_timeout_threads"
+    assert "test_thread_timeout_threads" in timeout.threads[0]["stack"]
+    for thread in timeout.threads:
+        assert "stop" not in thread["stack"]
+
+
+def test_create_timeout():
+    assert isinstance(create_timeout(1), Timeout)
+
+    result = {}
+
+    def target():
+        timeout = result["timeout"] = create_timeout(0.1)
+        try:
+            with timeout:
+                time.sleep(0.2)
+        except TimeoutError as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+    assert isinstance(result["timeout"], ThreadTimeout)
+    assert isinstance(result["error"], TimeoutError)
+
+
+def sleep_in_handler(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.parametrize("timeout_class", [SignalTimeout, ThreadTimeout])
+def test_timeout_sampling(timeout_class):
+    timeout = timeout_class(0.2, sample_fraction=0.5, sample_interval=0.005)
+
+    with pytest.raises(TimeoutError):
+        with timeout:
+            sleep_in_handler(0.3)
+
+    assert timeout.sampler is None
+    assert timeout.samples["count"] > 1
+    assert timeout.samples["interval"] == 5
+    assert sum(timeout.samples["stacks"].values()) == timeout.samples["count"]
+    for stack in timeout.samples["stacks"]:
+        assert "sleep_in_handler (" in stack
+
+    # Neither the sampler nor the timer show up in the thread stacks
+    assert timeout.threads[0]["names"] == ["MainThread"]
+    for thread in timeout.threads:
+        assert "iopipe-stack-sampler" not in thread["names"]
+        assert "in stop" not in thread["stack"]
+
+
+@pytest.mark.parametrize("timeout_class", [SignalTimeout, ThreadTimeout])
+def test_timeout_sampling_discarded(timeout_class):
+    timeout = timeout_class(0.2, sample_fraction=1, sample_interval=0.005)
+
+    with timeout:
+        sleep_in_handler(0.05)
+
+    assert timeout.sampler is None
+    assert timeout.samples is None
+    assert timeout.threads is None